@@ -0,0 +1,3 @@
+"""
+Curso de Machine Learning: casos de análisis de datos abiertos de Bogotá
+"""
@@ -0,0 +1,3 @@
+from curso_machine_learning.cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,3 @@
+"""
+Motores de análisis sobre los datos de malnutrición
+"""
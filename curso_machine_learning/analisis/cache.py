@@ -0,0 +1,309 @@
+"""
+Caché persistente de resultados de análisis, direccionada por contenido
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+from curso_machine_learning.analisis.cubo import CuboAgregado
+from curso_machine_learning.analisis.eda import ResumenEDA, eda_por_bloques
+from curso_machine_learning.infraestructura.almacen import SUFIJOS_COLUMNARES
+from curso_machine_learning.infraestructura.sincronizacion import DIRECTORIO_CACHE
+
+DIRECTORIO_CACHE_ANALISIS = Path(DIRECTORIO_CACHE) / "analisis"
+TAMANO_MAXIMO = 512 * 2**20
+# Versiones anteriores de cada archivo que se recuerdan para detectar anexos
+MAX_VERSIONES = 8
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Huella:
+    """Identidad del contenido de un archivo"""
+
+    sha256: str
+    bytes: int
+
+
+class CacheAnalisis:
+    """Resultados de análisis (objetos y figuras) indexados por contenido.
+
+    La clave de cada resultado es el SHA-256 del archivo de entrada más la
+    operación y sus parámetros, así que renombrar o volver a descargar un
+    archivo idéntico reutiliza lo ya calculado. Para no releer el archivo en
+    cada ejecución se recuerda su tamaño y ``mtime``: si no cambiaron se usa
+    el hash guardado. Al superar ``tamano_maximo`` se eliminan primero los
+    resultados usados hace más tiempo.
+    """
+
+    def __init__(
+        self,
+        directorio: str | Path = DIRECTORIO_CACHE_ANALISIS,
+        *,
+        tamano_maximo: int = TAMANO_MAXIMO,
+    ):
+        self.directorio = Path(directorio)
+        self.tamano_maximo = tamano_maximo
+        self._ruta_indice = self.directorio / "archivos.json"
+        try:
+            with open(self._ruta_indice, encoding="utf-8") as f:
+                self.archivos: dict[str, dict[str, Any]] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.archivos = {}
+
+    def _guardar_indice(self) -> None:
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        tmp = self._ruta_indice.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.archivos, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self._ruta_indice)
+
+    def huella(self, ruta: str | Path) -> Huella:
+        """Hash del contenido, recalculado solo si cambió tamaño o ``mtime``.
+
+        En la misma lectura se comprueba qué versiones anteriores del archivo
+        siguen siendo un prefijo del contenido actual (filas añadidas al
+        final); esas versiones se conservan para actualizar incrementalmente.
+        """
+        ruta = Path(ruta).resolve()
+        stat = ruta.stat()
+        entrada = self.archivos.get(str(ruta), {})
+        if entrada.get("bytes") == stat.st_size and (
+            entrada.get("mtime_ns") == stat.st_mtime_ns
+        ):
+            return Huella(entrada["sha256"], stat.st_size)
+
+        anteriores = [
+            (v["bytes"], v["sha256"])
+            for v in [entrada, *entrada.get("versiones", [])]
+            if v and v["bytes"] < stat.st_size
+        ]
+        cortes = {b for b, _ in anteriores}
+        prefijos = {}
+        h = hashlib.sha256()
+        leidos = 0
+        with open(ruta, "rb") as f:
+            for corte in sorted(cortes) + [stat.st_size]:
+                while leidos < corte:
+                    chunk = f.read(min(1 << 20, corte - leidos))
+                    if not chunk:
+                        break
+                    h.update(chunk)
+                    leidos += len(chunk)
+                prefijos[corte] = h.copy().hexdigest()
+
+        sha256 = prefijos[stat.st_size]
+        versiones = [
+            {"bytes": b, "sha256": s} for b, s in anteriores if prefijos.get(b) == s
+        ]
+        self.archivos[str(ruta)] = {
+            "bytes": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+            "versiones": versiones[:MAX_VERSIONES],
+        }
+        self._guardar_indice()
+        return Huella(sha256, stat.st_size)
+
+    def versiones_previas(self, ruta: str | Path) -> list[Huella]:
+        """Versiones anteriores cuyo contenido es prefijo del actual"""
+        self.huella(ruta)
+        entrada = self.archivos[str(Path(ruta).resolve())]
+        return [Huella(v["sha256"], v["bytes"]) for v in entrada["versiones"]]
+
+    @staticmethod
+    def clave(huella: Huella, operacion: str, parametros: dict[str, Any]) -> str:
+        """Clave de un resultado: contenido + operación + parámetros"""
+        contenido = json.dumps(
+            [huella.sha256, operacion, parametros], sort_keys=True, default=str
+        )
+        return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+    def _leer(self, clave: str, sufijo: str) -> bytes | None:
+        ruta = self.directorio / f"{clave}{sufijo}"
+        try:
+            datos = ruta.read_bytes()
+        except FileNotFoundError:
+            return None
+        os.utime(ruta)  # marcar como usado recientemente
+        return datos
+
+    def _escribir(self, clave: str, sufijo: str, datos: bytes) -> None:
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        ruta = self.directorio / f"{clave}{sufijo}"
+        tmp = ruta.with_name(ruta.name + ".tmp")
+        tmp.write_bytes(datos)
+        os.replace(tmp, ruta)
+        self._desalojar()
+
+    def _desalojar(self) -> None:
+        """Eliminar los resultados usados hace más tiempo hasta caber"""
+        entradas = [
+            (ruta.stat().st_mtime, ruta.stat().st_size, ruta)
+            for ruta in self.directorio.iterdir()
+            if ruta.suffix in (".pkl", ".png", ".npz")
+        ]
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.tamano_maximo:
+                break
+            ruta.unlink(missing_ok=True)
+            # Las etiquetas de un cubo van en un .json junto al .npz
+            ruta.with_suffix(".json").unlink(missing_ok=True)
+            total -= tamano
+
+    def leer_objeto(self, clave: str) -> Any | None:
+        """Objeto guardado con ``clave`` (``None`` si no está)"""
+        datos = self._leer(clave, ".pkl")
+        return None if datos is None else pickle.loads(datos)
+
+    def guardar_objeto(self, clave: str, objeto: Any) -> None:
+        """Guardar un objeto con ``clave``"""
+        self._escribir(clave, ".pkl", pickle.dumps(objeto, pickle.HIGHEST_PROTOCOL))
+
+    def obtener(
+        self,
+        ruta: str | Path,
+        operacion: str,
+        parametros: dict[str, Any],
+        calcular: Callable[[], T],
+    ) -> T:
+        """Resultado de ``calcular()`` sobre ``ruta``, calculado una sola vez"""
+        clave = self.clave(self.huella(ruta), operacion, parametros)
+        resultado: T | None = self.leer_objeto(clave)
+        if resultado is None:
+            resultado = calcular()
+            self.guardar_objeto(clave, resultado)
+        return resultado
+
+    def resumen_eda(
+        self,
+        ruta: str | Path,
+        columnas: list[str] | None = None,
+        *,
+        tamano_bloque: int = 250_000,
+        procesos: int = 1,
+    ) -> ResumenEDA:
+        """Resumen EDA de ``ruta``, actualizado solo con las filas nuevas.
+
+        Si hay un resumen de una versión anterior del archivo y el contenido
+        actual solo añade líneas al final, se resumen esas líneas y se
+        fusionan con el resumen guardado en lugar de recorrer todo el archivo.
+        """
+        parametros = {"columnas": columnas}
+        clave = self.clave(self.huella(ruta), "resumen_eda", parametros)
+        resumen: ResumenEDA | None = self.leer_objeto(clave)
+        if resumen is not None:
+            print(f"♻️ Resumen de '{ruta}' recuperado de la caché")
+            return resumen
+
+        for previa in self.versiones_previas(ruta):
+            if Path(ruta).suffix in SUFIJOS_COLUMNARES or not _fin_de_linea(
+                ruta, previa.bytes
+            ):
+                break
+            resumen = self.leer_objeto(self.clave(previa, "resumen_eda", parametros))
+            if resumen is None:
+                continue
+            nuevas = eda_por_bloques(
+                ruta,
+                columnas,
+                tamano_bloque=tamano_bloque,
+                procesos=procesos,
+                desde_byte=previa.bytes,
+            )
+            resumen.fusionar(nuevas)
+            print(f"➕ Resumen actualizado con {nuevas.filas} filas nuevas")
+            break
+
+        if resumen is None:
+            resumen = eda_por_bloques(
+                ruta, columnas, tamano_bloque=tamano_bloque, procesos=procesos
+            )
+        self.guardar_objeto(clave, resumen)
+        return resumen
+
+    def _leer_cubo(self, clave: str) -> CuboAgregado | None:
+        ruta = self.directorio / f"{clave}.npz"
+        if not ruta.exists():
+            return None
+        os.utime(ruta)
+        return CuboAgregado.cargar(ruta)
+
+    def cubo(self, ruta: str | Path, *, tamano_bloque: int = 250_000) -> CuboAgregado:
+        """Cubo de conteos de ``ruta``, actualizado solo con las filas nuevas.
+
+        Igual que ``resumen_eda``: si el archivo solo creció por el final se
+        suman al cubo guardado las líneas añadidas.
+        """
+        clave = self.clave(self.huella(ruta), "cubo", {})
+        cubo = self._leer_cubo(clave)
+        if cubo is not None:
+            print(f"♻️ Cubo de '{ruta}' recuperado de la caché")
+            return cubo
+
+        for previa in self.versiones_previas(ruta):
+            if Path(ruta).suffix in SUFIJOS_COLUMNARES or not _fin_de_linea(
+                ruta, previa.bytes
+            ):
+                break
+            cubo = self._leer_cubo(self.clave(previa, "cubo", {}))
+            if cubo is None:
+                continue
+            filas = cubo.filas
+            cubo.agregar_archivo(
+                ruta, tamano_bloque=tamano_bloque, desde_byte=previa.bytes
+            )
+            print(f"➕ Cubo actualizado con {cubo.filas - filas} filas nuevas")
+            break
+
+        if cubo is None:
+            cubo = CuboAgregado.desde_archivo(ruta, tamano_bloque=tamano_bloque)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        cubo.guardar(self.directorio / f"{clave}.npz")
+        self._desalojar()
+        return cubo
+
+    def figura(
+        self,
+        ruta: str | Path,
+        operacion: str,
+        parametros: dict[str, Any],
+        dibujar: Callable[[Path], Any],
+        destino: str | Path,
+    ) -> Path:
+        """Figura PNG de ``ruta`` en ``destino``, dibujada una sola vez.
+
+        ``dibujar(destino)`` debe guardar la figura en ``destino``; si el
+        resultado ya está en la caché solo se copia. ``parametros`` tiene que
+        incluir todo lo que cambia la imagen (columnas, ``dpi``, modo de
+        datos grandes...), porque forma parte de la clave.
+        """
+        destino = Path(destino)
+        clave = self.clave(self.huella(ruta), operacion, parametros)
+        datos = self._leer(clave, ".png")
+        if datos is not None:
+            destino.write_bytes(datos)
+            print(f"♻️ Figura '{destino}' recuperada de la caché")
+            return destino
+
+        # Un archivo anterior en ``destino`` no debe guardarse como resultado
+        # si ``dibujar`` falla sin escribir nada
+        destino.unlink(missing_ok=True)
+        dibujar(destino)
+        if destino.exists():
+            self._escribir(clave, ".png", destino.read_bytes())
+        return destino
+
+
+def _fin_de_linea(ruta: str | Path, posicion: int) -> bool:
+    """Indicar si el byte anterior a ``posicion`` es un salto de línea"""
+    with open(ruta, "rb") as f:
+        f.seek(posicion - 1)
+        return f.read(1) == b"\n"
@@ -0,0 +1,236 @@
+"""
+Cubo de conteos LOCALIDAD × AÑO × TRIMESTRE × SEXO × clasificaciones
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from curso_machine_learning.analisis.eda import leer_bloques
+from curso_machine_learning.infraestructura.almacen import columnas_de
+
+DIMENSIONES = ("LOCALIDAD", "AÑO", "TRIMESTRE", "SEXO")
+PREFIJO_CLASIFICACION = "CLASIFICACION"
+# Límite de celdas del cubo (int64): unos 400 MB
+MAX_CELDAS = 50_000_000
+
+
+def dimensiones_de(columnas: Iterable[str]) -> list[str]:
+    """Columnas de ``columnas`` que forman parte del cubo, en orden"""
+    columnas = list(columnas)
+    clasificaciones = [
+        c for c in columnas if c.upper().startswith(PREFIJO_CLASIFICACION)
+    ]
+    return [c for c in DIMENSIONES if c in columnas] + clasificaciones
+
+
+def _etiqueta(valor: Any) -> Any:
+    """Valor de Python serializable en JSON (``None`` para nulos)"""
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float):
+        if np.isnan(valor):
+            return None
+        if valor.is_integer():
+            return int(valor)
+    return valor
+
+
+class CuboAgregado:
+    """Conteos de filas para cada combinación de valores de las dimensiones.
+
+    Se construye en una pasada (un ``bincount`` por bloque) y responde
+    consultas de corte y agregación sobre el arreglo de conteos, sin volver
+    a leer las filas. Las etiquetas nuevas que aparecen en bloques
+    posteriores amplían el eje correspondiente; los nulos son la etiqueta
+    ``None``.
+    """
+
+    def __init__(self, dimensiones: Sequence[str]):
+        self.dimensiones = list(dimensiones)
+        self.etiquetas: dict[str, list[Any]] = {d: [] for d in self.dimensiones}
+        self.conteos = np.zeros((0,) * len(self.dimensiones), dtype=np.int64)
+        self.filas = 0
+
+    def _codigos(self, dimension: str, serie: pd.Series) -> np.ndarray:
+        """Posición de cada valor en las etiquetas, añadiendo las nuevas"""
+        codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+        etiquetas = self.etiquetas[dimension]
+        posiciones = {e: i for i, e in enumerate(etiquetas)}
+        valores = [_etiqueta(v) for v in unicos]
+        nulos = codigos < 0
+        if nulos.any():
+            codigos[nulos] = len(valores)
+            valores.append(None)
+        mapa = []
+        for valor in valores:
+            if valor not in posiciones:
+                posiciones[valor] = len(etiquetas)
+                etiquetas.append(valor)
+            mapa.append(posiciones[valor])
+        return np.asarray(mapa, dtype=np.intp)[codigos]
+
+    def _ampliar(self) -> None:
+        """Agrandar el arreglo de conteos hasta el número actual de etiquetas"""
+        forma = tuple(len(self.etiquetas[d]) for d in self.dimensiones)
+        celdas = int(np.prod(forma, dtype=np.int64))
+        if celdas > MAX_CELDAS:
+            raise ValueError(
+                f"El cubo tendría {celdas} celdas (máximo {MAX_CELDAS}); "
+                "use menos dimensiones"
+            )
+        relleno = [(0, n - actual) for n, actual in zip(forma, self.conteos.shape)]
+        if any(despues for _, despues in relleno):
+            self.conteos = np.pad(self.conteos, relleno)
+
+    def agregar_bloque(self, df: pd.DataFrame) -> None:
+        """Sumar las filas de ``df`` al cubo"""
+        if df.empty:
+            return
+        codigos = [self._codigos(d, df[d]) for d in self.dimensiones]
+        self._ampliar()
+        indices = np.ravel_multi_index(codigos, self.conteos.shape)
+        self.conteos += np.bincount(indices, minlength=self.conteos.size).reshape(
+            self.conteos.shape
+        )
+        self.filas += len(df)
+
+    def fusionar(self, otro: "CuboAgregado") -> None:
+        """Sumar los conteos de otro cubo con las mismas dimensiones"""
+        if otro.dimensiones != self.dimensiones:
+            raise ValueError("Los cubos tienen dimensiones distintas")
+        posiciones = []
+        for d in self.dimensiones:
+            mapa = self._codigos(d, pd.Series(otro.etiquetas[d], dtype=object))
+            posiciones.append(mapa)
+        self._ampliar()
+        self.conteos[np.ix_(*posiciones)] += otro.conteos
+        self.filas += otro.filas
+
+    @classmethod
+    def desde_dataframe(
+        cls, df: pd.DataFrame, dimensiones: Sequence[str] | None = None
+    ) -> "CuboAgregado":
+        """Cubo de un DataFrame ya cargado"""
+        cubo = cls(dimensiones or dimensiones_de(df.columns))
+        cubo.agregar_bloque(df)
+        return cubo
+
+    @classmethod
+    def desde_archivo(
+        cls,
+        ruta: str | Path,
+        dimensiones: Sequence[str] | None = None,
+        *,
+        tamano_bloque: int = 250_000,
+        desde_byte: int = 0,
+    ) -> "CuboAgregado":
+        """Cubo de un archivo leído por bloques (solo las columnas necesarias)"""
+        dimensiones = list(dimensiones or dimensiones_de(columnas_de(ruta)))
+        cubo = cls(dimensiones)
+        cubo.agregar_archivo(ruta, tamano_bloque=tamano_bloque, desde_byte=desde_byte)
+        return cubo
+
+    def agregar_archivo(
+        self, ruta: str | Path, *, tamano_bloque: int = 250_000, desde_byte: int = 0
+    ) -> None:
+        """Sumar las filas de ``ruta`` a partir de ``desde_byte``"""
+        for bloque in leer_bloques(
+            ruta, self.dimensiones, tamano_bloque=tamano_bloque, desde_byte=desde_byte
+        ):
+            self.agregar_bloque(bloque)
+
+    def _posiciones(self, dimension: str, valores: Any) -> list[int]:
+        """Posiciones de ``valores`` (uno o varios) en las etiquetas"""
+        if not isinstance(valores, (list, tuple, set)):
+            valores = [valores]
+        buscados = {str(_etiqueta(v)) for v in valores}
+        return [
+            i
+            for i, etiqueta in enumerate(self.etiquetas[dimension])
+            if str(etiqueta) in buscados
+        ]
+
+    def consultar(
+        self, por: Sequence[str] = (), filtros: dict[str, Any] | None = None
+    ) -> pd.Series:
+        """Conteos agrupados por ``por`` entre las filas que cumplen ``filtros``.
+
+        ``filtros`` asigna a una dimensión un valor o una lista de valores
+        (comparados también como texto, así ``"2022"`` selecciona 2022). Las
+        dimensiones que no están en ``por`` se suman. Sin ``por`` se obtiene
+        una serie de un solo elemento con el total.
+        """
+        filtros = filtros or {}
+        desconocidas = (set(por) | set(filtros)) - set(self.dimensiones)
+        if desconocidas:
+            raise KeyError(f"Dimensiones desconocidas: {sorted(desconocidas)}")
+
+        conteos = self.conteos
+        etiquetas = dict(self.etiquetas)
+        for eje, dimension in enumerate(self.dimensiones):
+            if dimension in filtros:
+                posiciones = self._posiciones(dimension, filtros[dimension])
+                conteos = np.take(conteos, posiciones, axis=eje)
+                etiquetas[dimension] = [etiquetas[dimension][i] for i in posiciones]
+
+        sumar = tuple(i for i, d in enumerate(self.dimensiones) if d not in por)
+        conteos = conteos.sum(axis=sumar)
+        if not por:
+            return pd.Series([int(conteos)], name="conteo")
+
+        presentes = [d for d in self.dimensiones if d in por]
+        conteos = np.transpose(conteos, [presentes.index(d) for d in por])
+        indice = pd.MultiIndex.from_product(
+            [etiquetas[d] for d in por], names=list(por)
+        )
+        if len(por) == 1:
+            indice = indice.get_level_values(0)
+        return pd.Series(conteos.ravel(), index=indice, name="conteo")
+
+    def total(self, filtros: dict[str, Any] | None = None) -> int:
+        """Número de filas que cumplen ``filtros``"""
+        return int(self.consultar((), filtros).iloc[0])
+
+    def value_counts(
+        self, dimension: str, filtros: dict[str, Any] | None = None
+    ) -> pd.Series:
+        """Equivalente a ``value_counts()`` de una columna (sin nulos ni ceros)"""
+        conteos = self.consultar([dimension], filtros)
+        conteos = conteos[conteos.index.notna() & (conteos > 0)]
+        return conteos.sort_values(ascending=False, kind="stable")
+
+    def guardar(self, ruta: str | Path) -> Path:
+        """Guardar los conteos en ``ruta`` (.npz) y las etiquetas en un .json"""
+        ruta = Path(ruta)
+        maximo = int(self.conteos.max(initial=0))
+        tipo = np.min_scalar_type(maximo) if maximo else np.uint8
+        tmp = ruta.with_name(ruta.name + ".tmp.npz")
+        np.savez_compressed(tmp, conteos=self.conteos.astype(tipo))
+        os.replace(tmp, ruta)
+        metadatos = {
+            "dimensiones": self.dimensiones,
+            "etiquetas": self.etiquetas,
+            "filas": self.filas,
+        }
+        ruta_json = ruta.with_suffix(".json")
+        tmp_json = ruta_json.with_name(ruta_json.name + ".tmp")
+        tmp_json.write_text(json.dumps(metadatos, ensure_ascii=False), "utf-8")
+        os.replace(tmp_json, ruta_json)
+        return ruta
+
+    @classmethod
+    def cargar(cls, ruta: str | Path) -> "CuboAgregado":
+        """Cargar un cubo guardado con ``guardar``"""
+        ruta = Path(ruta)
+        metadatos = json.loads(ruta.with_suffix(".json").read_text("utf-8"))
+        cubo = cls(metadatos["dimensiones"])
+        cubo.etiquetas = metadatos["etiquetas"]
+        cubo.filas = metadatos["filas"]
+        with np.load(ruta) as datos:
+            cubo.conteos = datos["conteos"].astype(np.int64)
+        return cubo
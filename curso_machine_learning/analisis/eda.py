@@ -0,0 +1,425 @@
+"""
+EDA fuera de memoria: estadísticas por bloques con acumuladores fusionables
+"""
+
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from curso_machine_learning.infraestructura.almacen import SUFIJOS_COLUMNARES
+from curso_machine_learning.infraestructura.esquema import tipos_declarados
+
+PERCENTILES = (0.25, 0.5, 0.75)
+
+
+class SketchCuantiles:
+    """Resumen de cuantiles fusionable: histograma exacto o sketch estilo KLL.
+
+    Mientras haya como mucho ``k`` valores distintos (años, edades en meses,
+    códigos) se guarda un histograma exacto y los cuantiles coinciden con los
+    de pandas. Al superarse se pasa a niveles compactables: el nivel ``h``
+    guarda valores que representan ``2**h`` observaciones y, al llenarse, se
+    ordena y promueve uno de cada dos valores al siguiente. La memoria es
+    O(k log n) y el error de rango O(log n / k).
+    """
+
+    def __init__(self, k: int = 2048, semilla: int = 0):
+        self.k = k
+        self.exactos: Counter[float] | None = Counter()
+        self.niveles: list[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(semilla)
+
+    def agregar(self, valores: np.ndarray) -> None:
+        """Añadir observaciones (sin nulos)"""
+        valores = np.asarray(valores, float)
+        if self.exactos is not None:
+            unicos, conteos = np.unique(valores, return_counts=True)
+            self.exactos.update(dict(zip(unicos.tolist(), conteos.tolist())))
+            if len(self.exactos) > self.k:
+                self._volcar_exactos()
+            return
+        self.niveles[0] = np.concatenate([self.niveles[0], valores])
+        self._compactar()
+
+    def fusionar(self, otro: "SketchCuantiles") -> None:
+        """Incorporar las observaciones resumidas por otro sketch"""
+        if self.exactos is not None and otro.exactos is not None:
+            self.exactos.update(otro.exactos)
+            if len(self.exactos) > self.k:
+                self._volcar_exactos()
+            return
+        if self.exactos is not None:
+            self._volcar_exactos()
+        if otro.exactos is not None:
+            self._volcar_histograma(otro.exactos)
+        for h, nivel in enumerate(otro.niveles):
+            self._nivel(h)
+            self.niveles[h] = np.concatenate([self.niveles[h], nivel])
+        self._compactar()
+
+    def _nivel(self, h: int) -> None:
+        while len(self.niveles) <= h:
+            self.niveles.append(np.empty(0))
+
+    def _volcar_histograma(self, histograma: Counter[float]) -> None:
+        """Pasar un histograma a los niveles sin perder exactitud.
+
+        Un valor con ``c`` apariciones se coloca en cada nivel ``h`` cuyo bit
+        está activo en ``c`` (descomposición binaria del peso).
+        """
+        valores = np.fromiter(histograma.keys(), float, len(histograma))
+        conteos = np.fromiter(histograma.values(), np.int64, len(histograma))
+        h = 0
+        while conteos.any():
+            self._nivel(h)
+            self.niveles[h] = np.concatenate(
+                [self.niveles[h], valores[(conteos & 1).astype(bool)]]
+            )
+            conteos >>= 1
+            h += 1
+
+    def _volcar_exactos(self) -> None:
+        assert self.exactos is not None
+        histograma, self.exactos = self.exactos, None
+        self._volcar_histograma(histograma)
+        self._compactar()
+
+    def _compactar(self) -> None:
+        h = 0
+        while h < len(self.niveles):
+            nivel = self.niveles[h]
+            if len(nivel) > self.k:
+                nivel = np.sort(nivel)
+                impar = len(nivel) % 2
+                pares = nivel[: len(nivel) - impar]
+                self.niveles[h] = nivel[len(nivel) - impar :]
+                self._nivel(h + 1)
+                self.niveles[h + 1] = np.concatenate(
+                    [self.niveles[h + 1], pares[self._rng.integers(2) :: 2]]
+                )
+            h += 1
+
+    def cuantiles(self, qs: Iterable[float]) -> list[float]:
+        """Cuantiles (interpolación lineal, como pandas, si son exactos)"""
+        qs = np.asarray(list(qs), float)
+        if self.exactos is not None:
+            if not self.exactos:
+                return [float("nan")] * len(qs)
+            valores = np.array(sorted(self.exactos))
+            acumulado = np.cumsum([self.exactos[v] for v in valores])
+            posicion = qs * (acumulado[-1] - 1)
+            bajo = valores[np.searchsorted(acumulado, np.floor(posicion), "right")]
+            alto = valores[np.searchsorted(acumulado, np.ceil(posicion), "right")]
+            return [float(v) for v in bajo + (alto - bajo) * (posicion % 1)]
+
+        valores = np.concatenate(self.niveles)
+        if len(valores) == 0:
+            return [float("nan")] * len(qs)
+        pesos = np.concatenate(
+            [np.full(len(nivel), 2.0**h) for h, nivel in enumerate(self.niveles)]
+        )
+        orden = np.argsort(valores)
+        valores, acumulado = valores[orden], np.cumsum(pesos[orden])
+        posiciones = np.searchsorted(acumulado, qs * acumulado[-1])
+        return [float(valores[min(p, len(valores) - 1)]) for p in posiciones]
+
+
+@dataclass
+class AcumuladorNumerico:
+    """Conteo, nulos, media/varianza (Welford/Chan), mínimo, máximo y cuantiles"""
+
+    n: int = 0
+    nulos: int = 0
+    media: float = 0.0
+    m2: float = 0.0
+    minimo: float = float("inf")
+    maximo: float = float("-inf")
+    sketch: SketchCuantiles = field(default_factory=SketchCuantiles)
+
+    def agregar(self, serie: pd.Series) -> None:
+        """Actualizar con un bloque de valores"""
+        valores = pd.to_numeric(serie, errors="coerce").to_numpy(dtype=float)
+        validos = valores[~np.isnan(valores)]
+        self.nulos += len(valores) - len(validos)
+        if len(validos) == 0:
+            return
+        media = float(validos.mean())
+        otro = AcumuladorNumerico(
+            n=len(validos),
+            media=media,
+            m2=float(((validos - media) ** 2).sum()),
+            minimo=float(validos.min()),
+            maximo=float(validos.max()),
+            sketch=SketchCuantiles(self.sketch.k),
+        )
+        otro.sketch.agregar(validos)
+        self.fusionar(otro)
+
+    def fusionar(self, otro: "AcumuladorNumerico") -> None:
+        """Combinar con otro acumulador (fórmula paralela de Chan)"""
+        self.nulos += otro.nulos
+        if otro.n == 0:
+            return
+        n = self.n + otro.n
+        delta = otro.media - self.media
+        self.media += delta * otro.n / n
+        self.m2 += otro.m2 + delta**2 * self.n * otro.n / n
+        self.n = n
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+        self.sketch.fusionar(otro.sketch)
+
+    @property
+    def std(self) -> float:
+        """Desviación estándar muestral (ddof=1, como pandas)"""
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else float("nan")
+
+
+@dataclass
+class AcumuladorCategorico:
+    """Conteo de valores de una columna categórica"""
+
+    conteos: Counter[Any] = field(default_factory=Counter)
+
+    def agregar(self, serie: pd.Series) -> None:
+        """Actualizar con un bloque de valores"""
+        self.conteos.update(serie.value_counts().to_dict())
+
+    def fusionar(self, otro: "AcumuladorCategorico") -> None:
+        """Combinar con otro acumulador"""
+        self.conteos.update(otro.conteos)
+
+    def value_counts(self) -> pd.Series:
+        """Equivalente a ``Series.value_counts()`` (orden descendente)"""
+        conteos = {k: v for k, v in self.conteos.items() if v > 0}
+        return pd.Series(conteos, dtype="int64").sort_values(
+            ascending=False, kind="stable"
+        )
+
+
+def es_columna_de_conteo(col: str) -> bool:
+    """Columnas cuya distribución se reporta: LOCALIDAD, AÑO y CLASIFICACION_*"""
+    return col in ("LOCALIDAD", "AÑO") or "CLASIFICACION" in col.upper()
+
+
+@dataclass
+class ResumenEDA:
+    """Estadísticas de todo el dataset, construidas bloque a bloque"""
+
+    filas: int = 0
+    columnas: list[str] = field(default_factory=list)
+    tipos: dict[str, str] = field(default_factory=dict)
+    nulos: Counter[str] = field(default_factory=Counter)
+    numericos: dict[str, AcumuladorNumerico] = field(default_factory=dict)
+    categoricos: dict[str, AcumuladorCategorico] = field(default_factory=dict)
+    primeras_filas: pd.DataFrame | None = None
+
+    def agregar_bloque(self, df: pd.DataFrame) -> None:
+        """Actualizar el resumen con un bloque de filas"""
+        if not self.columnas:
+            self.columnas = list(df.columns)
+            self.tipos = {col: str(dtype) for col, dtype in df.dtypes.items()}
+            self.primeras_filas = df.head()
+
+        self.filas += len(df)
+        self.nulos.update(df.isnull().sum().to_dict())
+        for col in self.columnas:
+            es_numerica = col in self.numericos or (
+                pd.api.types.is_numeric_dtype(df[col])
+                and not pd.api.types.is_bool_dtype(df[col])
+            )
+            if es_numerica:
+                self.numericos.setdefault(col, AcumuladorNumerico()).agregar(df[col])
+            if es_columna_de_conteo(col):
+                self.categoricos.setdefault(col, AcumuladorCategorico()).agregar(
+                    df[col]
+                )
+
+    def fusionar(self, otro: "ResumenEDA") -> None:
+        """Combinar con el resumen de otros bloques"""
+        if not self.columnas:
+            self.columnas, self.tipos = otro.columnas, otro.tipos
+            self.primeras_filas = otro.primeras_filas
+        self.filas += otro.filas
+        self.nulos.update(otro.nulos)
+        for col, acc in otro.numericos.items():
+            self.numericos.setdefault(col, AcumuladorNumerico()).fusionar(acc)
+        for col, cat in otro.categoricos.items():
+            self.categoricos.setdefault(col, AcumuladorCategorico()).fusionar(cat)
+
+    def describe(self) -> pd.DataFrame:
+        """Tabla con el mismo formato que ``DataFrame.describe()``"""
+        indice = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+        datos = {}
+        for col in self.columnas:
+            acc = self.numericos.get(col)
+            if acc is None:
+                continue
+            vacio = acc.n == 0
+            datos[col] = [
+                float(acc.n),
+                float("nan") if vacio else acc.media,
+                acc.std,
+                float("nan") if vacio else acc.minimo,
+                *acc.sketch.cuantiles(PERCENTILES),
+                float("nan") if vacio else acc.maximo,
+            ]
+        return pd.DataFrame(datos, index=indice)
+
+    def value_counts(self, col: str) -> pd.Series:
+        """Distribución de valores de una columna de conteo"""
+        return self.categoricos[col].value_counts()
+
+
+def resumir_bloque(df: pd.DataFrame) -> ResumenEDA:
+    """Resumen de un solo bloque (se ejecuta en los procesos de trabajo)"""
+    resumen = ResumenEDA()
+    resumen.agregar_bloque(df)
+    return resumen
+
+
+def leer_bloques(
+    ruta: str | Path,
+    columnas: list[str] | None = None,
+    *,
+    tamano_bloque: int = 250_000,
+    desde_byte: int = 0,
+) -> Iterator[pd.DataFrame]:
+    """Leer un CSV (o Feather/Parquet) en bloques con el esquema compacto.
+
+    ``desde_byte`` (solo CSV) empieza a leer en esa posición, que debe ser
+    un inicio de línea; la cabecera se toma igualmente de la primera línea.
+    """
+    ruta = Path(ruta)
+    if ruta.suffix in SUFIJOS_COLUMNARES:
+        import pyarrow.feather as feather
+        import pyarrow.parquet as pq
+
+        if ruta.suffix == ".parquet":
+            archivo = pq.ParquetFile(ruta)
+            for lote in archivo.iter_batches(
+                batch_size=tamano_bloque, columns=columnas
+            ):
+                yield lote.to_pandas()
+            return
+
+        tabla = feather.read_table(ruta, columns=columnas, memory_map=True)
+        for inicio in range(0, tabla.num_rows, tamano_bloque):
+            yield tabla.slice(inicio, tamano_bloque).to_pandas()
+        return
+
+    nombres = list(pd.read_csv(ruta, nrows=0).columns)
+    tipos = tipos_declarados(columnas or nombres)
+    # Los enteros se convierten bloque a bloque: un error a mitad de archivo
+    # (nulos, desbordamiento) no debe obligar a releer los bloques ya emitidos
+    enteros = {c: t for c, t in tipos.items() if t.startswith(("int", "uint"))}
+    lectura = {c: t for c, t in tipos.items() if c not in enteros}
+    with open(ruta, "rb") as f:
+        if desde_byte:
+            f.seek(desde_byte)
+        lector = pd.read_csv(
+            f,
+            names=nombres,
+            header=None if desde_byte else 0,
+            usecols=columnas,
+            dtype=lectura,
+            chunksize=tamano_bloque,
+        )
+        for df in lector:
+            for col, tipo in enteros.items():
+                try:
+                    df[col] = df[col].astype(tipo)
+                except (ValueError, TypeError, OverflowError):
+                    df[col] = df[col].astype("float32")
+            yield df
+
+
+def eda_por_bloques(
+    ruta: str | Path,
+    columnas: list[str] | None = None,
+    *,
+    tamano_bloque: int = 250_000,
+    procesos: int = 1,
+    desde_byte: int = 0,
+) -> ResumenEDA:
+    """Calcular el resumen EDA de un archivo sin cargarlo entero.
+
+    Con ``procesos > 1`` los bloques se resumen en un pool de procesos (como
+    mucho ``procesos`` bloques pendientes) y los resultados se fusionan.
+    ``desde_byte`` resume solo las filas añadidas a partir de esa posición.
+    """
+    resumen = ResumenEDA()
+    bloques = leer_bloques(
+        ruta, columnas, tamano_bloque=tamano_bloque, desde_byte=desde_byte
+    )
+
+    if procesos <= 1:
+        for df in bloques:
+            resumen.agregar_bloque(df)
+        return resumen
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        pendientes: deque[Future[ResumenEDA]] = deque()
+        for df in bloques:
+            pendientes.append(pool.submit(resumir_bloque, df))
+            if len(pendientes) >= procesos:
+                resumen.fusionar(pendientes.popleft().result())
+        while pendientes:
+            resumen.fusionar(pendientes.popleft().result())
+    return resumen
+
+
+def imprimir_reporte(resumen: ResumenEDA) -> None:
+    """Mostrar el mismo reporte que ``analizar_datos`` a partir del resumen"""
+    filas = resumen.filas
+    print(f"✅ Dataset cargado: {filas} filas, {len(resumen.columnas)} columnas")
+
+    print("\n📋 Información del dataset:")
+    for i, col in enumerate(resumen.columnas):
+        no_nulos = filas - resumen.nulos[col]
+        print(f" {i:>3}  {col:<25} {no_nulos} non-null  {resumen.tipos[col]}")
+
+    print("\n📊 Estadísticas descriptivas:")
+    print(resumen.describe())
+
+    print("\n🔍 Primeras 5 filas:")
+    print(resumen.primeras_filas)
+
+    print("\n📝 Columnas disponibles:")
+    for i, col in enumerate(resumen.columnas, 1):
+        print(f"{i}. {col}")
+
+    print("\n🔍 Análisis de valores nulos:")
+    for col in resumen.columnas:
+        null_count = resumen.nulos[col]
+        if null_count > 0:
+            print(f"  {col}: {null_count} ({null_count/filas*100:.1f}%)")
+
+    if sum(resumen.nulos.values()) == 0:
+        print("  ✅ No se encontraron valores nulos")
+
+    print("\n🏥 Análisis Específico de Malnutrición")
+    print("=" * 50)
+
+    clas_cols = [col for col in resumen.columnas if "CLASIFICACION" in col.upper()]
+    if clas_cols:
+        print(f"\n📊 Columnas de clasificación nutricional encontradas: {clas_cols}")
+        for col in clas_cols[:2]:
+            print(f"\n📈 Distribución - {col}:")
+            for categoria, count in resumen.value_counts(col).items():
+                print(f"  {categoria}: {count} ({count / filas * 100:.1f}%)")
+
+    if "LOCALIDAD" in resumen.categoricos:
+        print("\n🏘️ Casos por localidad (Top 10):")
+        for localidad, count in resumen.value_counts("LOCALIDAD").head(10).items():
+            print(f"  {localidad}: {count} ({count / filas * 100:.1f}%)")
+
+    if "AÑO" in resumen.categoricos:
+        print("\n📅 Casos por año:")
+        for año, count in resumen.value_counts("AÑO").sort_index().items():
+            print(f"  {año}: {count} ({count / filas * 100:.1f}%)")
@@ -0,0 +1,348 @@
+"""
+Entrenamiento incremental por bloques: clasificación nutricional y puntajes Z
+"""
+
+import os
+import pickle
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.linear_model import SGDClassifier, SGDRegressor
+from sklearn.preprocessing import StandardScaler
+from sklearn.utils import murmurhash3_32
+
+from curso_machine_learning.analisis.eda import leer_bloques
+from curso_machine_learning.analisis.zscore import COLUMNAS_CLASIFICACION
+from curso_machine_learning.infraestructura.almacen import columnas_de
+
+NUMERICAS = ("EDAD_MESES", "PESO_KG", "TALLA_CM", "IMC")
+CATEGORICAS = (
+    "AÑO",
+    "TRIMESTRE",
+    "LOCALIDAD",
+    "SEXO",
+    "TIPO_ATENCION",
+    "REGIMEN_AFILIACION",
+)
+OBJETIVOS_CLASIFICACION = tuple(COLUMNAS_CLASIFICACION.values())
+OBJETIVOS_REGRESION = tuple(COLUMNAS_CLASIFICACION)
+# Columnas del espacio de hashing de las variables categóricas
+N_HASH = 2**12
+FRACCION_VALIDACION = 0.1
+PREFIJO_PREDICCION = "PREDICCION_"
+PREFIJO_PROBABILIDAD = "PROBABILIDAD_"
+
+
+def _texto(valor: Any) -> str:
+    """Valor como texto; 2022.0 y 2022 dan lo mismo (años leídos como float)"""
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor)
+
+
+class Caracteristicas:
+    """Matriz dispersa de un bloque: numéricas estandarizadas + categóricas
+    con hashing.
+
+    El ``StandardScaler`` se ajusta con ``partial_fit`` bloque a bloque (los
+    nulos se ignoran al ajustar y valen la media al transformar). Cada valor
+    categórico ``COLUMNA=valor`` va a una de ``n_hash`` columnas según su
+    hash, así que no hay vocabulario que guardar ni matriz densa: cada fila
+    tiene un 1 por variable categórica.
+    """
+
+    def __init__(
+        self,
+        numericas: Sequence[str] = NUMERICAS,
+        categoricas: Sequence[str] = CATEGORICAS,
+        n_hash: int = N_HASH,
+    ):
+        self.numericas = list(numericas)
+        self.categoricas = list(categoricas)
+        self.n_hash = n_hash
+        self.escalador = StandardScaler()
+
+    @property
+    def columnas(self) -> list[str]:
+        return self.numericas + self.categoricas
+
+    @property
+    def n_columnas(self) -> int:
+        return len(self.numericas) + self.n_hash
+
+    def _numericas(self, df: pd.DataFrame) -> np.ndarray:
+        return df[self.numericas].apply(pd.to_numeric, errors="coerce").to_numpy(float)
+
+    def ajustar_bloque(self, df: pd.DataFrame) -> None:
+        """Actualizar media y varianza de las numéricas"""
+        if self.numericas:
+            self.escalador.partial_fit(self._numericas(df))
+
+    def _hash(self, columna: str, serie: pd.Series) -> np.ndarray:
+        """Columna de la matriz para cada valor (hash de los valores únicos)"""
+        codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+        cubetas = np.array(
+            [
+                murmurhash3_32(f"{columna}={_texto(valor)}", positive=True)
+                % self.n_hash
+                for valor in unicos
+            ],
+            dtype=np.int64,
+        )
+        return cubetas[codigos] + len(self.numericas)
+
+    def transformar(self, df: pd.DataFrame) -> sparse.csr_matrix:
+        """Matriz CSR de ``len(df)`` × ``n_columnas``"""
+        n = len(df)
+        bloques = []
+        if self.numericas:
+            numericas = np.nan_to_num(self.escalador.transform(self._numericas(df)))
+            bloques.append(sparse.csr_matrix(numericas))
+        if self.categoricas:
+            indices = np.column_stack(
+                [self._hash(c, df[c]) for c in self.categoricas]
+            ).ravel()
+            k = len(self.categoricas)
+            bloques.append(
+                sparse.csr_matrix(
+                    (
+                        np.ones(n * k),
+                        indices - len(self.numericas),
+                        np.arange(n + 1) * k,
+                    ),
+                    shape=(n, self.n_hash),
+                )
+            )
+        return sparse.hstack(bloques, format="csr")
+
+
+@dataclass
+class Metricas:
+    """Métricas de validación acumuladas bloque a bloque"""
+
+    n: int = 0
+    aciertos: int = 0
+    suma_y: float = 0.0
+    suma_y2: float = 0.0
+    error_abs: float = 0.0
+    error_cuad: float = 0.0
+
+    def agregar_clasificacion(self, y: np.ndarray, prediccion: np.ndarray) -> None:
+        self.n += len(y)
+        self.aciertos += int((y == prediccion).sum())
+
+    def agregar_regresion(self, y: np.ndarray, prediccion: np.ndarray) -> None:
+        error = y - prediccion
+        self.n += len(y)
+        self.suma_y += float(y.sum())
+        self.suma_y2 += float(y @ y)
+        self.error_abs += float(np.abs(error).sum())
+        self.error_cuad += float(error @ error)
+
+    def a_dict(self, clasificacion: bool) -> dict[str, float]:
+        if not self.n:
+            return {"n": 0}
+        if clasificacion:
+            return {"n": self.n, "exactitud": self.aciertos / self.n}
+        total = self.suma_y2 - self.suma_y**2 / self.n
+        return {
+            "n": self.n,
+            "mae": self.error_abs / self.n,
+            "rmse": float(np.sqrt(self.error_cuad / self.n)),
+            "r2": 1 - self.error_cuad / total if total > 0 else float("nan"),
+        }
+
+
+class ModelosIncrementales:
+    """Un ``SGDClassifier`` por clasificación y un ``SGDRegressor`` por puntaje
+    Z, entrenados con ``partial_fit`` sobre las mismas características.
+
+    Una fracción fija de cada bloque (elegida con la semilla y el número de
+    bloque, igual en todas las épocas) se reserva para validar.
+    """
+
+    def __init__(
+        self,
+        clasificacion: Sequence[str] = OBJETIVOS_CLASIFICACION,
+        regresion: Sequence[str] = OBJETIVOS_REGRESION,
+        caracteristicas: Caracteristicas | None = None,
+        *,
+        semilla: int = 0,
+        fraccion_validacion: float = FRACCION_VALIDACION,
+    ):
+        self.caracteristicas = caracteristicas or Caracteristicas()
+        self.semilla = semilla
+        self.fraccion_validacion = fraccion_validacion
+        self.clasificacion = list(clasificacion)
+        self.regresion = list(regresion)
+        self.clases: dict[str, set[Any]] = {c: set() for c in self.clasificacion}
+        self.modelos: dict[str, SGDClassifier | SGDRegressor] = {
+            **{
+                c: SGDClassifier(loss="log_loss", alpha=1e-5, random_state=semilla)
+                for c in self.clasificacion
+            },
+            **{
+                c: SGDRegressor(alpha=1e-5, random_state=semilla)
+                for c in self.regresion
+            },
+        }
+        self.metricas: dict[str, Metricas] = {}
+        self.bloques = 0
+
+    @property
+    def objetivos(self) -> list[str]:
+        return self.clasificacion + self.regresion
+
+    def preparar_bloque(self, df: pd.DataFrame) -> None:
+        """Primera pasada: escalador y clases de cada clasificación"""
+        self.caracteristicas.ajustar_bloque(df)
+        for c in self.clasificacion:
+            self.clases[c].update(df[c].dropna().unique().tolist())
+
+    def _validacion(self, n: int, bloque: int) -> np.ndarray:
+        rng = np.random.default_rng([self.semilla, bloque])
+        return rng.random(n) < self.fraccion_validacion
+
+    def entrenar_bloque(self, df: pd.DataFrame, bloque: int, validar: bool) -> None:
+        """Actualizar cada modelo con las filas de entrenamiento del bloque y,
+        con ``validar``, acumular sus métricas sobre las de validación"""
+        rng = np.random.default_rng([self.semilla, bloque, self.bloques])
+        orden = rng.permutation(len(df))
+        df = df.iloc[orden]
+        X = self.caracteristicas.transformar(df)
+        es_validacion = self._validacion(len(df), bloque)[orden]
+
+        for objetivo, modelo in self.modelos.items():
+            es_clasificacion = objetivo in self.clases
+            y = df[objetivo]
+            if not es_clasificacion:
+                y = pd.to_numeric(y, errors="coerce")
+            presentes = y.notna().to_numpy()
+            y = y.to_numpy(object if es_clasificacion else float)
+
+            entrenamiento = presentes & ~es_validacion
+            if entrenamiento.any():
+                if es_clasificacion:
+                    modelo.partial_fit(
+                        X[entrenamiento],
+                        y[entrenamiento],
+                        classes=sorted(self.clases[objetivo], key=str),
+                    )
+                else:
+                    modelo.partial_fit(X[entrenamiento], y[entrenamiento])
+
+            validacion = presentes & es_validacion
+            if validar and validacion.any() and hasattr(modelo, "coef_"):
+                metricas = self.metricas.setdefault(objetivo, Metricas())
+                prediccion = modelo.predict(X[validacion])
+                if es_clasificacion:
+                    metricas.agregar_clasificacion(y[validacion], prediccion)
+                else:
+                    metricas.agregar_regresion(y[validacion], prediccion)
+        self.bloques += 1
+
+    def predecir_bloque(self, df: pd.DataFrame) -> pd.DataFrame:
+        """``df`` con ``PREDICCION_<objetivo>`` y, en las clasificaciones,
+        ``PROBABILIDAD_<objetivo>`` de la clase predicha"""
+        X = self.caracteristicas.transformar(df)
+        for objetivo, modelo in self.modelos.items():
+            if not hasattr(modelo, "coef_"):
+                continue
+            if objetivo in self.clases:
+                probabilidades = modelo.predict_proba(X)
+                mejor = probabilidades.argmax(axis=1)
+                df[PREFIJO_PREDICCION + objetivo] = modelo.classes_[mejor]
+                df[PREFIJO_PROBABILIDAD + objetivo] = probabilidades[
+                    np.arange(len(df)), mejor
+                ].astype(np.float32)
+            else:
+                df[PREFIJO_PREDICCION + objetivo] = modelo.predict(X).astype(np.float32)
+        return df
+
+    def resumen(self) -> dict[str, dict[str, float]]:
+        """Métricas de validación de la última época por objetivo"""
+        return {
+            objetivo: metricas.a_dict(objetivo in self.clases)
+            for objetivo, metricas in self.metricas.items()
+        }
+
+    def guardar(self, ruta: str | Path) -> Path:
+        """Guardar los modelos (pickle, escritura atómica)"""
+        ruta = Path(ruta)
+        tmp = ruta.with_name(ruta.name + ".tmp")
+        tmp.write_bytes(pickle.dumps(self, pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp, ruta)
+        return ruta
+
+    @staticmethod
+    def cargar(ruta: str | Path) -> "ModelosIncrementales":
+        """Cargar modelos guardados con ``guardar``"""
+        modelos: ModelosIncrementales = pickle.loads(Path(ruta).read_bytes())
+        return modelos
+
+
+def entrenar_archivo(
+    ruta: str | Path,
+    *,
+    clasificacion: Sequence[str] = OBJETIVOS_CLASIFICACION,
+    regresion: Sequence[str] = OBJETIVOS_REGRESION,
+    epocas: int = 1,
+    tamano_bloque: int = 250_000,
+    semilla: int = 0,
+) -> ModelosIncrementales:
+    """Entrenar los modelos de ``ruta`` sin cargar el archivo entero.
+
+    Una pasada ajusta el escalador y reúne las clases; después cada época
+    recorre los bloques actualizando los modelos. Las métricas son las de
+    validación de la última época. Solo se leen las columnas usadas y se
+    omiten objetivos y características que el archivo no tenga.
+    """
+    disponibles = set(columnas_de(ruta))
+    caracteristicas = Caracteristicas(
+        [c for c in NUMERICAS if c in disponibles],
+        [c for c in CATEGORICAS if c in disponibles],
+    )
+    modelos = ModelosIncrementales(
+        [c for c in clasificacion if c in disponibles],
+        [c for c in regresion if c in disponibles],
+        caracteristicas,
+        semilla=semilla,
+    )
+    if not modelos.objetivos:
+        raise ValueError(f"'{ruta}' no tiene ninguna columna objetivo")
+    columnas = caracteristicas.columnas + modelos.objetivos
+
+    for df in leer_bloques(ruta, columnas, tamano_bloque=tamano_bloque):
+        modelos.preparar_bloque(df)
+    for epoca in range(epocas):
+        ultima = epoca == epocas - 1
+        for i, df in enumerate(
+            leer_bloques(ruta, columnas, tamano_bloque=tamano_bloque)
+        ):
+            modelos.entrenar_bloque(df, i, validar=ultima)
+    return modelos
+
+
+def predecir_archivo(
+    ruta: str | Path,
+    destino: str | Path,
+    modelos: ModelosIncrementales,
+    *,
+    tamano_bloque: int = 250_000,
+) -> tuple[Path, int]:
+    """Escribir en ``destino`` (CSV) cada fila de ``ruta`` con sus predicciones"""
+    destino = Path(destino)
+    parcial = destino.with_name(destino.name + ".part")
+    filas = 0
+    with open(parcial, "w", encoding="utf-8", newline="") as f:
+        for i, bloque in enumerate(leer_bloques(ruta, tamano_bloque=tamano_bloque)):
+            modelos.predecir_bloque(bloque).to_csv(f, index=False, header=i == 0)
+            filas += len(bloque)
+    os.replace(parcial, destino)
+    return destino, filas
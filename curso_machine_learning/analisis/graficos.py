@@ -0,0 +1,292 @@
+"""
+Gráficos para datasets grandes: datos pre-agregados y paneles en paralelo
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+# A partir de este número de filas se usa el modo de datos grandes
+UMBRAL_FILAS_GRANDES = 100_000
+# Matrices de correlación más anchas se dibujan sin anotar cada celda
+MAX_ANOTACIONES = 12
+ESTILO = "seaborn-v0_8"
+# Resolución de las figuras guardadas
+DPI = 300
+
+
+@dataclass
+class Panel:
+    """Un gráfico ya agregado, listo para dibujar en cualquier proceso"""
+
+    nombre: str
+    tipo: str
+    titulo: str
+    datos: dict[str, Any] = field(default_factory=dict)
+    xlabel: str = ""
+    ylabel: str = ""
+
+
+def es_grande(df: pd.DataFrame) -> bool:
+    """Indicar si conviene el modo de datos grandes"""
+    return len(df) > UMBRAL_FILAS_GRANDES
+
+
+def _valores(serie: pd.Series) -> np.ndarray:
+    return pd.to_numeric(serie, errors="coerce").dropna().to_numpy(dtype=float)
+
+
+def panel_histograma(
+    nombre: str, serie: pd.Series, *, bins: int, color: str, titulo: str, **etiquetas
+) -> Panel:
+    """Histograma calculado con NumPy (solo se pasan conteos y bordes)"""
+    conteos, bordes = np.histogram(_valores(serie), bins=bins)
+    return Panel(
+        nombre,
+        "histograma",
+        titulo,
+        {"conteos": conteos, "bordes": bordes, "color": color},
+        **etiquetas,
+    )
+
+
+def panel_densidad(
+    nombre: str,
+    x: pd.Series,
+    y: pd.Series,
+    *,
+    titulo: str,
+    bins: int = 200,
+    cmap: str = "Purples",
+    **etiquetas,
+) -> Panel:
+    """Densidad 2D (``histogram2d``) en lugar de un punto por fila"""
+    validos = x.notna().to_numpy() & y.notna().to_numpy()
+    conteos, bordes_x, bordes_y = np.histogram2d(
+        x.to_numpy(dtype=float)[validos], y.to_numpy(dtype=float)[validos], bins=bins
+    )
+    return Panel(
+        nombre,
+        "densidad",
+        titulo,
+        {"conteos": conteos, "bordes_x": bordes_x, "bordes_y": bordes_y, "cmap": cmap},
+        **etiquetas,
+    )
+
+
+def panel_boxplot(nombre: str, df: pd.DataFrame, columnas: list[str]) -> Panel:
+    """Estadísticas de caja por columna, sin los puntos atípicos individuales"""
+    from matplotlib import cbook
+
+    estadisticas = []
+    for col in columnas:
+        (stats,) = cbook.boxplot_stats(_valores(df[col]), labels=[col])
+        stats["fliers"] = np.empty(0)
+        estadisticas.append(stats)
+    return Panel(
+        nombre, "boxplot", "Box Plot de Variables Numéricas", {"stats": estadisticas}
+    )
+
+
+def panel_correlacion(nombre: str, df: pd.DataFrame, columnas: list[str]) -> Panel:
+    """Matriz de correlación"""
+    matriz = df[columnas].astype("float64").corr().to_numpy()
+    return Panel(
+        nombre,
+        "correlacion",
+        "Matriz de Correlación",
+        {"matriz": matriz, "etiquetas": list(columnas)},
+    )
+
+
+def panel_conteos(
+    nombre: str, tipo: str, conteos: pd.Series, *, titulo: str, **opciones
+) -> Panel:
+    """Barras horizontales, torta o línea a partir de un conteo ya hecho"""
+    xlabel = opciones.pop("xlabel", "")
+    ylabel = opciones.pop("ylabel", "")
+    datos = {
+        "etiquetas": [str(v) for v in conteos.index],
+        "x": conteos.index.to_numpy(),
+        "valores": conteos.to_numpy(),
+        **opciones,
+    }
+    return Panel(nombre, tipo, titulo, datos, xlabel, ylabel)
+
+
+def _dibujar_histograma(ax: Any, panel: Panel) -> None:
+    d = panel.datos
+    ax.hist(
+        d["bordes"][:-1],
+        bins=d["bordes"],
+        weights=d["conteos"],
+        alpha=0.7,
+        color=d["color"],
+        edgecolor="black",
+    )
+    ax.set_ylabel(panel.ylabel or "Frecuencia")
+    ax.grid(True, alpha=0.3)
+
+
+def _dibujar_densidad(ax: Any, panel: Panel) -> None:
+    from matplotlib.colors import LogNorm
+
+    d = panel.datos
+    conteos = np.ma.masked_equal(d["conteos"].T, 0)
+    extent = [d["bordes_x"][0], d["bordes_x"][-1], d["bordes_y"][0], d["bordes_y"][-1]]
+    imagen = ax.imshow(
+        conteos,
+        origin="lower",
+        extent=extent,
+        aspect="auto",
+        cmap=d["cmap"],
+        norm=LogNorm() if conteos.count() else None,
+        interpolation="nearest",
+    )
+    ax.figure.colorbar(imagen, ax=ax, label="Casos")
+    ax.grid(True, alpha=0.3)
+
+
+def _dibujar_boxplot(ax: Any, panel: Panel) -> None:
+    ax.bxp(panel.datos["stats"], showfliers=False)
+    ax.tick_params(axis="x", rotation=45)
+    ax.grid(True, alpha=0.3)
+
+
+def _dibujar_correlacion(ax: Any, panel: Panel) -> None:
+    matriz, etiquetas = panel.datos["matriz"], panel.datos["etiquetas"]
+    n = len(etiquetas)
+    ax.imshow(matriz, cmap="coolwarm", aspect="auto", vmin=-1, vmax=1)
+    ax.set_xticks(range(n))
+    ax.set_yticks(range(n))
+    ax.set_xticklabels(etiquetas, rotation=45)
+    ax.set_yticklabels(etiquetas)
+    if n > MAX_ANOTACIONES:
+        return
+    for i in range(n):
+        for j in range(n):
+            ax.text(
+                j, i, f"{matriz[i, j]:.2f}", ha="center", va="center", color="black"
+            )
+
+
+def _dibujar_barras(ax: Any, panel: Panel) -> None:
+    d = panel.datos
+    posiciones = range(len(d["valores"]))
+    ax.barh(posiciones, d["valores"], alpha=0.7, color=d.get("color", "orange"))
+    ax.set_yticks(posiciones)
+    ax.set_yticklabels(d["etiquetas"])
+    ax.grid(True, alpha=0.3)
+
+
+def _dibujar_torta(ax: Any, panel: Panel) -> None:
+    d = panel.datos
+    ax.pie(d["valores"], labels=d["etiquetas"], autopct="%1.1f%%", startangle=90)
+
+
+def _dibujar_linea(ax: Any, panel: Panel) -> None:
+    d = panel.datos
+    ax.plot(d["x"], d["valores"], marker="o", linewidth=2, markersize=8)
+    ax.grid(True, alpha=0.3)
+
+
+def _dibujar_texto(ax: Any, panel: Panel) -> None:
+    ax.axis("off")
+    ax.text(
+        0.1,
+        0.9,
+        panel.datos["texto"],
+        transform=ax.transAxes,
+        fontsize=10,
+        verticalalignment="top",
+        fontfamily="monospace",
+    )
+
+
+DIBUJANTES: dict[str, Callable[[Any, Panel], None]] = {
+    "histograma": _dibujar_histograma,
+    "densidad": _dibujar_densidad,
+    "boxplot": _dibujar_boxplot,
+    "correlacion": _dibujar_correlacion,
+    "barras": _dibujar_barras,
+    "torta": _dibujar_torta,
+    "linea": _dibujar_linea,
+    "texto": _dibujar_texto,
+}
+
+
+def dibujar_panel(ax: Any, panel: Panel) -> None:
+    """Dibujar un panel en unos ejes de matplotlib"""
+    DIBUJANTES[panel.tipo](ax, panel)
+    ax.set_title(panel.titulo)
+    if panel.xlabel:
+        ax.set_xlabel(panel.xlabel)
+    if panel.ylabel:
+        ax.set_ylabel(panel.ylabel)
+
+
+def guardar_cuadricula(
+    paneles: list[Panel],
+    destino: str | Path,
+    *,
+    forma: tuple[int, int],
+    figsize: tuple[float, float],
+    titulo: str = "",
+    dpi: int = DPI,
+) -> Path:
+    """Guardar todos los paneles en una sola figura (backend Agg, sin pyplot)"""
+    import matplotlib.style
+    from matplotlib.figure import Figure
+
+    with matplotlib.style.context(ESTILO):
+        fig = Figure(figsize=figsize)
+        axes = fig.subplots(*forma, squeeze=False).ravel()
+        if titulo:
+            fig.suptitle(titulo, fontsize=16, fontweight="bold")
+        for ax, panel in zip(axes, paneles):
+            dibujar_panel(ax, panel)
+        fig.tight_layout()
+        fig.savefig(destino, dpi=dpi, bbox_inches="tight")
+    return Path(destino)
+
+
+def guardar_panel(
+    panel: Panel,
+    destino: str | Path,
+    *,
+    figsize: tuple[float, float] = (8, 6),
+    dpi: int = DPI,
+) -> Path:
+    """Guardar un panel como figura independiente (apto para otro proceso)"""
+    return guardar_cuadricula(
+        [panel], destino, forma=(1, 1), figsize=figsize, titulo="", dpi=dpi
+    )
+
+
+def ruta_panel(destino: str | Path, panel: Panel) -> Path:
+    """``<destino sin extensión>_<panel>.png``"""
+    destino = Path(destino)
+    return destino.with_name(f"{destino.stem}_{panel.nombre}{destino.suffix}")
+
+
+def guardar_paneles(
+    paneles: list[Panel], destino: str | Path, *, dpi: int = DPI, procesos: int = 1
+) -> list[Path]:
+    """Guardar cada panel en su propio archivo, en paralelo si ``procesos > 1``.
+
+    Los paneles solo llevan datos agregados, así que enviarlos a otros
+    procesos es barato; cada proceso dibuja con el backend Agg sin pantalla.
+    """
+    rutas = [ruta_panel(destino, panel) for panel in paneles]
+    if procesos <= 1:
+        return [guardar_panel(p, r, dpi=dpi) for p, r in zip(paneles, rutas)]
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = [
+            pool.submit(guardar_panel, p, r, dpi=dpi) for p, r in zip(paneles, rutas)
+        ]
+        return [futuro.result() for futuro in futuros]
@@ -0,0 +1,525 @@
+"""
+Validación cruzada en paralelo de varios modelos con preprocesamiento compartido
+"""
+
+import hashlib
+import importlib
+import itertools
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Iterator, Sequence
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import KFold, StratifiedKFold
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from curso_machine_learning.analisis.entrenamiento import CATEGORICAS, NUMERICAS
+
+# Modelos disponibles por nombre corto (se importan en cada proceso)
+MODELOS = {
+    "lineal": "sklearn.linear_model.LinearRegression",
+    "ridge": "sklearn.linear_model.Ridge",
+    "lasso": "sklearn.linear_model.Lasso",
+    "arbol": "sklearn.tree.DecisionTreeRegressor",
+    "bosque": "sklearn.ensemble.RandomForestRegressor",
+    "boosting": "sklearn.ensemble.HistGradientBoostingRegressor",
+    "knn": "sklearn.neighbors.KNeighborsRegressor",
+    "logistica": "sklearn.linear_model.LogisticRegression",
+    "arbol_clasificacion": "sklearn.tree.DecisionTreeClassifier",
+    "bosque_clasificacion": "sklearn.ensemble.RandomForestClassifier",
+    "boosting_clasificacion": "sklearn.ensemble.HistGradientBoostingClassifier",
+    "knn_clasificacion": "sklearn.neighbors.KNeighborsClassifier",
+}
+CANDIDATOS_REGRESION = ("lineal", "ridge:alpha=0.1,1,10", "arbol:max_depth=5,10")
+CANDIDATOS_CLASIFICACION = (
+    "logistica:C=0.1,1,10",
+    "arbol_clasificacion:max_depth=5,10",
+)
+PLIEGUES = 5
+
+
+@dataclass(frozen=True)
+class Candidato:
+    """Modelo (nombre de ``MODELOS`` o ruta ``modulo.Clase``) con sus
+    hiperparámetros"""
+
+    modelo: str
+    parametros: tuple[tuple[str, Any], ...] = ()
+
+    @property
+    def nombre(self) -> str:
+        if not self.parametros:
+            return self.modelo
+        return f"{self.modelo}({', '.join(f'{k}={v}' for k, v in self.parametros)})"
+
+    def crear(self) -> Any:
+        ruta = MODELOS.get(self.modelo, self.modelo)
+        modulo, _, clase = ruta.rpartition(".")
+        return getattr(importlib.import_module(modulo), clase)(**dict(self.parametros))
+
+
+def _valor(texto: str) -> Any:
+    """``"10"`` → 10, ``"0.1"`` → 0.1, ``"None"`` → None; si no, el texto"""
+    if texto == "None":
+        return None
+    try:
+        return json.loads(texto)
+    except json.JSONDecodeError:
+        return texto
+
+
+def rejilla(modelo: str, **valores: Sequence[Any]) -> list[Candidato]:
+    """Un candidato por combinación de hiperparámetros"""
+    nombres = sorted(valores)
+    return [
+        Candidato(modelo, tuple(zip(nombres, combinacion)))
+        for combinacion in itertools.product(*(valores[n] for n in nombres))
+    ]
+
+
+def leer_candidatos(especificaciones: Sequence[str]) -> list[Candidato]:
+    """Candidatos de ``"modelo"`` o ``"modelo:param=v1,v2;otro=v3"``"""
+    candidatos: list[Candidato] = []
+    for especificacion in especificaciones:
+        modelo, _, parametros = especificacion.partition(":")
+        valores = {}
+        for parametro in filter(None, parametros.split(";")):
+            nombre, _, lista = parametro.partition("=")
+            valores[nombre.strip()] = [_valor(v.strip()) for v in lista.split(",")]
+        candidatos += rejilla(modelo.strip(), **valores)
+    return candidatos
+
+
+@dataclass
+class ResultadoPliegue:
+    """Resultado de un candidato en un pliegue"""
+
+    candidato: str
+    pliegue: int
+    metricas: dict[str, float]
+    segundos_ajuste: float
+    segundos_prediccion: float
+    n_entrenamiento: int
+    n_prueba: int
+    error: str | None = None
+
+
+@dataclass
+class ResumenCandidato:
+    """Métricas medias (y su desviación) de un candidato en todos los pliegues"""
+
+    candidato: str
+    pliegues: int = 0
+    metricas: dict[str, float] = field(default_factory=dict)
+    desviaciones: dict[str, float] = field(default_factory=dict)
+    segundos_ajuste: float = 0.0
+    segundos_prediccion: float = 0.0
+    errores: list[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class Pliegue:
+    """Rutas de los arrays preprocesados de un pliegue (``.npy``)"""
+
+    indice: int
+    x_entrenamiento: str
+    y_entrenamiento: str
+    x_prueba: str
+    y_prueba: str
+
+
+def _guardar_array(ruta: Path, array: np.ndarray) -> None:
+    """Escribir ``array`` como ``.npy`` que los procesos abren con memmap.
+
+    El nombre del directorio ya identifica el contenido: si existe no se
+    vuelve a escribir.
+    """
+    if ruta.exists():
+        return
+    tmp = ruta.with_name(ruta.name + ".part")
+    with open(tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(tmp, ruta)
+
+
+def _preparar_pliegue(datos: dict[str, str], indice: int, directorio: str) -> Pliegue:
+    """Ajustar escalador y codificador con el entrenamiento del pliegue y
+    guardar las matrices transformadas.
+
+    Los datos de entrada también se leen por memmap: las numéricas como
+    ``float64`` y las categóricas ya factorizadas a enteros.
+    """
+    numericas = np.load(datos["numericas"], mmap_mode="r")
+    categoricas = np.load(datos["categoricas"], mmap_mode="r")
+    y = np.load(datos["y"], mmap_mode="r")
+    entrenamiento = np.load(datos[f"entrenamiento_{indice}"], mmap_mode="r")
+    prueba = np.load(datos[f"prueba_{indice}"], mmap_mode="r")
+
+    escalador = StandardScaler().fit(numericas[entrenamiento])
+    codificador = OneHotEncoder(
+        handle_unknown="ignore", sparse_output=False, dtype=np.float64
+    ).fit(categoricas[entrenamiento])
+
+    def transformar(filas: np.ndarray) -> np.ndarray:
+        bloques = [
+            # Los nulos (ignorados al ajustar) valen la media
+            np.nan_to_num(escalador.transform(numericas[filas])),
+            codificador.transform(categoricas[filas]),
+        ]
+        return np.hstack(bloques)
+
+    base = Path(directorio) / f"pliegue{indice}"
+    rutas = Pliegue(
+        indice,
+        f"{base}_x_entrenamiento.npy",
+        f"{base}_y_entrenamiento.npy",
+        f"{base}_x_prueba.npy",
+        f"{base}_y_prueba.npy",
+    )
+    _guardar_array(Path(rutas.x_entrenamiento), transformar(entrenamiento))
+    _guardar_array(Path(rutas.y_entrenamiento), y[entrenamiento])
+    _guardar_array(Path(rutas.x_prueba), transformar(prueba))
+    _guardar_array(Path(rutas.y_prueba), y[prueba])
+    return rutas
+
+
+def _metricas(
+    y: np.ndarray, prediccion: np.ndarray, clasificacion: bool
+) -> dict[str, float]:
+    if clasificacion:
+        from sklearn.metrics import accuracy_score, f1_score
+
+        return {
+            "exactitud": float(accuracy_score(y, prediccion)),
+            "f1_macro": float(f1_score(y, prediccion, average="macro")),
+        }
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    return {
+        "r2": float(r2_score(y, prediccion)),
+        "rmse": float(np.sqrt(mean_squared_error(y, prediccion))),
+        "mae": float(mean_absolute_error(y, prediccion)),
+    }
+
+
+def _evaluar(
+    candidato: Candidato, pliegue: Pliegue, clasificacion: bool
+) -> ResultadoPliegue:
+    """Ajustar y evaluar un candidato en un pliegue (en un proceso del pool)"""
+    x_entrenamiento = np.load(pliegue.x_entrenamiento, mmap_mode="r")
+    y_entrenamiento = np.load(pliegue.y_entrenamiento, mmap_mode="r")
+    x_prueba = np.load(pliegue.x_prueba, mmap_mode="r")
+    y_prueba = np.load(pliegue.y_prueba, mmap_mode="r")
+    resultado = ResultadoPliegue(
+        candidato.nombre,
+        pliegue.indice,
+        {},
+        0.0,
+        0.0,
+        len(y_entrenamiento),
+        len(y_prueba),
+    )
+    try:
+        modelo = candidato.crear()
+        inicio = time.perf_counter()
+        modelo.fit(x_entrenamiento, y_entrenamiento)
+        resultado.segundos_ajuste = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        prediccion = modelo.predict(x_prueba)
+        resultado.segundos_prediccion = time.perf_counter() - inicio
+    except Exception as e:
+        # Hiperparámetros inválidos o modelo inexistente: no detiene el resto
+        resultado.error = f"{type(e).__name__}: {e}"
+        return resultado
+    resultado.metricas = _metricas(y_prueba, prediccion, clasificacion)
+    return resultado
+
+
+def _huella(*partes: Any) -> str:
+    contenido = json.dumps(partes, sort_keys=True, default=str)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()[:16]
+
+
+class ValidacionCruzada:
+    """Validación cruzada de varios candidatos en un pool de procesos.
+
+    Los datos se escriben una vez como ``.npy`` y los procesos los abren con
+    memmap, así que ningún array viaja por pickle. Cada pliegue se
+    preprocesa una sola vez (``StandardScaler`` para las numéricas y
+    ``OneHotEncoder`` para las categóricas, ajustados con su parte de
+    entrenamiento) y todos los candidatos de ese pliegue usan el resultado.
+    Con ``directorio`` los pliegues preparados se conservan entre
+    ejecuciones con los mismos datos y parámetros.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        objetivo: str,
+        *,
+        numericas: Sequence[str] | None = None,
+        categoricas: Sequence[str] | None = None,
+        pliegues: int = PLIEGUES,
+        semilla: int = 0,
+        directorio: str | Path | None = None,
+    ):
+        if objetivo not in df.columns:
+            raise ValueError(f"No existe la columna objetivo '{objetivo}'")
+        self.objetivo = objetivo
+        self.numericas = [
+            c for c in (numericas or NUMERICAS) if c in df.columns and c != objetivo
+        ]
+        self.categoricas = [
+            c for c in (categoricas or CATEGORICAS) if c in df.columns and c != objetivo
+        ]
+        if not self.numericas and not self.categoricas:
+            raise ValueError("No hay columnas de entrada para el modelo")
+
+        df = df[df[objetivo].notna()]
+        self.clasificacion = not pd.api.types.is_numeric_dtype(df[objetivo])
+        self.clases: list[str] = []
+        if self.clasificacion:
+            # Clases como enteros: un memmap no admite dtype object
+            clases, y_array = np.unique(
+                df[objetivo].astype(str).to_numpy(), return_inverse=True
+            )
+            self.clases = list(clases)
+        else:
+            y_array = df[objetivo].to_numpy(np.float64)
+        self.pliegues = pliegues
+        self.semilla = semilla
+        self.filas = len(df)
+
+        numericas_array = (
+            df[self.numericas]
+            .apply(pd.to_numeric, errors="coerce")
+            .to_numpy(np.float64)
+        )
+        # Códigos enteros (-1 = nulo, una categoría más) para el codificador
+        categoricas_array = np.column_stack(
+            [pd.factorize(df[c])[0] for c in self.categoricas]
+            or [np.zeros(len(df), dtype=np.int64)]
+        )
+
+        huella = _huella(
+            objetivo,
+            self.numericas,
+            self.categoricas,
+            pliegues,
+            semilla,
+            hashlib.sha256(numericas_array.tobytes()).hexdigest(),
+            hashlib.sha256(categoricas_array.tobytes()).hexdigest(),
+            hashlib.sha256(y_array.tobytes()).hexdigest(),
+        )
+        self._temporal = None
+        if directorio is None:
+            self._temporal = tempfile.TemporaryDirectory(prefix="validacion_")
+            directorio = self._temporal.name
+        self.directorio = Path(directorio) / huella
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+        self.datos = {
+            "numericas": str(self.directorio / "numericas.npy"),
+            "categoricas": str(self.directorio / "categoricas.npy"),
+            "y": str(self.directorio / "y.npy"),
+        }
+        divisor = (
+            StratifiedKFold(pliegues, shuffle=True, random_state=semilla)
+            if self.clasificacion
+            else KFold(pliegues, shuffle=True, random_state=semilla)
+        )
+        for i, (entrenamiento, prueba) in enumerate(
+            divisor.split(numericas_array, y_array)
+        ):
+            self.datos[f"entrenamiento_{i}"] = str(
+                self.directorio / f"entrenamiento_{i}.npy"
+            )
+            self.datos[f"prueba_{i}"] = str(self.directorio / f"prueba_{i}.npy")
+            _guardar_array(Path(self.datos[f"entrenamiento_{i}"]), entrenamiento)
+            _guardar_array(Path(self.datos[f"prueba_{i}"]), prueba)
+        _guardar_array(Path(self.datos["numericas"]), numericas_array)
+        _guardar_array(Path(self.datos["categoricas"]), categoricas_array)
+        _guardar_array(Path(self.datos["y"]), y_array)
+
+    def _pliegue_guardado(self, indice: int) -> Pliegue | None:
+        base = self.directorio / f"pliegue{indice}"
+        pliegue = Pliegue(
+            indice,
+            f"{base}_x_entrenamiento.npy",
+            f"{base}_y_entrenamiento.npy",
+            f"{base}_x_prueba.npy",
+            f"{base}_y_prueba.npy",
+        )
+        rutas = (
+            pliegue.x_entrenamiento,
+            pliegue.y_entrenamiento,
+            pliegue.x_prueba,
+            pliegue.y_prueba,
+        )
+        return pliegue if all(os.path.exists(r) for r in rutas) else None
+
+    def ejecutar(
+        self, candidatos: Sequence[Candidato], *, procesos: int | None = None
+    ) -> Iterator[ResultadoPliegue]:
+        """Producir cada resultado en cuanto termina.
+
+        Los pliegues se preparan en el pool y los candidatos de cada uno se
+        envían en cuanto su pliegue está listo.
+        """
+        procesos = procesos or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            pendientes: dict[Future[Any], str] = {}
+
+            def enviar_candidatos(pliegue: Pliegue) -> None:
+                for candidato in candidatos:
+                    futuro = pool.submit(
+                        _evaluar, candidato, pliegue, self.clasificacion
+                    )
+                    pendientes[futuro] = "evaluacion"
+
+            for i in range(self.pliegues):
+                guardado = self._pliegue_guardado(i)
+                if guardado is not None:
+                    enviar_candidatos(guardado)
+                    continue
+                futuro = pool.submit(
+                    _preparar_pliegue,
+                    self.datos,
+                    i,
+                    str(self.directorio),
+                )
+                pendientes[futuro] = "pliegue"
+
+            try:
+                while pendientes:
+                    listos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                    for futuro in listos:
+                        tipo = pendientes.pop(futuro)
+                        if tipo == "pliegue":
+                            enviar_candidatos(futuro.result())
+                        else:
+                            yield futuro.result()
+            finally:
+                for futuro in pendientes:
+                    futuro.cancel()
+
+    def cerrar(self) -> None:
+        if self._temporal is not None:
+            self._temporal.cleanup()
+
+    def __enter__(self) -> "ValidacionCruzada":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.cerrar()
+
+
+def resumir(resultados: Sequence[ResultadoPliegue]) -> list[ResumenCandidato]:
+    """Resumen por candidato, del mejor al peor (R² o exactitud media)"""
+    por_candidato: dict[str, list[ResultadoPliegue]] = {}
+    for resultado in resultados:
+        por_candidato.setdefault(resultado.candidato, []).append(resultado)
+
+    resumenes = []
+    for candidato, lista in por_candidato.items():
+        resumen = ResumenCandidato(candidato)
+        correctos = [r for r in lista if r.error is None]
+        resumen.errores = sorted({r.error for r in lista if r.error is not None})
+        resumen.pliegues = len(correctos)
+        resumen.segundos_ajuste = sum(r.segundos_ajuste for r in lista)
+        resumen.segundos_prediccion = sum(r.segundos_prediccion for r in lista)
+        for metrica in correctos[0].metricas if correctos else []:
+            valores = np.array([r.metricas[metrica] for r in correctos])
+            resumen.metricas[metrica] = float(valores.mean())
+            resumen.desviaciones[metrica] = float(valores.std())
+        resumenes.append(resumen)
+
+    def clave(resumen: ResumenCandidato) -> float:
+        metricas = resumen.metricas
+        return -metricas.get("r2", metricas.get("exactitud", -np.inf))
+
+    return sorted(resumenes, key=clave)
+
+
+def comparar_modelos(
+    df: pd.DataFrame,
+    objetivo: str,
+    candidatos: Sequence[Candidato],
+    *,
+    pliegues: int = PLIEGUES,
+    procesos: int | None = None,
+    semilla: int = 0,
+    directorio: str | Path | None = None,
+    salida: str | Path | None = None,
+    numericas: Sequence[str] | None = None,
+    categoricas: Sequence[str] | None = None,
+) -> list[ResumenCandidato]:
+    """Validación cruzada de ``candidatos`` mostrando cada pliegue al terminar.
+
+    Con ``salida`` cada resultado se añade además como una línea JSON en
+    cuanto llega, de modo que una ejecución larga se puede seguir (o
+    aprovechar si se interrumpe).
+    """
+    resultados = []
+    archivo = open(salida, "a", encoding="utf-8") if salida else None
+    try:
+        with ValidacionCruzada(
+            df,
+            objetivo,
+            numericas=numericas,
+            categoricas=categoricas,
+            pliegues=pliegues,
+            semilla=semilla,
+            directorio=directorio,
+        ) as validacion:
+            tipo = "clasificación" if validacion.clasificacion else "regresión"
+            print(
+                f"🔁 {len(candidatos)} candidatos × {pliegues} pliegues "
+                f"({tipo} de {objetivo}, {validacion.filas} filas)"
+            )
+            for resultado in validacion.ejecutar(candidatos, procesos=procesos):
+                resultados.append(resultado)
+                if archivo is not None:
+                    archivo.write(
+                        json.dumps(asdict(resultado), ensure_ascii=False) + "\n"
+                    )
+                    archivo.flush()
+                if resultado.error:
+                    detalle = f"❌ {resultado.error}"
+                else:
+                    detalle = ", ".join(
+                        f"{k}={v:.3f}" for k, v in resultado.metricas.items()
+                    )
+                print(
+                    f"  {resultado.candidato} [pliegue {resultado.pliegue}]: {detalle} "
+                    f"(ajuste {resultado.segundos_ajuste:.2f} s)"
+                )
+    finally:
+        if archivo is not None:
+            archivo.close()
+    return resumir(resultados)
+
+
+def imprimir_comparacion(resumenes: Sequence[ResumenCandidato]) -> None:
+    """Tabla de candidatos ordenada por la métrica principal"""
+    print("\n🏆 Comparación de modelos:")
+    for posicion, resumen in enumerate(resumenes, 1):
+        if not resumen.metricas:
+            print(f"  {posicion}. {resumen.candidato}: ❌ {'; '.join(resumen.errores)}")
+            continue
+        metricas = ", ".join(
+            f"{k}={v:.3f}±{resumen.desviaciones[k]:.3f}"
+            for k, v in resumen.metricas.items()
+        )
+        print(
+            f"  {posicion}. {resumen.candidato}: {metricas} "
+            f"(ajuste {resumen.segundos_ajuste:.2f} s, "
+            f"predicción {resumen.segundos_prediccion:.2f} s, "
+            f"{resumen.pliegues} pliegues)"
+        )
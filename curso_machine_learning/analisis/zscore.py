@@ -0,0 +1,347 @@
+"""
+Puntajes Z antropométricos con el método LMS de los patrones de crecimiento OMS
+"""
+
+import functools
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from curso_machine_learning.analisis.eda import leer_bloques
+
+# Directorio con las tablas LMS oficiales de la OMS (no se distribuyen con el
+# proyecto): los archivos de referencia de igrowup/anthro, por ejemplo
+# ``weianthro.txt`` con columnas ``sex age l m s``
+DIRECTORIO_TABLAS = Path(os.environ.get("CURSO_ML_TABLAS_OMS", "tablas_oms"))
+ARCHIVO_COMPILADO = "lms_oms.npz"
+
+# Días por mes usados por la OMS para pasar la edad en meses a días
+DIAS_POR_MES = 30.4375
+# A partir de esta edad se usa la estatura (de pie) en lugar de la longitud
+EDAD_ESTATURA_MESES = 24
+
+CLASIFICACIONES = (
+    "DESNUTRICIÓN SEVERA",
+    "DESNUTRICIÓN MODERADA",
+    "DESNUTRICIÓN LEVE",
+    "NORMAL",
+    "SOBREPESO/OBESIDAD",
+)
+# Cortes de clasificación: z < -3, < -2, < -1, <= 2 y el resto (incluido NaN)
+CORTES = np.array([-3.0, -2.0, -1.0, np.nextafter(2.0, np.inf)])
+
+
+@dataclass(frozen=True)
+class Indicador:
+    """Tabla de referencia de un indicador"""
+
+    archivo: str
+    # Indicadores de peso: fuera de ±3 DE la OMS usa la distancia entre DE
+    restringido: bool
+
+
+INDICADORES = {
+    "peso_edad": Indicador("weianthro.txt", True),
+    "talla_edad": Indicador("lenanthro.txt", False),
+    "peso_longitud": Indicador("wflanthro.txt", True),
+    "peso_estatura": Indicador("wfhanthro.txt", True),
+    "imc_edad": Indicador("bmianthro.txt", True),
+}
+
+# Clasificación que se calcula a partir de cada columna de puntaje Z
+COLUMNAS_CLASIFICACION = {
+    "PESO_TALLA_Z": "CLASIFICACION_P_T",
+    "TALLA_EDAD_Z": "CLASIFICACION_T_E",
+    "PESO_EDAD_Z": "CLASIFICACION_P_E",
+    "IMC_EDAD_Z": "CLASIFICACION_IMC_E",
+}
+
+
+@dataclass
+class TablaLMS:
+    """Parámetros L, M y S por sexo sobre una rejilla común.
+
+    ``lms`` tiene forma ``(2, 3, n)``: sexo (1 = masculino, 2 = femenino),
+    parámetro (L, M, S) y punto de la rejilla ``eje`` (días o cm). Si la
+    rejilla es regular la posición de cada valor se calcula con aritmética
+    en lugar de una búsqueda binaria.
+    """
+
+    eje: np.ndarray
+    lms: np.ndarray
+
+    @functools.cached_property
+    def paso(self) -> float | None:
+        """Paso de la rejilla si es regular"""
+        pasos = np.diff(self.eje)
+        if len(pasos) and np.allclose(pasos, pasos[0], rtol=0, atol=1e-9):
+            return float(pasos[0])
+        return None
+
+    def interpolar(
+        self, sexo: np.ndarray, x: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """L, M y S interpolados linealmente; NaN fuera de la rejilla o sin sexo"""
+        x = np.asarray(x, dtype=float)
+        n = len(self.eje)
+        paso = self.paso
+        if paso is not None:
+            posicion = (x - self.eje[0]) / paso
+        else:
+            posicion = np.interp(x, self.eje, np.arange(n, dtype=float))
+        # Tolerancia para valores como 45.0 que llegan como 44.99999 en float32
+        fuera = ~((posicion >= -1e-6) & (posicion <= n - 1 + 1e-6))
+        fuera |= (sexo != 1) & (sexo != 2)
+        posicion = np.clip(np.nan_to_num(posicion), 0, n - 1)
+        i = np.minimum(posicion.astype(np.intp), n - 2)
+        f = posicion - i
+        fila = np.where(fuera, 0, sexo - 1)
+
+        resultado = []
+        for p in range(3):
+            valores = self.lms[fila, p, i] * (1 - f) + self.lms[fila, p, i + 1] * f
+            valores[fuera] = np.nan
+            resultado.append(valores)
+        return resultado[0], resultado[1], resultado[2]
+
+    def z(
+        self, y: np.ndarray, sexo: np.ndarray, x: np.ndarray, *, restringido: bool
+    ) -> np.ndarray:
+        """Puntaje Z de la medida ``y`` para el sexo y la edad/talla ``x``"""
+        l, m, s = self.interpolar(sexo, x)
+        y = np.asarray(y, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            l_nulo = np.abs(l) < 1e-12
+            z = np.where(
+                l_nulo,
+                np.log(y / m) / s,
+                ((y / m) ** l - 1) / (np.where(l_nulo, 1, l) * s),
+            )
+            if not restringido:
+                return z
+
+            # Ajuste de la OMS fuera de ±3 DE para las distribuciones asimétricas
+            def de(k: float) -> np.ndarray:
+                return m * (1 + l * s * k) ** (1 / np.where(l_nulo, 1, l))
+
+            de3, de2 = de(3), de(2)
+            de3n, de2n = de(-3), de(-2)
+            z = np.where(z > 3, 3 + (y - de3) / (de3 - de2), z)
+            z = np.where(z < -3, -3 + (y - de3n) / (de2n - de3n), z)
+        return z
+
+
+def _leer_tabla(ruta: Path) -> TablaLMS:
+    """Leer una tabla ``sex <eje> l m s [...]`` de la OMS"""
+    df = pd.read_csv(ruta, sep=r"[\s,;]+", engine="python")
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    faltan = {"sex", "l", "m", "s"} - set(df.columns)
+    if faltan:
+        raise ValueError(f"{ruta.name}: faltan las columnas {sorted(faltan)}")
+    eje_col = df.columns[1]
+
+    ejes, parametros = [], []
+    for sexo in (1, 2):
+        parte = df[df["sex"] == sexo].sort_values(eje_col)
+        if parte.empty:
+            raise ValueError(f"{ruta.name}: no hay filas para sex={sexo}")
+        ejes.append(parte[eje_col].to_numpy(float))
+        parametros.append(parte[["l", "m", "s"]].to_numpy(float).T)
+    if len(ejes[0]) != len(ejes[1]) or not np.allclose(ejes[0], ejes[1]):
+        raise ValueError(f"{ruta.name}: la rejilla difiere entre sexos")
+    return TablaLMS(ejes[0], np.stack(parametros))
+
+
+class ReferenciasOMS:
+    """Tablas LMS de todos los indicadores, compiladas a un ``.npz``"""
+
+    def __init__(self, tablas: dict[str, TablaLMS]):
+        self.tablas = tablas
+
+    @classmethod
+    def desde_textos(
+        cls, directorio: str | Path = DIRECTORIO_TABLAS
+    ) -> "ReferenciasOMS":
+        """Leer los archivos de texto oficiales de ``directorio``"""
+        directorio = Path(directorio)
+        faltan = [
+            i.archivo
+            for i in INDICADORES.values()
+            if not (directorio / i.archivo).exists()
+        ]
+        if faltan:
+            raise FileNotFoundError(
+                f"Faltan tablas OMS en '{directorio}': {', '.join(faltan)}. "
+                "Descárguelas de los patrones de crecimiento infantil de la OMS "
+                "(archivos de referencia de igrowup/anthro)."
+            )
+        return cls(
+            {
+                nombre: _leer_tabla(directorio / i.archivo)
+                for nombre, i in INDICADORES.items()
+            }
+        )
+
+    def guardar(self, ruta: str | Path) -> Path:
+        """Guardar las tablas como arreglos NumPy en un ``.npz``"""
+        arreglos = {}
+        for nombre, tabla in self.tablas.items():
+            arreglos[f"{nombre}.eje"] = tabla.eje
+            arreglos[f"{nombre}.lms"] = tabla.lms
+        np.savez(ruta, **arreglos)
+        return Path(ruta)
+
+    @classmethod
+    def desde_npz(cls, ruta: str | Path) -> "ReferenciasOMS":
+        """Cargar tablas compiladas con ``guardar``"""
+        with np.load(ruta) as datos:
+            return cls(
+                {
+                    nombre: TablaLMS(datos[f"{nombre}.eje"], datos[f"{nombre}.lms"])
+                    for nombre in INDICADORES
+                }
+            )
+
+    def zscores(
+        self,
+        peso_kg: np.ndarray,
+        talla_cm: np.ndarray,
+        edad_meses: np.ndarray,
+        sexo: np.ndarray,
+    ) -> dict[str, np.ndarray]:
+        """Los cuatro puntajes Z, como ``{columna: arreglo float32}``"""
+        peso = np.asarray(peso_kg, dtype=float)
+        talla = np.asarray(talla_cm, dtype=float)
+        edad = np.asarray(edad_meses, dtype=float)
+        sexo = np.asarray(sexo)
+        dias = edad * DIAS_POR_MES
+        imc = peso / (talla / 100) ** 2
+        tablas = self.tablas
+
+        def z(nombre: str, y: np.ndarray, x: np.ndarray) -> np.ndarray:
+            restringido = INDICADORES[nombre].restringido
+            return tablas[nombre].z(y, sexo, x, restringido=restringido)
+
+        # Peso para la longitud antes de los 24 meses, para la estatura después
+        peso_talla = np.where(
+            edad < EDAD_ESTATURA_MESES,
+            z("peso_longitud", peso, talla),
+            z("peso_estatura", peso, talla),
+        )
+        resultado = {
+            "PESO_TALLA_Z": peso_talla,
+            "TALLA_EDAD_Z": z("talla_edad", talla, dias),
+            "PESO_EDAD_Z": z("peso_edad", peso, dias),
+            "IMC_EDAD_Z": z("imc_edad", imc, dias),
+        }
+        return {col: valores.astype(np.float32) for col, valores in resultado.items()}
+
+
+@functools.cache
+def cargar_referencias(directorio: str | Path = DIRECTORIO_TABLAS) -> ReferenciasOMS:
+    """Tablas OMS compiladas; el ``.npz`` se rehace si cambian los textos.
+
+    Se guarda en memoria por proceso, así que los procesos de un pool solo
+    leen el ``.npz`` una vez.
+    """
+    directorio = Path(directorio)
+    if directorio.suffix == ".npz":
+        return ReferenciasOMS.desde_npz(directorio)
+
+    compilado = directorio / ARCHIVO_COMPILADO
+    textos = [directorio / i.archivo for i in INDICADORES.values()]
+    if compilado.exists() and all(
+        not t.exists() or t.stat().st_mtime <= compilado.stat().st_mtime for t in textos
+    ):
+        return ReferenciasOMS.desde_npz(compilado)
+
+    referencias = ReferenciasOMS.desde_textos(directorio)
+    referencias.guardar(compilado)
+    return referencias
+
+
+def codigos_sexo(sexo: pd.Series | np.ndarray) -> np.ndarray:
+    """1 (masculino), 2 (femenino) o 0 a partir de textos o códigos"""
+    serie = pd.Series(sexo)
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.fillna(0).to_numpy(np.int8)
+    categorias = serie.astype("category")
+    mapa = np.array(
+        [
+            (
+                1
+                if str(c).strip().upper()[:1] in ("M", "H", "1")
+                else 2 if str(c).strip().upper()[:1] in ("F", "2") else 0
+            )
+            for c in categorias.cat.categories
+        ]
+        + [0],
+        dtype=np.int8,
+    )
+    # El código -1 (nulo) toma el último elemento del mapa
+    return mapa[categorias.cat.codes.to_numpy()]
+
+
+def clasificar_z(z: np.ndarray) -> np.ndarray:
+    """Índice de ``CLASIFICACIONES`` de cada puntaje, en una sola pasada"""
+    return np.searchsorted(CORTES, np.asarray(z, dtype=float), side="right").astype(
+        np.int8
+    )
+
+
+def clasificar(z: np.ndarray) -> pd.Categorical:
+    """Clasificación nutricional de cada puntaje Z como categoría"""
+    return pd.Categorical.from_codes(clasificar_z(z), categories=CLASIFICACIONES)
+
+
+def agregar_zscores(
+    df: pd.DataFrame, referencias: ReferenciasOMS, *, clasificar_columnas: bool = True
+) -> pd.DataFrame:
+    """Calcular (o sustituir) los puntajes Z y sus clasificaciones en ``df``"""
+    zscores = referencias.zscores(
+        df["PESO_KG"].to_numpy(),
+        df["TALLA_CM"].to_numpy(),
+        df["EDAD_MESES"].to_numpy(),
+        codigos_sexo(df["SEXO"]),
+    )
+    for columna, valores in zscores.items():
+        df[columna] = valores
+        if clasificar_columnas:
+            df[COLUMNAS_CLASIFICACION[columna]] = clasificar(valores)
+    return df
+
+
+def zscores_por_bloques(
+    ruta: str | Path,
+    referencias: ReferenciasOMS,
+    *,
+    tamano_bloque: int = 250_000,
+) -> Iterator[pd.DataFrame]:
+    """Leer ``ruta`` por bloques y producir cada bloque con sus puntajes Z"""
+    for bloque in leer_bloques(ruta, tamano_bloque=tamano_bloque):
+        yield agregar_zscores(bloque, referencias)
+
+
+def calcular_zscores_archivo(
+    ruta: str | Path,
+    destino: str | Path,
+    referencias: ReferenciasOMS,
+    *,
+    tamano_bloque: int = 250_000,
+) -> tuple[Path, int]:
+    """Escribir en ``destino`` (CSV) el archivo con los puntajes Z calculados"""
+    destino = Path(destino)
+    parcial = destino.with_name(destino.name + ".part")
+    filas = 0
+    with open(parcial, "w", encoding="utf-8", newline="") as f:
+        for i, bloque in enumerate(
+            zscores_por_bloques(ruta, referencias, tamano_bloque=tamano_bloque)
+        ):
+            bloque.to_csv(f, index=False, header=i == 0)
+            filas += len(bloque)
+    os.replace(parcial, destino)
+    return destino, filas
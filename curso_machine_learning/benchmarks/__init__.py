@@ -0,0 +1,3 @@
+"""
+Mediciones de rendimiento del paquete (ejecutables con ``python -m``)
+"""
@@ -0,0 +1,90 @@
+"""
+Presupuesto de tiempo de arranque de la línea de comandos.
+
+Uso: ``python -m curso_machine_learning.benchmarks.arranque`` (o la prueba
+``tests/test_arranque.py``). Termina con código 1 si algún subcomando supera
+su presupuesto o importa una librería pesada antes de empezar a trabajar.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from curso_machine_learning.cli import MODULOS
+
+# Módulos de referencia, medidos en la misma máquina: el mínimo que cualquier
+# subcomando tiene que importar (la mayor parte del arranque es urllib3)
+REFERENCIA = ("urllib3",)
+
+# Cada subcomando puede tardar hasta MARGEN veces la referencia en importar
+# la CLI y sus módulos (sin contar el arranque del intérprete)
+MARGEN = 2.5
+
+# Librerías que ningún subcomando debe importar al arrancar
+PESADAS = ("pandas", "numpy", "matplotlib", "seaborn", "pyarrow", "sklearn")
+
+CODIGO = """
+import importlib, json, sys, time
+inicio = time.perf_counter()
+for nombre in sys.argv[1:]:
+    importlib.import_module(nombre)
+segundos = time.perf_counter() - inicio
+pesadas = [m for m in {pesadas!r} if m in sys.modules]
+print(json.dumps({{"segundos": segundos, "pesadas": pesadas}}))
+"""
+
+
+def _medir_modulos(
+    modulos: list[str], repeticiones: int = 5
+) -> tuple[float, list[str]]:
+    """Mejor tiempo de importación de ``modulos`` en un intérprete nuevo"""
+    raiz = str(Path(__file__).resolve().parents[2])
+    entorno = {**os.environ, "PYTHONPATH": raiz}
+    codigo = CODIGO.format(pesadas=PESADAS)
+    resultados = []
+    for _ in range(repeticiones):
+        salida = subprocess.run(
+            [sys.executable, "-c", codigo, *modulos],
+            capture_output=True,
+            text=True,
+            check=True,
+            env=entorno,
+        ).stdout
+        resultados.append(json.loads(salida))
+    mejor = min(resultados, key=lambda r: r["segundos"])
+    return float(mejor["segundos"]), list(mejor["pesadas"])
+
+
+def medir(comando: str, repeticiones: int = 5) -> tuple[float, list[str]]:
+    """Mejor tiempo de importación de ``comando`` y librerías pesadas cargadas"""
+    modulos = ["curso_machine_learning.cli", *MODULOS[comando]]
+    return _medir_modulos(modulos, repeticiones)
+
+
+def presupuesto(repeticiones: int = 5) -> float:
+    """Segundos permitidos a cada subcomando en esta máquina"""
+    referencia, _ = _medir_modulos(list(REFERENCIA), repeticiones)
+    return referencia * MARGEN
+
+
+def main() -> int:
+    """Medir todos los subcomandos y comprobar los presupuestos"""
+    limite = presupuesto()
+    fallos = 0
+    for comando in MODULOS:
+        segundos, pesadas = medir(comando)
+        correcto = segundos <= limite and not pesadas
+        fallos += not correcto
+        marca = "✅" if correcto else "❌"
+        detalle = f" (importa {', '.join(pesadas)})" if pesadas else ""
+        print(
+            f"{marca} {comando}: {segundos * 1000:.1f} ms "
+            f"(presupuesto {limite * 1000:.0f} ms){detalle}"
+        )
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
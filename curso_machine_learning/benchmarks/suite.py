@@ -0,0 +1,420 @@
+"""
+Benchmarks de ingesta, generación, EDA y gráficos con varios tamaños.
+
+Uso::
+
+    python -m curso_machine_learning.benchmarks.suite --tamanos 1000 100000
+    python -m curso_machine_learning.benchmarks.suite --completo --base base.json
+
+Cada caso se mide dos veces: una para el tiempo de pared y otra con
+``tracemalloc`` para el pico de memoria (su sobrecoste no contamina el
+tiempo). ``tracemalloc`` ve las reservas de Python y NumPy, no las de
+Arrow. Los resultados se guardan en JSON y, con ``--base``, se comparan
+contra una ejecución anterior: el código de salida es 1 si algún caso
+empeora más que ``--tolerancia``.
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+TAMANOS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+TAMANOS_RAPIDOS = (1_000, 10_000, 100_000)
+
+# El servidor local guarda los registros como dicts: más allá de este tamaño
+# la memoria del propio servidor domina la medición
+MAX_FILAS_DESCARGA = 1_000_000
+
+TOLERANCIA = 0.25
+# Diferencias menores se consideran ruido aunque superen la tolerancia
+MIN_DIFERENCIA_SEGUNDOS = 0.01
+
+
+@dataclass
+class Resultado:
+    """Medición de un caso para un tamaño"""
+
+    caso: str
+    filas: int
+    segundos: float
+    filas_por_segundo: float
+    pico_bytes: int | None
+
+
+@contextlib.contextmanager
+def _en_directorio(ruta: Path) -> Iterator[None]:
+    anterior = os.getcwd()
+    os.chdir(ruta)
+    try:
+        yield
+    finally:
+        os.chdir(anterior)
+
+
+def _malnutricion() -> Any:
+    return importlib.import_module(
+        "curso_machine_learning.casos.descargar_malnutricion"
+    )
+
+
+class Datos:
+    """Datos de entrada compartidos por los casos de un mismo tamaño"""
+
+    def __init__(self, filas: int, directorio: Path):
+        self.filas = filas
+        self.directorio = directorio
+        self._df: Any = None
+
+    @property
+    def csv(self) -> Path:
+        """CSV simulado de ``filas`` filas (generado una vez)"""
+        ruta = self.directorio / "malnutricion_simulados_bogota.csv"
+        if not ruta.exists():
+            with (
+                _en_directorio(self.directorio),
+                contextlib.redirect_stdout(io.StringIO()),
+            ):
+                _malnutricion().DescargadorDatosMalnutricion().generar_datos_simulados(
+                    n_muestras=self.filas
+                )
+        return ruta
+
+    @property
+    def df(self) -> Any:
+        """DataFrame compacto cargado desde el CSV"""
+        if self._df is None:
+            from curso_machine_learning.infraestructura.esquema import cargar_compacto
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                self._df = cargar_compacto(self.csv, autodetectar=True)
+        return self._df
+
+
+# Cada caso recibe los datos y devuelve la función a medir, o el par
+# ``(medir, cerrar)`` si deja recursos abiertos: la preparación y el cierre
+# (detener un servidor, borrar temporales) quedan fuera de la medición
+Preparado = Callable[[], Any] | tuple[Callable[[], Any], Callable[[], Any]]
+Caso = Callable[[Datos], Preparado]
+
+
+def caso_descarga(datos: Datos) -> Preparado:
+    """``fetch_all_records`` contra el servidor CKAN local"""
+    from curso_machine_learning.infraestructura.ckan import fetch_all_records
+    from curso_machine_learning.infraestructura.servidor_ckan_local import (
+        ServidorCKANLocal,
+    )
+
+    registros = datos.df.to_dict("records")
+    servidor = ServidorCKANLocal({"benchmark": registros})
+    servidor.iniciar()
+    # Los registros ya están copiados en el servidor
+    del registros
+
+    def medir() -> Any:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fetch_all_records(
+                "benchmark", limit=32000, concurrency=4, base_url=servidor.url
+            )
+
+    return medir, servidor.detener
+
+
+def caso_lotes(datos: Datos) -> Preparado:
+    """``ingerir_lote`` de 8 recursos contra el servidor CKAN local"""
+    from curso_machine_learning.infraestructura.lotes import (
+        EstadoLotes,
+        Recurso,
+        ingerir_lote,
+    )
+    from curso_machine_learning.infraestructura.servidor_ckan_local import (
+        ServidorCKANLocal,
+    )
+    from curso_machine_learning.infraestructura.sincronizacion import (
+        CacheSincronizacion,
+    )
+
+    registros = datos.df.to_dict("records")
+    partes = 8
+    servidor = ServidorCKANLocal(
+        {f"recurso{i}": registros[i::partes] for i in range(partes)}
+    )
+    servidor.iniciar()
+    del registros
+    tmp = tempfile.TemporaryDirectory()
+    recursos = [
+        Recurso(f"recurso{i}", Path(tmp.name) / f"recurso{i}.csv", servidor.url)
+        for i in range(partes)
+    ]
+
+    def medir() -> Any:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return ingerir_lote(
+                recursos,
+                tasa=1000.0,
+                limit=32000,
+                estado=EstadoLotes(Path(tmp.name) / "lotes.json"),
+                cache=CacheSincronizacion(Path(tmp.name) / "cache"),
+            )
+
+    def cerrar() -> None:
+        servidor.detener()
+        tmp.cleanup()
+
+    return medir, cerrar
+
+
+def caso_generacion(datos: Datos) -> Callable[[], Any]:
+    """``generar_datos_simulados``"""
+    descargador = _malnutricion().DescargadorDatosMalnutricion()
+
+    def medir() -> Any:
+        with tempfile.TemporaryDirectory() as tmp, _en_directorio(Path(tmp)):
+            with contextlib.redirect_stdout(io.StringIO()):
+                return descargador.generar_datos_simulados(n_muestras=datos.filas)
+
+    return medir
+
+
+def caso_clasificacion(datos: Datos) -> Callable[[], Any]:
+    """``_clasificar_nutricion`` sobre un vector de Z-scores"""
+    import numpy as np
+
+    z = np.random.default_rng(0).normal(-0.5, 2, datos.filas)
+    descargador = _malnutricion().DescargadorDatosMalnutricion()
+    return lambda: descargador._clasificar_nutricion(z)
+
+
+def caso_carga_csv(datos: Datos) -> Callable[[], Any]:
+    """Carga de ``analizar_datos`` desde el CSV (incluye la conversión)"""
+    from curso_machine_learning.infraestructura.almacen import (
+        ruta_columnar,
+        ruta_esquema,
+    )
+    from curso_machine_learning.infraestructura.esquema import cargar_compacto
+
+    csv = datos.csv
+    for ruta in (ruta_columnar(csv), ruta_esquema(ruta_columnar(csv))):
+        ruta.unlink(missing_ok=True)
+
+    def medir() -> Any:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return cargar_compacto(csv, autodetectar=True)
+
+    return medir
+
+
+def caso_carga_columnar(datos: Datos) -> Callable[[], Any]:
+    """Carga de ``analizar_datos`` con la versión columnar ya creada"""
+    from curso_machine_learning.infraestructura.esquema import cargar_compacto
+
+    datos.df  # crea la versión columnar
+    return lambda: cargar_compacto(datos.csv, autodetectar=True)
+
+
+def caso_agregaciones(datos: Datos) -> Callable[[], Any]:
+    """Agregaciones de ``_analizar_malnutricion_especifico``"""
+    descargador = _malnutricion().DescargadorDatosMalnutricion()
+    df = datos.df
+
+    def medir() -> Any:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return descargador._analizar_malnutricion_especifico(df)
+
+    return medir
+
+
+def caso_graficos(datos: Datos) -> Callable[[], Any]:
+    """``_crear_visualizaciones`` (modo automático según el tamaño)"""
+    descargador = _malnutricion().DescargadorDatosMalnutricion()
+    df = datos.df
+    destino = datos.directorio / "benchmark_analisis.png"
+
+    def medir() -> Any:
+        with contextlib.redirect_stdout(io.StringIO()):
+            descargador._crear_visualizaciones(df, str(destino))
+
+    return medir
+
+
+CASOS: dict[str, Caso] = {
+    "descarga": caso_descarga,
+    "lotes": caso_lotes,
+    "generacion": caso_generacion,
+    "clasificacion": caso_clasificacion,
+    "carga_csv": caso_carga_csv,
+    "carga_columnar": caso_carga_columnar,
+    "agregaciones": caso_agregaciones,
+    "graficos": caso_graficos,
+}
+
+
+@contextlib.contextmanager
+def _preparar(nombre: str, datos: Datos) -> Iterator[Callable[[], Any]]:
+    """Función a medir del caso; su cierre se ejecuta al salir"""
+    preparado = CASOS[nombre](datos)
+    funcion, cerrar = preparado if isinstance(preparado, tuple) else (preparado, None)
+    try:
+        yield funcion
+    finally:
+        if cerrar is not None:
+            cerrar()
+
+
+def medir_caso(nombre: str, datos: Datos, *, memoria: bool = True) -> Resultado:
+    """Tiempo de pared y, opcionalmente, pico de memoria de un caso"""
+    with _preparar(nombre, datos) as funcion:
+        inicio = time.perf_counter()
+        funcion()
+        segundos = time.perf_counter() - inicio
+
+    pico = None
+    if memoria:
+        with _preparar(nombre, datos) as funcion:
+            tracemalloc.start()
+            try:
+                funcion()
+                pico = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    return Resultado(nombre, datos.filas, segundos, datos.filas / segundos, pico)
+
+
+def ejecutar(
+    tamanos: tuple[int, ...] | list[int],
+    casos: list[str] | None = None,
+    *,
+    memoria: bool = True,
+) -> list[Resultado]:
+    """Medir los casos pedidos para cada tamaño"""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    # Importar de antemano lo que los casos cargan de forma perezosa, para no
+    # medir el tiempo de importación en el primer caso
+    import matplotlib.pyplot  # noqa: F401
+    import pandas  # noqa: F401
+
+    importlib.import_module("curso_machine_learning.analisis.graficos")
+    importlib.import_module("curso_machine_learning.infraestructura.esquema")
+    resultados = []
+    for filas in tamanos:
+        with tempfile.TemporaryDirectory() as tmp:
+            datos = Datos(filas, Path(tmp))
+            for nombre in casos or list(CASOS):
+                if nombre in ("descarga", "lotes") and filas > MAX_FILAS_DESCARGA:
+                    continue
+                resultado = medir_caso(nombre, datos, memoria=memoria)
+                pico = (
+                    f"{resultado.pico_bytes / 1e6:.1f} MB"
+                    if resultado.pico_bytes is not None
+                    else "-"
+                )
+                print(
+                    f"⏱️ {nombre:<15} {filas:>10} filas  {resultado.segundos:8.3f} s  "
+                    f"{resultado.filas_por_segundo:12.0f} filas/s  pico {pico}"
+                )
+                resultados.append(resultado)
+    return resultados
+
+
+def guardar(resultados: list[Resultado], ruta: str | Path) -> None:
+    """Guardar los resultados con datos del entorno"""
+    informe = {
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "resultados": [asdict(r) for r in resultados],
+    }
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(informe, f, ensure_ascii=False, indent=2)
+
+
+def comparar(
+    resultados: list[Resultado],
+    base: dict[str, Any],
+    *,
+    tolerancia: float = TOLERANCIA,
+) -> list[str]:
+    """Casos que empeoran más que ``tolerancia`` respecto a la base"""
+    anteriores = {(r["caso"], r["filas"]): r for r in base.get("resultados", [])}
+    regresiones = []
+    for r in resultados:
+        previo = anteriores.get((r.caso, r.filas))
+        if previo is None:
+            continue
+        factor = r.segundos / previo["segundos"]
+        diferencia = r.segundos - previo["segundos"]
+        if factor > 1 + tolerancia and diferencia > MIN_DIFERENCIA_SEGUNDOS:
+            regresiones.append(
+                f"{r.caso} ({r.filas} filas): {previo['segundos']:.3f} s → "
+                f"{r.segundos:.3f} s (x{factor:.2f})"
+            )
+        if r.pico_bytes and previo.get("pico_bytes"):
+            factor = r.pico_bytes / previo["pico_bytes"]
+            if factor > 1 + tolerancia:
+                regresiones.append(
+                    f"{r.caso} ({r.filas} filas): pico {previo['pico_bytes'] / 1e6:.1f}"
+                    f" MB → {r.pico_bytes / 1e6:.1f} MB (x{factor:.2f})"
+                )
+    return regresiones
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Ejecutar la suite desde la línea de comandos"""
+    parser = argparse.ArgumentParser(
+        description="Benchmarks de ingesta, generación, EDA y gráficos"
+    )
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS_RAPIDOS)
+    parser.add_argument(
+        "--completo", action="store_true", help=f"usar los tamaños {TAMANOS}"
+    )
+    parser.add_argument("--casos", nargs="+", choices=list(CASOS))
+    parser.add_argument("--salida", default="benchmarks.json")
+    parser.add_argument("--base", help="JSON de una ejecución anterior")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    parser.add_argument(
+        "--actualizar-base", action="store_true", help="guardar el resultado en --base"
+    )
+    parser.add_argument(
+        "--sin-memoria", action="store_true", help="no medir el pico de memoria"
+    )
+    args = parser.parse_args(argv)
+
+    tamanos = TAMANOS if args.completo else args.tamanos
+    resultados = ejecutar(tamanos, args.casos, memoria=not args.sin_memoria)
+    guardar(resultados, args.salida)
+    print(f"💾 Resultados guardados en '{args.salida}'")
+
+    if not args.base:
+        return 0
+    if args.actualizar_base or not Path(args.base).exists():
+        guardar(resultados, args.base)
+        print(f"💾 Base actualizada en '{args.base}'")
+        return 0
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    regresiones = comparar(resultados, base, tolerancia=args.tolerancia)
+    for regresion in regresiones:
+        print(f"❌ Regresión: {regresion}")
+    if not regresiones:
+        print(f"✅ Sin regresiones respecto a '{args.base}'")
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,12 +1,11 @@
-import pandas as pd
-import requests
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
-from io import StringIO
-import ssl
 import urllib3
 
+# pandas, numpy, matplotlib y los módulos de análisis se importan dentro de las
+# funciones que los usan: descargar no debe pagar su tiempo de importación
+from curso_machine_learning.infraestructura import trazas
+from curso_machine_learning.infraestructura.cliente_http import ErrorHTTP
+from curso_machine_learning.infraestructura.descarga import descargar_a_archivo
+
 # Desactivar advertencias SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -18,22 +17,15 @@ def descargar_dataset():
     print("📥 Descargando dataset de malnutrición en Bogotá...")
     
     try:
-        # Crear contexto SSL que no verifique certificados
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        
-        response = requests.get(URL_DATASET, verify=False, timeout=30)
-        response.raise_for_status()
-        
-        # Guardar archivo localmente
-        with open('malnutricion_bogota.csv', 'w', encoding='utf-8') as f:
-            f.write(response.text)
+        # Descargar por bloques (con gzip) directamente al archivo local
+        resultado = descargar_a_archivo(URL_DATASET, 'malnutricion_bogota.csv', timeout=30)
         
         print("✅ Dataset descargado exitosamente como 'malnutricion_bogota.csv'")
-        return response.text
+        print(f"   {resultado.bytes_escritos} bytes ({resultado.bytes_red} transferidos)")
+        trazas.registrar(bytes=resultado.bytes_red)
+        return resultado.ruta
         
-    except requests.exceptions.RequestException as e:
+    except (ErrorHTTP, urllib3.exceptions.HTTPError) as e:
         print(f"❌ Error al descargar el dataset: {e}")
         print("💡 Intentando con datos de ejemplo...")
         return generar_datos_ejemplo()
@@ -43,6 +35,9 @@ def descargar_dataset():
 
 def generar_datos_ejemplo():
     """Generar datos de ejemplo para demostración"""
+    import numpy as np
+    import pandas as pd
+    
     print("📊 Generando datos de ejemplo...")
     
     np.random.seed(42)
@@ -64,20 +59,27 @@ def generar_datos_ejemplo():
     df.to_csv('malnutricion_bogota.csv', index=False)
     
     print("✅ Datos de ejemplo generados y guardados como 'malnutricion_bogota.csv'")
-    return df.to_csv(index=False)
+    return 'malnutricion_bogota.csv'
 
-def cargar_y_analizar_datos(csv_content):
+def cargar_y_analizar_datos(csv_path, columnas=None):
     """Cargar y analizar los datos del dataset"""
-    if csv_content is None:
+    from curso_machine_learning.infraestructura.esquema import (
+        cargar_compacto,
+        imprimir_reporte_memoria,
+    )
+    
+    if csv_path is None:
         return None
     
     print("\n Cargando y analizando datos...")
     
     try:
-        # Cargar datos desde el contenido CSV
-        df = pd.read_csv(StringIO(csv_content))
+        # Cargar datos (versión columnar memory-mapped, solo las columnas pedidas)
+        # con tipos compactos: categorías, enteros pequeños y float32
+        df = cargar_compacto(csv_path, columnas, autodetectar=True)
         
         print(f" Dataset cargado: {df.shape[0]} filas, {df.shape[1]} columnas")
+        imprimir_reporte_memoria(df)
         
         # Mostrar información básica
         print("\n Información del dataset:")
@@ -101,6 +103,8 @@ def cargar_y_analizar_datos(csv_content):
 
 def analizar_malnutricion(df):
     """Análisis específico de malnutrición"""
+    import numpy as np
+    
     if df is None:
         return
     
@@ -112,7 +116,7 @@ def analizar_malnutricion(df):
     print(f"\n Columnas numéricas encontradas: {numeric_cols}")
     
     # Identificar columnas categóricas
-    categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
+    categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
     print(f" Columnas categóricas encontradas: {categorical_cols}")
     
     # Análisis de valores nulos
@@ -127,7 +131,8 @@ def analizar_malnutricion(df):
     
     return numeric_cols, categorical_cols
 
-def crear_visualizaciones(df, numeric_cols, categorical_cols):
+def crear_visualizaciones(df, numeric_cols, categorical_cols, csv_path=None,
+                          modo_grande=None, separados=False, procesos=1):
     """Crear visualizaciones básicas"""
     if df is None or len(numeric_cols) == 0:
         print("\n No hay suficientes datos numéricos para visualizaciones")
@@ -135,7 +140,73 @@ def crear_visualizaciones(df, numeric_cols, categorical_cols):
     
     print("\n Creando visualizaciones...")
     
+    from curso_machine_learning.analisis.cache import CacheAnalisis
+    from curso_machine_learning.analisis.graficos import DPI, es_grande, guardar_paneles
+    
+    if modo_grande is None:
+        modo_grande = es_grande(df)
+    
+    if separados:
+        # Un archivo por panel, dibujados en paralelo con el backend Agg
+        rutas = guardar_paneles(paneles_basicos(df, numeric_cols), 'analisis_malnutricion.png',
+                                procesos=procesos)
+        print(f" {len(rutas)} paneles guardados junto a 'analisis_malnutricion.png'")
+        return
+    
+    if csv_path is not None:
+        # Figura (con la matriz de correlación) guardada por contenido del CSV
+        CacheAnalisis().figura(csv_path, 'crear_visualizaciones',
+                               {'numeric_cols': numeric_cols, 'modo_grande': modo_grande, 'dpi': DPI},
+                               lambda destino: dibujar_visualizaciones(df, numeric_cols, destino, modo_grande),
+                               'analisis_malnutricion.png')
+        return
+    
+    dibujar_visualizaciones(df, numeric_cols, modo_grande=modo_grande)
+
+def paneles_basicos(df, numeric_cols):
+    """Paneles de las visualizaciones básicas, pre-agregados para datos grandes"""
+    from curso_machine_learning.analisis.graficos import (
+        Panel,
+        panel_boxplot,
+        panel_correlacion,
+        panel_histograma,
+    )
+    
+    col = numeric_cols[0]
+    paneles = [
+        panel_histograma('distribucion', df[col], bins=30, color='skyblue',
+                         titulo=f'Distribución de {col}', xlabel=col),
+        panel_boxplot('boxplot', df, numeric_cols),
+    ]
+    if len(numeric_cols) > 1:
+        paneles.append(panel_correlacion('correlacion', df, numeric_cols))
+    else:
+        paneles.append(Panel('correlacion', 'texto', 'Matriz de Correlación',
+                             {'texto': 'Se necesitan más variables\nnuméricas para correlación'}))
+    
+    summary_text = "Resumen Estadístico:\n\n"
+    for col in numeric_cols[:3]:  # Mostrar hasta 3 variables
+        summary_text += f"{col}:\n"
+        summary_text += f"  Media: {df[col].mean():.2f}\n"
+        summary_text += f"  Mediana: {df[col].median():.2f}\n"
+        summary_text += f"  Desv. Std: {df[col].std():.2f}\n\n"
+    paneles.append(Panel('resumen', 'texto', 'Resumen Estadístico', {'texto': summary_text}))
+    return paneles
+
+def dibujar_visualizaciones(df, numeric_cols, output_filename='analisis_malnutricion.png', modo_grande=False):
+    """Dibujar y guardar la figura de visualizaciones básicas"""
+    import matplotlib.pyplot as plt
+    
+    from curso_machine_learning.analisis.graficos import DPI, MAX_ANOTACIONES, guardar_cuadricula
+    
     try:
+        if modo_grande:
+            # Histogramas y cajas calculados con NumPy, sin un artista por punto
+            guardar_cuadricula(paneles_basicos(df, numeric_cols), output_filename, forma=(2, 2),
+                               figsize=(15, 12), titulo='Análisis de Malnutrición en Bogotá')
+            print(f" Visualizaciones guardadas como '{output_filename}'")
+            return
+        
         # Configurar estilo
         plt.style.use('seaborn-v0_8')
         fig, axes = plt.subplots(2, 2, figsize=(15, 12))
@@ -167,11 +238,12 @@ def crear_visualizaciones(df, numeric_cols, categorical_cols):
             axes[1, 0].set_xticklabels(numeric_cols, rotation=45)
             axes[1, 0].set_yticklabels(numeric_cols)
             
-            # Añadir valores de correlación
-            for i in range(len(numeric_cols)):
-                for j in range(len(numeric_cols)):
-                    axes[1, 0].text(j, i, f'{correlation_matrix.iloc[i, j]:.2f}', 
-                                   ha='center', va='center', color='black')
+            # Añadir valores de correlación (solo si la matriz es legible)
+            if len(numeric_cols) <= MAX_ANOTACIONES:
+                for i in range(len(numeric_cols)):
+                    for j in range(len(numeric_cols)):
+                        axes[1, 0].text(j, i, f'{correlation_matrix.iloc[i, j]:.2f}', 
+                                       ha='center', va='center', color='black')
         else:
             axes[1, 0].text(0.5, 0.5, 'Se necesitan más variables\nnuméricas para correlación', 
                            ha='center', va='center', transform=axes[1, 0].transAxes)
@@ -192,43 +264,38 @@ def crear_visualizaciones(df, numeric_cols, categorical_cols):
         axes[1, 1].set_title('Resumen Estadístico')
         
         plt.tight_layout()
-        plt.savefig('analisis_malnutricion.png', dpi=300, bbox_inches='tight')
-        print(" Visualizaciones guardadas como 'analisis_malnutricion.png'")
+        plt.savefig(output_filename, dpi=DPI, bbox_inches='tight')
+        print(f" Visualizaciones guardadas como '{output_filename}'")
         
     except Exception as e:
         print(f" Error al crear visualizaciones: {e}")
 
 def main():
     """Función principal del análisis"""
+    from curso_machine_learning.casos.pipeline_malnutricion import (
+        DISTRIBUCIONES,
+        FIGURA,
+        FIGURA_BASICA,
+        ejecutar,
+    )
+    
     print("🏥 Análisis de Malnutrición en Niños menores de 5 años en Bogotá")
     print("=" * 70)
     
-    # Paso 1: Descargar dataset
-    csv_content = descargar_dataset()
-    
-    # Paso 2: Cargar y analizar datos
-    df = cargar_y_analizar_datos(csv_content)
+    # Pipeline compartido con descargar_malnutricion.py: solo se rehacen las
+    # etapas cuyas entradas cambiaron
+    resultados = ejecutar(modo='directo')
     
-    if df is None:
-        print("❌ No se pudieron cargar los datos. Finalizando análisis.")
-        return
-    
-    # Paso 3: Análisis específico
-    resultado_analisis = analizar_malnutricion(df)
-    
-    if resultado_analisis is None:
-        print("❌ No se pudo completar el análisis específico. Finalizando.")
+    if any(r.estado in ('error', 'bloqueada') for r in resultados.values()):
+        print("❌ No se pudo completar el análisis.")
         return
     
-    numeric_cols, categorical_cols = resultado_analisis
-    
-    # Paso 4: Crear visualizaciones
-    crear_visualizaciones(df, numeric_cols, categorical_cols)
-    
     print("\n🎉 Análisis completado!")
     print("📁 Archivos generados:")
     print("  - malnutricion_bogota.csv (datos originales)")
-    print("  - analisis_malnutricion.png (visualizaciones)")
+    print(f"  - {FIGURA_BASICA} (visualizaciones)")
+    print(f"  - {FIGURA} (visualizaciones de malnutrición)")
+    print(f"  - {DISTRIBUCIONES} (distribuciones por columna)")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
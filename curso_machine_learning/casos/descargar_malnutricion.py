@@ -2,19 +2,136 @@
 Script para descargar y procesar datos de malnutrición en Bogotá
 """
 
-import pandas as pd
-import requests
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import StringIO
+import os
 import ssl
 import urllib3
 import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# pandas, numpy, matplotlib y los módulos de análisis se importan dentro de las
+# funciones que los usan: descargar no debe pagar su tiempo de importación
+from curso_machine_learning.infraestructura import trazas
+from curso_machine_learning.infraestructura.cliente_http import ClienteHTTP
+from curso_machine_learning.infraestructura.sincronizacion import (
+    CacheSincronizacion,
+    EstadisticasURL,
+    descargar_condicional,
+)
 
 # Desactivar advertencias SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+LOCALIDADES = ['USAQUEN', 'CHAPINERO', 'SANTA FE', 'SAN CRISTOBAL', 'USME', 
+               'BOSA', 'KENNEDY', 'FONTIBON', 'ENGATIVA', 'SUBA',
+               'BARRIOS UNIDOS', 'TEUSAQUILLO', 'LOS MARTIRES', 'ANTONIO NARIÑO',
+               'PUENTE ARANDA', 'LA CANDELARIA', 'RAFAEL URIBE URIBE', 'CIUDAD BOLIVAR',
+               'SUMAPAZ', 'TUNJUELITO']
+
+CLASIFICACIONES = ('DESNUTRICIÓN SEVERA', 'DESNUTRICIÓN MODERADA', 'DESNUTRICIÓN LEVE',
+                   'NORMAL', 'SOBREPESO/OBESIDAD')
+
+# Timeout (s) de las URLs en modo carrera: sin reintentos, una perdedora que
+# no responde no debe retener el proceso más que esto
+TIMEOUT_CARRERA = 5
+
+# Paneles de las visualizaciones, en el orden de la cuadrícula de 2x3
+PANELES = ('edad', 'peso', 'localidad', 'clasificacion', 'evolucion', 'peso_talla')
+
+
+def clasificar_nutricion(z_scores):
+    """Clasificar estado nutricional según Z-score (vectorizado)"""
+    import numpy as np
+    
+    from curso_machine_learning.analisis.zscore import clasificar_z
+    
+    # Una sola pasada de búsqueda sobre los cortes; NaN -> SOBREPESO/OBESIDAD
+    # como en la versión elemento a elemento
+    return np.array(CLASIFICACIONES, dtype=object)[clasificar_z(z_scores)]
+
+
+def generar_bloque_simulado(n_muestras, semilla, tablas_oms=None):
+    """Generar un bloque de datos simulados con su propio generador.
+    
+    Con ``tablas_oms`` (directorio con las tablas LMS de la OMS) los puntajes
+    Z y sus clasificaciones se calculan a partir de peso, talla, edad y sexo
+    en lugar de sortearse.
+    """
+    import numpy as np
+    import pandas as pd
+    
+    if isinstance(semilla, np.random.SeedSequence):
+        rng = np.random.RandomState(np.random.MT19937(semilla))
+    else:
+        rng = np.random.RandomState(semilla)
+    
+    datos = {
+        'AÑO': rng.choice([2019, 2020, 2021, 2022, 2023, 2024], n_muestras),
+        'TRIMESTRE': rng.choice(['T1', 'T2', 'T3', 'T4'], n_muestras),
+        'LOCALIDAD': rng.choice(LOCALIDADES, n_muestras),
+        'EDAD_MESES': rng.randint(0, 60, n_muestras),
+        'SEXO': rng.choice(['MASCULINO', 'FEMENINO'], n_muestras),
+        'PESO_KG': rng.normal(12, 4, n_muestras),
+        'TALLA_CM': rng.normal(85, 20, n_muestras),
+        'PESO_TALLA_Z': rng.normal(0, 2, n_muestras),
+        'TALLA_EDAD_Z': rng.normal(-0.5, 1.5, n_muestras),
+        'PESO_EDAD_Z': rng.normal(-0.3, 1.8, n_muestras),
+        'IMC_EDAD_Z': rng.normal(0.2, 1.6, n_muestras),
+        'CLASIFICACION_P_T': clasificar_nutricion(rng.normal(-0.5, 2, n_muestras)),
+        'CLASIFICACION_T_E': clasificar_nutricion(rng.normal(-0.8, 1.5, n_muestras)),
+        'CLASIFICACION_P_E': clasificar_nutricion(rng.normal(-0.3, 1.8, n_muestras)),
+        'CLASIFICACION_IMC_E': clasificar_nutricion(rng.normal(0.2, 1.6, n_muestras)),
+        'TIPO_ATENCION': rng.choice(['PÚBLICA', 'PRIVADA'], n_muestras, p=[0.7, 0.3]),
+        'REGIMEN_AFILIACION': rng.choice(['CONTRIBUTIVO', 'SUBSIDIADO', 'NO AFILIADO'], 
+                                         n_muestras, p=[0.4, 0.5, 0.1])
+    }
+    
+    # Ajustar pesos y tallas según edad. El ruido se toma intercalado (peso, talla)
+    # por fila, igual que el antiguo bucle que llamaba a normal() dos veces por fila
+    ruido = rng.standard_normal((n_muestras, 2))
+    edad = datos['EDAD_MESES']
+    datos['PESO_KG'] = np.maximum(2, 3 + (edad * 0.5) + ruido[:, 0])
+    datos['TALLA_CM'] = np.maximum(40, 50 + (edad * 1.5) + 5 * ruido[:, 1])
+    
+    df = pd.DataFrame(datos)
+    
+    # Calcular IMC
+    df['IMC'] = df['PESO_KG'] / ((df['TALLA_CM']/100) ** 2)
+    
+    if tablas_oms is not None:
+        from curso_machine_learning.analisis.zscore import agregar_zscores, cargar_referencias
+        agregar_zscores(df, cargar_referencias(tablas_oms))
+    
+    return df
+
+
+def _bloque_simulado_csv(n_muestras, semilla, cabecera, tablas_oms=None):
+    """Generar un bloque y devolverlo ya formateado como CSV"""
+    df = generar_bloque_simulado(n_muestras, semilla, tablas_oms)
+    return df.to_csv(index=False, header=cabecera)
+
+
+def _generar_en_orden(tamanos, semillas, procesos, tablas_oms=None):
+    """Generar los bloques como texto CSV (en un pool de procesos si procesos > 1) en orden"""
+    cabeceras = [i == 0 for i in range(len(tamanos))]
+    if procesos <= 1:
+        for n, semilla, cabecera in zip(tamanos, semillas, cabeceras):
+            yield _bloque_simulado_csv(n, semilla, cabecera, tablas_oms)
+        return
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    # Ventana acotada: como mucho `procesos` bloques pendientes en memoria
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        pendientes = deque()
+        for n, semilla, cabecera in zip(tamanos, semillas, cabeceras):
+            pendientes.append(pool.submit(_bloque_simulado_csv, n, semilla, cabecera, tablas_oms))
+            if len(pendientes) >= procesos:
+                yield pendientes.popleft().result()
+        while pendientes:
+            yield pendientes.popleft().result()
+
 class DescargadorDatosMalnutricion:
     """Clase para descargar y procesar datos de malnutrición"""
     
@@ -23,8 +140,19 @@ class DescargadorDatosMalnutricion:
         self.dataset_id = "9776e238-8f4a-40d4-a473-37e9cc0b2ef0"
         self.resource_id = "c8fe2dd0-5ad1-4023-86b2-135026f7ecf1"
         self.datos_url = f"{self.base_url}/dataset/{self.dataset_id}/resource/{self.resource_id}/download/metadato_malnutricion5anos.csv"
+        self.cache = CacheSincronizacion()
+        self.estadisticas = EstadisticasURL()
+        self._cache_analisis = None
     
-    def descargar_datos_reales(self):
+    @property
+    def cache_analisis(self):
+        """Caché de resultados de análisis (creada al usarla por primera vez)"""
+        if self._cache_analisis is None:
+            from curso_machine_learning.analisis.cache import CacheAnalisis
+            self._cache_analisis = CacheAnalisis()
+        return self._cache_analisis
+    
+    def descargar_datos_reales(self, modo_carrera=False):
         """Intentar descargar los datos reales del dataset"""
         print("🔍 Buscando datos reales de malnutrición...")
         
@@ -35,145 +163,304 @@ class DescargadorDatosMalnutricion:
             "https://www.datos.gov.co/api/views/gt2j-8ykr/rows.csv?accessType=DOWNLOAD"
         ]
         
-        for i, url in enumerate(urls_alternativas, 1):
+        # Ordenar según latencia y fallos de ejecuciones anteriores
+        candidatos = sorted(
+            enumerate(urls_alternativas, 1),
+            key=lambda par: self.estadisticas.prioridad(par[1])
+        )
+        
+        if modo_carrera:
+            return self._descargar_en_carrera(candidatos)
+        
+        for i, url in candidatos:
             print(f"📡 Intentando URL {i}: {url[:50]}...")
             
+            filename = f'malnutricion_datos_reales_{i}.csv'
+            inicio = time.perf_counter()
             try:
-                response = requests.get(url, verify=False, timeout=30)
-                response.raise_for_status()
+                # Descarga condicional y por bloques directamente a disco
+                ruta = descargar_condicional(
+                    url, filename, cache=self.cache, validar=self._parece_csv, timeout=30
+                )
                 
-                # Verificar si es CSV válido
-                if 'csv' in response.headers.get('content-type', '') or ',' in response.text[:100]:
+                if ruta is not None:
+                    self.estadisticas.registrar(url, 'ok', time.perf_counter() - inicio)
                     print(f"✅ Datos encontrados en URL {i}")
-                    
-                    # Guardar datos
-                    filename = f'malnutricion_datos_reales_{i}.csv'
-                    with open(filename, 'w', encoding='utf-8') as f:
-                        f.write(response.text)
-                    
                     print(f"💾 Datos guardados como '{filename}'")
-                    return response.text, filename
+                    return filename
+                
+                self.estadisticas.registrar(url, 'invalido', time.perf_counter() - inicio)
                     
             except Exception as e:
+                self.estadisticas.registrar(url, 'error', time.perf_counter() - inicio)
                 print(f"❌ Error en URL {i}: {e}")
                 continue
         
-        return None, None
+        return None
     
-    def generar_datos_simulados(self):
-        """Generar datos simulados realistas de malnutrición"""
-        print("📊 Generando datos simulados de malnutrición...")
+    def _descargar_en_carrera(self, candidatos):
+        """Lanzar todas las URLs a la vez y quedarse con la primera válida"""
+        print(f"🏁 Lanzando {len(candidatos)} URLs en paralelo...")
+        
+        cancelar = threading.Event()
+        lock = threading.Lock()
+        ganador = []
+        # Cliente propio sin reintentos: las perdedoras no reintentan timeouts
+        # y sus conexiones se cierran al decidirse la carrera
+        cliente = ClienteHTTP(maxsize=len(candidatos), intentos=0, timeout=TIMEOUT_CARRERA)
+        
+        def reclamar(i):
+            # Solo la primera respuesta válida gana; las demás se cancelan
+            with lock:
+                if ganador:
+                    return False
+                ganador.append(i)
+            cancelar.set()
+            return True
         
-        np.random.seed(42)
-        n_muestras = 2000
-        
-        # Generar datos realistas
-        localidades = ['USAQUEN', 'CHAPINERO', 'SANTA FE', 'SAN CRISTOBAL', 'USME', 
-                      'BOSA', 'KENNEDY', 'FONTIBON', 'ENGATIVA', 'SUBA',
-                      'BARRIOS UNIDOS', 'TEUSAQUILLO', 'LOS MARTIRES', 'ANTONIO NARIÑO',
-                      'PUENTE ARANDA', 'LA CANDELARIA', 'RAFAEL URIBE URIBE', 'CIUDAD BOLIVAR',
-                      'SUMAPAZ', 'TUNJUELITO']
-        
-        datos = {
-            'AÑO': np.random.choice([2019, 2020, 2021, 2022, 2023, 2024], n_muestras),
-            'TRIMESTRE': np.random.choice(['T1', 'T2', 'T3', 'T4'], n_muestras),
-            'LOCALIDAD': np.random.choice(localidades, n_muestras),
-            'EDAD_MESES': np.random.randint(0, 60, n_muestras),
-            'SEXO': np.random.choice(['MASCULINO', 'FEMENINO'], n_muestras),
-            'PESO_KG': np.random.normal(12, 4, n_muestras),
-            'TALLA_CM': np.random.normal(85, 20, n_muestras),
-            'PESO_TALLA_Z': np.random.normal(0, 2, n_muestras),
-            'TALLA_EDAD_Z': np.random.normal(-0.5, 1.5, n_muestras),
-            'PESO_EDAD_Z': np.random.normal(-0.3, 1.8, n_muestras),
-            'IMC_EDAD_Z': np.random.normal(0.2, 1.6, n_muestras),
-            'CLASIFICACION_P_T': self._clasificar_nutricion(np.random.normal(-0.5, 2, n_muestras)),
-            'CLASIFICACION_T_E': self._clasificar_nutricion(np.random.normal(-0.8, 1.5, n_muestras)),
-            'CLASIFICACION_P_E': self._clasificar_nutricion(np.random.normal(-0.3, 1.8, n_muestras)),
-            'CLASIFICACION_IMC_E': self._clasificar_nutricion(np.random.normal(0.2, 1.6, n_muestras)),
-            'TIPO_ATENCION': np.random.choice(['PÚBLICA', 'PRIVADA'], n_muestras, p=[0.7, 0.3]),
-            'REGIMEN_AFILIACION': np.random.choice(['CONTRIBUTIVO', 'SUBSIDIADO', 'NO AFILIADO'], 
-                                                 n_muestras, p=[0.4, 0.5, 0.1])
-        }
-        
-        # Ajustar pesos y tallas según edad
-        for i in range(n_muestras):
-            edad = datos['EDAD_MESES'][i]
-            # Peso esperado según edad (fórmula simplificada)
-            peso_esperado = 3 + (edad * 0.5) + np.random.normal(0, 1)
-            datos['PESO_KG'][i] = max(2, peso_esperado)
+        def intentar(i, url):
+            filename = f'malnutricion_datos_reales_{i}.csv'
+            inicio = time.perf_counter()
+            rechazada = []
+            
+            def validar(texto, content_type):
+                if not self._parece_csv(texto, content_type):
+                    rechazada.append(True)
+                    return False
+                return reclamar(i)
+            
+            try:
+                ruta = descargar_condicional(
+                    url, filename, cache=self.cache, validar=validar,
+                    timeout=TIMEOUT_CARRERA, cancelar=cancelar, cliente=cliente,
+                    retries=cliente.retry
+                )
+            except Exception as e:
+                # Un timeout de una perdedora después de decidirse no es un fallo
+                resultado = 'cancelado' if cancelar.is_set() else 'error'
+                self.estadisticas.registrar(url, resultado, time.perf_counter() - inicio)
+                if resultado == 'error':
+                    print(f"❌ Error en URL {i}: {e}")
+                return None
             
-            # Talla esperada según edad
-            talla_esperada = 50 + (edad * 1.5) + np.random.normal(0, 5)
-            datos['TALLA_CM'][i] = max(40, talla_esperada)
+            latencia = time.perf_counter() - inicio
+            # Una respuesta 304 no pasa por validar: reclamar aquí
+            if ruta is not None and (ganador == [i] or reclamar(i)):
+                self.estadisticas.registrar(url, 'ok', latencia)
+                print(f"✅ Datos encontrados en URL {i} ({latencia:.2f} s)")
+                return filename
+            
+            resultado = 'invalido' if rechazada or not cancelar.is_set() else 'cancelado'
+            self.estadisticas.registrar(url, resultado, latencia)
+            return None
         
-        df = pd.DataFrame(datos)
+        pool = ThreadPoolExecutor(max_workers=len(candidatos))
+        try:
+            futures = [pool.submit(intentar, i, url) for i, url in candidatos]
+            for future in as_completed(futures):
+                filename = future.result()
+                if filename is not None:
+                    print(f"💾 Datos guardados como '{filename}'")
+                    return filename
+        finally:
+            # No esperar a las descargas perdedoras
+            cancelar.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+            cliente.pool.clear()
         
-        # Calcular IMC
-        df['IMC'] = df['PESO_KG'] / ((df['TALLA_CM']/100) ** 2)
+        return None
+    
+    @staticmethod
+    def _parece_csv(inicio, content_type):
+        """Verificar si la respuesta es un CSV válido"""
+        return 'csv' in content_type or ',' in inicio[:100]
+    
+    def generar_datos_simulados(self, n_muestras=2000, tamano_bloque=1_000_000, procesos=1, semilla=42,
+                                tablas_oms=None):
+        """Generar datos simulados realistas de malnutrición"""
+        import numpy as np
         
-        # Guardar datos
+        print("📊 Generando datos simulados de malnutrición...")
+        
+        # Un solo bloque reproduce exactamente la secuencia de np.random.seed(semilla);
+        # con varios bloques cada uno recibe un flujo independiente de SeedSequence
+        n_bloques = max(1, -(-n_muestras // tamano_bloque))
+        tamanos = [tamano_bloque] * (n_bloques - 1) + [n_muestras - tamano_bloque * (n_bloques - 1)]
+        if n_bloques == 1:
+            semillas = [semilla]
+        else:
+            semillas = np.random.SeedSequence(semilla).spawn(n_bloques)
+        
+        # Guardar datos bloque a bloque, sin tener todo el dataset en memoria
         filename = 'malnutricion_simulados_bogota.csv'
-        df.to_csv(filename, index=False, encoding='utf-8')
+        with open(filename, 'w', encoding='utf-8', newline='') as f:
+            for texto in _generar_en_orden(tamanos, semillas, procesos, tablas_oms):
+                f.write(texto)
         
         print(f"✅ Datos simulados generados y guardados como '{filename}'")
-        print(f"📈 Total de registros: {len(df)}")
+        print(f"📈 Total de registros: {n_muestras}")
         
-        return df.to_csv(index=False), filename
+        return filename
+    
+    def calcular_zscores(self, filename, tablas_oms=None, output_filename=None, tamano_bloque=250_000):
+        """Calcular los puntajes Z OMS de un archivo por bloques y guardarlos"""
+        from curso_machine_learning.analisis.zscore import (
+            DIRECTORIO_TABLAS,
+            calcular_zscores_archivo,
+            cargar_referencias,
+        )
+        
+        print("\n📏 Calculando puntajes Z con las tablas LMS de la OMS...")
+        
+        try:
+            referencias = cargar_referencias(tablas_oms or DIRECTORIO_TABLAS)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"❌ {e}")
+            return None
+        
+        output_filename = output_filename or str(filename).replace('.csv', '_zscores.csv')
+        with trazas.span('zscores', archivo=str(filename)) as span:
+            ruta, filas = calcular_zscores_archivo(
+                filename, output_filename, referencias, tamano_bloque=tamano_bloque
+            )
+            span.registrar(filas=filas)
+        
+        print(f"✅ {filas} registros con puntajes Z guardados en '{ruta}'")
+        return ruta
+    
+    def entrenar_modelos(self, filename, model_filename=None, epocas=1, tamano_bloque=250_000):
+        """Entrenar por bloques los clasificadores y regresores de puntajes Z"""
+        from curso_machine_learning.analisis.entrenamiento import entrenar_archivo
+        
+        print("\n🧠 Entrenando modelos incrementales por bloques...")
+        
+        try:
+            with trazas.span('entrenamiento', archivo=str(filename), epocas=epocas):
+                modelos = entrenar_archivo(filename, epocas=epocas, tamano_bloque=tamano_bloque)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"❌ {e}")
+            return None
+        
+        print("\n📏 Validación (última época):")
+        for objetivo, metricas in modelos.resumen().items():
+            detalle = ', '.join(f"{k}={v:.3f}" for k, v in metricas.items() if k != 'n')
+            print(f"  {objetivo}: {detalle} ({metricas['n']} filas)")
+        
+        model_filename = model_filename or str(filename).replace('.csv', '_modelos.pkl')
+        modelos.guardar(model_filename)
+        print(f"✅ Modelos guardados en '{model_filename}'")
+        return model_filename
+    
+    def predecir_modelos(self, filename, model_filename, output_filename=None, tamano_bloque=250_000):
+        """Escribir por bloques las predicciones de los modelos entrenados"""
+        from curso_machine_learning.analisis.entrenamiento import (
+            ModelosIncrementales,
+            predecir_archivo,
+        )
+        
+        print("\n🔮 Prediciendo por bloques...")
+        
+        modelos = ModelosIncrementales.cargar(model_filename)
+        output_filename = output_filename or str(filename).replace('.csv', '_predicciones.csv')
+        with trazas.span('prediccion', archivo=str(filename)) as span:
+            ruta, filas = predecir_archivo(filename, output_filename, modelos,
+                                           tamano_bloque=tamano_bloque)
+            span.registrar(filas=filas)
+        
+        print(f"✅ {filas} predicciones guardadas en '{ruta}'")
+        return ruta
+    
+    def comparar_modelos(self, filename, objetivo='PESO_KG', modelos=None, pliegues=5,
+                         procesos=None, output_filename=None):
+        """Validación cruzada en paralelo de varios modelos e hiperparámetros"""
+        import pandas as pd
+        
+        from curso_machine_learning.analisis.validacion import (
+            CANDIDATOS_CLASIFICACION,
+            CANDIDATOS_REGRESION,
+            comparar_modelos,
+            imprimir_comparacion,
+            leer_candidatos,
+        )
+        from curso_machine_learning.infraestructura.esquema import cargar_compacto
+        
+        print("\n🔁 Comparando modelos con validación cruzada...")
+        
+        try:
+            df = cargar_compacto(filename, autodetectar=True)
+            if modelos is None:
+                numerico = objetivo in df.columns and pd.api.types.is_numeric_dtype(df[objetivo])
+                modelos = CANDIDATOS_REGRESION if numerico else CANDIDATOS_CLASIFICACION
+            with trazas.span('validacion', archivo=str(filename), objetivo=objetivo):
+                resumenes = comparar_modelos(df, objetivo, leer_candidatos(modelos),
+                                             pliegues=pliegues, procesos=procesos,
+                                             salida=output_filename)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"❌ {e}")
+            return None
+        
+        imprimir_comparacion(resumenes)
+        if output_filename:
+            print(f"✅ Resultados por pliegue guardados en '{output_filename}'")
+        return resumenes
     
     def _clasificar_nutricion(self, z_scores):
         """Clasificar estado nutricional según Z-score"""
-        clasificaciones = []
-        for z in z_scores:
-            if z < -3:
-                clasificaciones.append('DESNUTRICIÓN SEVERA')
-            elif z < -2:
-                clasificaciones.append('DESNUTRICIÓN MODERADA')
-            elif z < -1:
-                clasificaciones.append('DESNUTRICIÓN LEVE')
-            elif z <= 2:
-                clasificaciones.append('NORMAL')
-            else:
-                clasificaciones.append('SOBREPESO/OBESIDAD')
-        return clasificaciones
-    
-    def analizar_datos(self, csv_content, filename):
+        return clasificar_nutricion(z_scores)
+    
+    def analizar_datos(self, filename, columnas=None, usar_cache=False):
         """Analizar los datos descargados"""
+        from curso_machine_learning.infraestructura.esquema import (
+            cargar_compacto,
+            imprimir_reporte_memoria,
+        )
+        
         print("\n📊 Analizando datos...")
         
         try:
-            df = pd.read_csv(StringIO(csv_content))
-            
-            print(f"✅ Dataset cargado: {df.shape[0]} filas, {df.shape[1]} columnas")
+            if usar_cache:
+                return self._analizar_datos_con_cache(filename, columnas)
             
-            # Información básica
-            print("\n📋 Información del dataset:")
-            print(df.info())
+            # Versión columnar memory-mapped, leyendo solo las columnas pedidas
+            # y con tipos compactos: categorías, enteros pequeños y float32
+            with trazas.span('lectura', archivo=filename) as span:
+                df = cargar_compacto(filename, columnas, autodetectar=True)
+                span.registrar(bytes=os.path.getsize(filename), filas=len(df))
             
-            print("\n📊 Estadísticas descriptivas:")
-            print(df.describe())
-            
-            print("\n🔍 Primeras 5 filas:")
-            print(df.head())
-            
-            print("\n📝 Columnas disponibles:")
-            for i, col in enumerate(df.columns, 1):
-                print(f"{i}. {col}")
-            
-            # Análisis de valores nulos
-            print("\n🔍 Análisis de valores nulos:")
-            null_counts = df.isnull().sum()
-            for col, null_count in null_counts.items():
-                if null_count > 0:
-                    print(f"  {col}: {null_count} ({null_count/len(df)*100:.1f}%)")
-            
-            if null_counts.sum() == 0:
-                print("  ✅ No se encontraron valores nulos")
-            
-            # Análisis de malnutrición
-            self._analizar_malnutricion_especifico(df)
+            print(f"✅ Dataset cargado: {df.shape[0]} filas, {df.shape[1]} columnas")
+            with trazas.span('analisis', filas=len(df)):
+                imprimir_reporte_memoria(df)
+                
+                # Información básica
+                print("\n📋 Información del dataset:")
+                print(df.info())
+                
+                print("\n📊 Estadísticas descriptivas:")
+                print(df.describe())
+                
+                print("\n🔍 Primeras 5 filas:")
+                print(df.head())
+                
+                print("\n📝 Columnas disponibles:")
+                for i, col in enumerate(df.columns, 1):
+                    print(f"{i}. {col}")
+                
+                # Análisis de valores nulos
+                print("\n🔍 Análisis de valores nulos:")
+                null_counts = df.isnull().sum()
+                for col, null_count in null_counts.items():
+                    if null_count > 0:
+                        print(f"  {col}: {null_count} ({null_count/len(df)*100:.1f}%)")
+                
+                if null_counts.sum() == 0:
+                    print("  ✅ No se encontraron valores nulos")
+                
+                # Análisis de malnutrición
+                self._analizar_malnutricion_especifico(df)
             
             # Crear visualizaciones
-            self._crear_visualizaciones(df, filename.replace('.csv', '_analisis.png'))
+            with trazas.span('visualizacion', filas=len(df)):
+                self._crear_visualizaciones(df, filename.replace('.csv', '_analisis.png'))
             
             return df
             
@@ -181,46 +468,157 @@ class DescargadorDatosMalnutricion:
             print(f"❌ Error al analizar los datos: {e}")
             return None
     
-    def _analizar_malnutricion_especifico(self, df):
-        """Análisis específico de malnutrición"""
+    def _analizar_datos_con_cache(self, filename, columnas=None):
+        """Reporte y visualizaciones reutilizando los resultados guardados.
+        
+        Con el archivo sin cambios no se vuelve a leer ni a dibujar nada; si
+        solo se añadieron filas al final, el resumen se actualiza con ellas.
+        """
+        from curso_machine_learning.analisis.eda import imprimir_reporte
+        from curso_machine_learning.analisis.graficos import DPI, UMBRAL_FILAS_GRANDES
+        from curso_machine_learning.infraestructura.esquema import cargar_compacto
+        
+        with trazas.span('analisis', archivo=filename, cache=True) as span:
+            resumen = self.cache_analisis.resumen_eda(filename, columnas)
+            imprimir_reporte(resumen)
+            span.registrar(bytes=os.path.getsize(filename), filas=resumen.filas)
+        
+        # Cubo de conteos para consultas por localidad, año, sexo y
+        # clasificación; de él sale también el análisis específico
+        with trazas.span('cubo', archivo=filename):
+            cubo = self.cache_analisis.cubo(filename)
+            print(f"🧊 Cubo de agregados: {' × '.join(cubo.dimensiones)} "
+                  f"({cubo.conteos.size} celdas)")
+            self._analizar_malnutricion_especifico(cubo=cubo)
+        
+        # El modo de dibujo sale del resumen, sin cargar el archivo
+        modo_grande = resumen.filas > UMBRAL_FILAS_GRANDES
+        
+        def dibujar(destino):
+            with trazas.span('lectura', archivo=filename) as span:
+                df = cargar_compacto(filename, columnas, autodetectar=True)
+                span.registrar(filas=len(df))
+            self._crear_visualizaciones(df, str(destino), modo_grande)
+        
+        with trazas.span('visualizacion', cache=True):
+            self.cache_analisis.figura(filename, 'visualizaciones',
+                                       {'columnas': columnas, 'modo_grande': modo_grande, 'dpi': DPI},
+                                       dibujar, filename.replace('.csv', '_analisis.png'))
+        return resumen
+    
+    def analizar_datos_por_bloques(self, filename, tamano_bloque=250_000, procesos=1):
+        """Analizar los datos por bloques, sin cargar el archivo entero en memoria"""
+        from curso_machine_learning.analisis.eda import eda_por_bloques, imprimir_reporte
+        
+        print("\n📊 Analizando datos por bloques...")
+        
+        try:
+            # Cada bloque se resume con acumuladores fusionables (media/varianza,
+            # mínimo/máximo, nulos, cuantiles aproximados y conteos)
+            with trazas.span('analisis', archivo=filename, procesos=procesos) as span:
+                resumen = eda_por_bloques(filename, tamano_bloque=tamano_bloque, procesos=procesos)
+                imprimir_reporte(resumen)
+                span.registrar(bytes=os.path.getsize(filename), filas=resumen.filas)
+            return resumen
+            
+        except Exception as e:
+            print(f"❌ Error al analizar los datos: {e}")
+            return None
+    
+    def consultar_cubo(self, filename, por=(), filtros=None):
+        """Conteos por ``por`` entre las filas que cumplen ``filtros``, desde el cubo"""
+        cubo = self.cache_analisis.cubo(filename)
+        return cubo.consultar(por, filtros)
+    
+    def graficar(self, filename, output_filename=None, columnas=None, modo_grande=None,
+                 separados=False, procesos=1):
+        """Cargar los datos y crear solo las visualizaciones"""
+        from curso_machine_learning.infraestructura.esquema import cargar_compacto
+        
+        with trazas.span('lectura', archivo=str(filename)) as span:
+            df = cargar_compacto(filename, columnas, autodetectar=True)
+            span.registrar(bytes=os.path.getsize(filename), filas=len(df))
+        output_filename = output_filename or str(filename).replace('.csv', '_analisis.png')
+        with trazas.span('visualizacion', filas=len(df), procesos=procesos):
+            self._crear_visualizaciones(df, output_filename, modo_grande, separados, procesos)
+    
+    def _analizar_malnutricion_especifico(self, df=None, cubo=None):
+        """Análisis específico de malnutrición.
+        
+        Con ``cubo`` (un ``CuboAgregado`` ya construido) los conteos salen de
+        él y no hace falta ``df``; si no, de ``value_counts`` sobre el
+        DataFrame en memoria.
+        """
         print("\n🏥 Análisis Específico de Malnutrición")
         print("=" * 50)
         
+        columnas = list(cubo.dimensiones) if cubo is not None else list(df.columns)
+        filas = cubo.filas if cubo is not None else len(df)
+        
+        def conteos(col):
+            if col not in columnas:
+                return None
+            return cubo.value_counts(col) if cubo is not None else df[col].value_counts()
+        
         # Identificar columnas de clasificación nutricional
-        clas_cols = [col for col in df.columns if 'CLASIFICACION' in col.upper()]
+        clas_cols = [col for col in columnas if 'CLASIFICACION' in col.upper()]
         
         if clas_cols:
             print(f"\n📊 Columnas de clasificación nutricional encontradas: {clas_cols}")
             
             for col in clas_cols[:2]:  # Analizar hasta 2 columnas
-                if col in df.columns:
+                distribucion = conteos(col)
+                if distribucion is not None:
                     print(f"\n📈 Distribución - {col}:")
-                    distribucion = df[col].value_counts()
                     for categoria, count in distribucion.items():
-                        porcentaje = (count / len(df)) * 100
+                        porcentaje = (count / filas) * 100
                         print(f"  {categoria}: {count} ({porcentaje:.1f}%)")
         
         # Análisis por localidad
-        if 'LOCALIDAD' in df.columns:
+        localidad_counts = conteos('LOCALIDAD')
+        if localidad_counts is not None:
             print(f"\n🏘️ Casos por localidad (Top 10):")
-            localidad_counts = df['LOCALIDAD'].value_counts().head(10)
-            for localidad, count in localidad_counts.items():
-                porcentaje = (count / len(df)) * 100
+            for localidad, count in localidad_counts.head(10).items():
+                porcentaje = (count / filas) * 100
                 print(f"  {localidad}: {count} ({porcentaje:.1f}%)")
         
         # Análisis por año
-        if 'AÑO' in df.columns:
+        año_counts = conteos('AÑO')
+        if año_counts is not None:
             print(f"\n📅 Casos por año:")
-            año_counts = df['AÑO'].value_counts().sort_index()
-            for año, count in año_counts.items():
-                porcentaje = (count / len(df)) * 100
+            for año, count in año_counts.sort_index().items():
+                porcentaje = (count / filas) * 100
                 print(f"  {año}: {count} ({porcentaje:.1f}%)")
     
-    def _crear_visualizaciones(self, df, output_filename):
+    def _crear_visualizaciones(self, df, output_filename, modo_grande=None, separados=False, procesos=1):
         """Crear visualizaciones de los datos"""
+        import matplotlib.pyplot as plt
+        
+        from curso_machine_learning.analisis.graficos import (
+            DPI,
+            es_grande,
+            guardar_cuadricula,
+            guardar_paneles,
+        )
+        
         print("\n📈 Creando visualizaciones...")
         
+        if modo_grande is None:
+            modo_grande = es_grande(df)
+        
         try:
+            if modo_grande or separados:
+                # Datos pre-agregados con NumPy: histogramas, densidad 2D y conteos
+                paneles = self._paneles_visualizaciones(df)
+                if separados:
+                    rutas = guardar_paneles(paneles, output_filename, procesos=procesos)
+                    print(f"✅ {len(rutas)} paneles guardados junto a '{output_filename}'")
+                else:
+                    guardar_cuadricula(paneles, output_filename, forma=(2, 3), figsize=(18, 12),
+                                       titulo='Análisis de Malnutrición en Bogotá')
+                    print(f"✅ Visualizaciones guardadas como '{output_filename}'")
+                return
+            
             # Configurar estilo
             plt.style.use('seaborn-v0_8')
             fig, axes = plt.subplots(2, 3, figsize=(18, 12))
@@ -277,31 +675,60 @@ class DescargadorDatosMalnutricion:
                 axes[1, 2].grid(True, alpha=0.3)
             
             plt.tight_layout()
-            plt.savefig(output_filename, dpi=300, bbox_inches='tight')
+            plt.savefig(output_filename, dpi=DPI, bbox_inches='tight')
             print(f"✅ Visualizaciones guardadas como '{output_filename}'")
             
         except Exception as e:
             print(f"❌ Error al crear visualizaciones: {e}")
+    
+    def _paneles_visualizaciones(self, df):
+        """Paneles de _crear_visualizaciones calculados para datos grandes"""
+        paneles = [panel_malnutricion(nombre, df) for nombre in PANELES]
+        return [panel for panel in paneles if panel is not None]
+
+
+def panel_malnutricion(nombre, df):
+    """Panel ``nombre`` de las visualizaciones (None si faltan sus columnas)"""
+    from curso_machine_learning.analisis.graficos import (
+        panel_conteos,
+        panel_densidad,
+        panel_histograma,
+    )
+    
+    if nombre == 'edad' and 'EDAD_MESES' in df.columns:
+        return panel_histograma('edad', df['EDAD_MESES'], bins=20, color='skyblue',
+                                titulo='Distribución por Edad (meses)', xlabel='Edad en meses')
+    if nombre == 'peso' and 'PESO_KG' in df.columns:
+        return panel_histograma('peso', df['PESO_KG'], bins=20, color='lightgreen',
+                                titulo='Distribución por Peso (kg)', xlabel='Peso en kg')
+    if nombre == 'localidad' and 'LOCALIDAD' in df.columns:
+        return panel_conteos('localidad', 'barras', df['LOCALIDAD'].value_counts().head(10),
+                             titulo='Casos por Localidad (Top 10)', xlabel='Número de casos')
+    clas_cols = [col for col in df.columns if 'CLASIFICACION' in col.upper()]
+    if nombre == 'clasificacion' and clas_cols:
+        return panel_conteos('clasificacion', 'torta', df[clas_cols[0]].value_counts(),
+                             titulo=f'Distribución - {clas_cols[0]}')
+    if nombre == 'evolucion' and 'AÑO' in df.columns:
+        return panel_conteos('evolucion', 'linea', df['AÑO'].value_counts().sort_index(),
+                             titulo='Evolución Temporal de Casos', xlabel='Año',
+                             ylabel='Número de casos')
+    if nombre == 'peso_talla' and 'PESO_KG' in df.columns and 'TALLA_CM' in df.columns:
+        return panel_densidad('peso_talla', df['TALLA_CM'], df['PESO_KG'],
+                              titulo='Relación Peso vs Talla', xlabel='Talla (cm)',
+                              ylabel='Peso (kg)')
+    return None
 
 
 def main():
     """Función principal"""
+    from curso_machine_learning.casos.pipeline_malnutricion import ejecutar
+    
     print("🏥 Sistema de Descarga y Análisis de Datos de Malnutrición")
     print("=" * 60)
     
-    descargador = DescargadorDatosMalnutricion()
-    
-    # Intentar descargar datos reales
-    datos_reales, filename_real = descargador.descargar_datos_reales()
-    
-    if datos_reales:
-        print("✅ Usando datos reales descargados")
-        descargador.analizar_datos(datos_reales, filename_real)
-    else:
-        print("⚠️ No se pudieron descargar datos reales, usando datos simulados")
-        datos_simulados, filename_sim = descargador.generar_datos_simulados()
-        if datos_simulados:
-            descargador.analizar_datos(datos_simulados, filename_sim)
+    # Pipeline compartido con 1malnutricion.py: solo se rehacen las etapas
+    # cuyas entradas cambiaron (descarga en carrera, con datos simulados de respaldo)
+    ejecutar(modo='carrera')
     
     print("\n🎉 Proceso completado!")
 
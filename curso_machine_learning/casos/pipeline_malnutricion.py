@@ -0,0 +1,226 @@
+"""
+Pipeline único de descarga, análisis y visualización de malnutrición en Bogotá
+
+Une los flujos de ``1malnutricion.py`` (descargar_dataset → cargar_y_analizar_datos
+→ analizar_malnutricion → crear_visualizaciones) y de ``DescargadorDatosMalnutricion``
+(descargar_datos_reales → analizar_datos → _crear_visualizaciones). Cada etapa
+declara sus entradas y solo se vuelve a ejecutar cuando cambian: al cambiar un
+parámetro de las figuras solo se vuelven a dibujar las figuras.
+"""
+
+import importlib
+import json
+import os
+from pathlib import Path
+
+# pandas, numpy, matplotlib y los módulos de análisis se importan dentro de las
+# etapas que los usan
+from curso_machine_learning.infraestructura import trazas
+from curso_machine_learning.infraestructura.pipeline import (
+    Etapa,
+    Pipeline,
+    imprimir_ejecucion,
+)
+
+# Columnas con un análisis de distribución propio (se omiten las que falten)
+COLUMNAS_CONTEO = ('LOCALIDAD', 'AÑO', 'CLASIFICACION_P_T', 'CLASIFICACION_T_E',
+                   'CLASIFICACION_P_E', 'CLASIFICACION_IMC_E', 'CLASIFICACION_NUTRICIONAL')
+PANELES = ('edad', 'peso', 'localidad', 'clasificacion', 'evolucion', 'peso_talla')
+
+FIGURA = 'malnutricion_analisis.png'
+FIGURA_BASICA = 'analisis_malnutricion.png'
+DISTRIBUCIONES = 'malnutricion_distribuciones.json'
+TITULO = 'Análisis de Malnutrición en Bogotá'
+
+MODOS_DESCARGA = ('carrera', 'secuencial', 'directo', 'simulado')
+
+
+def _malnutricion():
+    return importlib.import_module('curso_machine_learning.casos.descargar_malnutricion')
+
+
+def _basico():
+    # El nombre del módulo empieza por un dígito: no se puede importar con ``import``
+    return importlib.import_module('curso_machine_learning.casos.1malnutricion')
+
+
+def descargar(archivo=None, modo='carrera'):
+    """Ruta del CSV de trabajo: ``archivo``, una descarga o datos simulados"""
+    if archivo:
+        if not os.path.exists(archivo):
+            raise FileNotFoundError(f"No existe '{archivo}'")
+        return str(archivo)
+
+    if modo == 'directo':
+        # URL del metadato con datos de ejemplo como respaldo (1malnutricion.py)
+        return _basico().descargar_dataset()
+
+    descargador = _malnutricion().DescargadorDatosMalnutricion()
+    filename = None
+    if modo != 'simulado':
+        filename = descargador.descargar_datos_reales(modo_carrera=modo == 'carrera')
+    if not filename:
+        print("⚠️ No se pudieron descargar datos reales, usando datos simulados")
+        filename = descargador.generar_datos_simulados()
+    return filename
+
+
+def cargar(filename):
+    """DataFrame compacto del CSV (no se guarda: se relee si hace falta)"""
+    from curso_machine_learning.infraestructura.esquema import cargar_compacto
+
+    df = cargar_compacto(filename, autodetectar=True)
+    print(f"✅ Dataset cargado: {df.shape[0]} filas, {df.shape[1]} columnas")
+    return df
+
+
+def resumir(df):
+    """Resumen EDA (estadísticas, nulos y conteos) del DataFrame"""
+    from curso_machine_learning.analisis.eda import resumir_bloque
+
+    return resumir_bloque(df)
+
+
+def reportar(resumen):
+    """Mostrar el reporte descriptivo y de malnutrición del resumen"""
+    from curso_machine_learning.analisis.eda import imprimir_reporte
+
+    imprimir_reporte(resumen)
+
+
+def distribucion(df, columna):
+    """Conteo de valores de una columna (None si no está)"""
+    if columna not in df.columns:
+        return None
+    return df[columna].value_counts()
+
+
+def guardar_distribuciones(*distribuciones, columnas, destino):
+    """Guardar los conteos de cada columna como JSON"""
+    datos = {
+        columna: {str(valor): int(conteo) for valor, conteo in conteos.items()}
+        for columna, conteos in zip(columnas, distribuciones)
+        if conteos is not None
+    }
+    tmp = f"{destino}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, destino)
+    print(f"✅ Distribuciones de {len(datos)} columnas guardadas en '{destino}'")
+
+
+def construir_panel(df, nombre):
+    """Panel pre-agregado de las visualizaciones de malnutrición"""
+    return _malnutricion().panel_malnutricion(nombre, df)
+
+
+def columnas_numericas(df):
+    """Columnas numéricas, como en ``analizar_malnutricion``"""
+    import numpy as np
+
+    return df.select_dtypes(include=[np.number]).columns.tolist()
+
+
+def paneles_basicos(df, numeric_cols):
+    """Paneles de la figura básica de ``1malnutricion.py``"""
+    if not numeric_cols:
+        return []
+    return _basico().paneles_basicos(df, numeric_cols)
+
+
+def dibujar_cuadricula(*paneles, destino, forma, figsize, titulo, dpi):
+    """Dibujar los paneles (sueltos o en listas) en una sola figura"""
+    from curso_machine_learning.analisis.graficos import guardar_cuadricula
+
+    planos = []
+    for panel in paneles:
+        if isinstance(panel, list):
+            planos.extend(panel)
+        elif panel is not None:
+            planos.append(panel)
+    guardar_cuadricula(planos, destino, forma=forma, figsize=figsize, titulo=titulo, dpi=dpi)
+    print(f"✅ Visualizaciones guardadas como '{destino}'")
+
+
+def dibujar_panel(panel, destino, dpi):
+    """Dibujar un panel en su propio archivo; devuelve la ruta (None si no hay panel)"""
+    from curso_machine_learning.analisis.graficos import guardar_panel, ruta_panel
+
+    if panel is None:
+        return None
+    return str(guardar_panel(panel, ruta_panel(destino, panel), dpi=dpi))
+
+
+def crear_pipeline(archivo=None, modo='carrera', dpi=300, separados=False,
+                   directorio=None, hilos=4, procesos=2):
+    """Etapas del análisis de malnutrición con sus entradas y salidas"""
+    if modo not in MODOS_DESCARGA:
+        raise ValueError(f"Modo de descarga desconocido: {modo!r}")
+
+    distribuciones = tuple(f'distribucion:{col}' for col in COLUMNAS_CONTEO)
+    paneles = tuple(f'panel:{nombre}' for nombre in PANELES)
+    etapas = [
+        # Siempre: la descarga condicional (ETag/Last-Modified) decide si hay
+        # datos nuevos; si el CSV no cambió, las etapas siguientes se omiten
+        Etapa('datos', descargar, parametros={'archivo': archivo, 'modo': modo},
+              devuelve_archivo=True, siempre=True),
+        Etapa('tabla', cargar, ('datos',), persistir=False),
+        Etapa('resumen', resumir, ('tabla',)),
+        Etapa('reporte', reportar, ('resumen',), persistir=False, siempre=True),
+        # Análisis por columna, independientes entre sí
+        *[Etapa(etapa, distribucion, ('tabla',), {'columna': col})
+          for etapa, col in zip(distribuciones, COLUMNAS_CONTEO)],
+        Etapa('distribuciones', guardar_distribuciones, distribuciones,
+              {'columnas': COLUMNAS_CONTEO, 'destino': DISTRIBUCIONES},
+              salidas=(DISTRIBUCIONES,)),
+        # Paneles pre-agregados: las figuras se dibujan a partir de ellos
+        *[Etapa(etapa, construir_panel, ('tabla',), {'nombre': nombre})
+          for etapa, nombre in zip(paneles, PANELES)],
+        Etapa('columnas', columnas_numericas, ('tabla',)),
+        Etapa('paneles_basicos', paneles_basicos, ('tabla', 'columnas')),
+        Etapa('figura', dibujar_cuadricula, paneles,
+              {'destino': FIGURA, 'forma': (2, 3), 'figsize': (18, 12), 'titulo': TITULO,
+               'dpi': dpi},
+              salidas=(FIGURA,), en_proceso=True),
+        Etapa('figura_basica', dibujar_cuadricula, ('paneles_basicos',),
+              {'destino': FIGURA_BASICA, 'forma': (2, 2), 'figsize': (15, 12),
+               'titulo': TITULO, 'dpi': dpi},
+              salidas=(FIGURA_BASICA,), en_proceso=True),
+    ]
+    if separados:
+        etapas += [
+            Etapa(f'figura:{nombre}', dibujar_panel, (etapa,), {'destino': FIGURA, 'dpi': dpi},
+                  devuelve_archivo=True, en_proceso=True)
+            for etapa, nombre in zip(paneles, PANELES)
+        ]
+
+    opciones = {'hilos': hilos, 'procesos': procesos}
+    if directorio is not None:
+        opciones['directorio'] = Path(directorio)
+    return Pipeline(etapas, **opciones)
+
+
+def ejecutar(archivo=None, modo='carrera', dpi=300, separados=False, forzar=(),
+             objetivos=None, hilos=4, procesos=2):
+    """Ejecutar el pipeline (solo las etapas con cambios) y mostrar el resumen"""
+    pipeline = crear_pipeline(archivo, modo, dpi=dpi, separados=separados,
+                              hilos=hilos, procesos=procesos)
+    with trazas.trazar():
+        resultados = pipeline.ejecutar(objetivos, forzar=forzar)
+    imprimir_ejecucion(resultados)
+    return resultados
+
+
+def main():
+    """Función principal"""
+    print("🏥 Pipeline de Análisis de Malnutrición en Bogotá")
+    print("=" * 60)
+
+    resultados = ejecutar()
+
+    if all(r.estado in ('ejecutada', 'omitida') for r in resultados.values()):
+        print("\n🎉 Proceso completado!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+Punto de entrada único del paquete: descargar, sincronizar, analizar y simular
+"""
+
+import argparse
+import importlib
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, Sequence
+
+from curso_machine_learning.infraestructura import trazas
+
+# Módulos de cada subcomando. Se importan al ejecutarlo, no al arrancar, y
+# ninguno importa pandas/numpy/matplotlib a nivel de módulo: esas librerías
+# se cargan dentro de las funciones que las usan.
+MODULOS = {
+    "download": ["curso_machine_learning.casos.descargar_malnutricion"],
+    "sync": [
+        "curso_machine_learning.casos.123",
+        "curso_machine_learning.infraestructura.sincronizacion",
+    ],
+    "batch": ["curso_machine_learning.infraestructura.lotes"],
+    "analyze": ["curso_machine_learning.casos.descargar_malnutricion"],
+    "plot": ["curso_machine_learning.casos.descargar_malnutricion"],
+    "simulate": ["curso_machine_learning.casos.descargar_malnutricion"],
+    "zscore": ["curso_machine_learning.casos.descargar_malnutricion"],
+    "cube": ["curso_machine_learning.casos.descargar_malnutricion"],
+    "train": ["curso_machine_learning.casos.descargar_malnutricion"],
+    "predict": ["curso_machine_learning.casos.descargar_malnutricion"],
+    "cv": ["curso_machine_learning.casos.descargar_malnutricion"],
+    "pipeline": ["curso_machine_learning.casos.pipeline_malnutricion"],
+    "serve": ["curso_machine_learning.infraestructura.api.servidor"],
+    "loadtest": ["curso_machine_learning.infraestructura.api.carga"],
+}
+
+
+def importar(comando: str) -> list[ModuleType]:
+    """Importar los módulos que necesita ``comando``"""
+    return [importlib.import_module(nombre) for nombre in MODULOS[comando]]
+
+
+def _download(args: argparse.Namespace) -> int:
+    (malnutricion,) = importar("download")
+    descargador = malnutricion.DescargadorDatosMalnutricion()
+    filename = descargador.descargar_datos_reales(modo_carrera=not args.secuencial)
+    return 0 if filename else 1
+
+
+def _sync(args: argparse.Namespace) -> int:
+    caso, sincronizacion = importar("sync")
+    recurso = args.recurso or caso.RESOURCE_ID
+    salida = args.salida or Path(f"datos_bogota_resource_{recurso[:8]}.csv")
+    out_path, filas = sincronizacion.sincronizar_recurso(
+        recurso, salida, limit=args.limite, concurrency=args.concurrencia
+    )
+    print(f"CSV guardado en: {out_path} ({filas} registros)")
+    return 0
+
+
+def _batch(args: argparse.Namespace) -> int:
+    (lotes,) = importar("batch")
+    opciones = {} if args.base_url is None else {"base_url": args.base_url}
+    resumen = lotes.ingerir_manifiesto(
+        args.manifiesto,
+        args.directorio,
+        formato=args.formato,
+        ruta_resumen=args.resumen,
+        concurrencia=args.concurrencia,
+        simultaneos=args.simultaneos,
+        tasa=args.tasa,
+        limit=args.limite,
+        max_antiguedad=args.max_antiguedad * 3600,
+        **opciones,
+    )
+    return 1 if resumen.errores else 0
+
+
+def _analyze(args: argparse.Namespace) -> int:
+    (malnutricion,) = importar("analyze")
+    descargador = malnutricion.DescargadorDatosMalnutricion()
+    if args.por_bloques:
+        resultado = descargador.analizar_datos_por_bloques(
+            args.archivo, tamano_bloque=args.tamano_bloque, procesos=args.procesos
+        )
+    else:
+        resultado = descargador.analizar_datos(
+            args.archivo, args.columnas, usar_cache=not args.sin_cache
+        )
+    return 0 if resultado is not None else 1
+
+
+def _plot(args: argparse.Namespace) -> int:
+    (malnutricion,) = importar("plot")
+    modo_grande = {"auto": None, "grande": True, "normal": False}[args.modo]
+    malnutricion.DescargadorDatosMalnutricion().graficar(
+        args.archivo,
+        args.salida,
+        args.columnas,
+        modo_grande=modo_grande,
+        separados=args.separados,
+        procesos=args.procesos,
+    )
+    return 0
+
+
+def _simulate(args: argparse.Namespace) -> int:
+    (malnutricion,) = importar("simulate")
+    malnutricion.DescargadorDatosMalnutricion().generar_datos_simulados(
+        n_muestras=args.muestras,
+        tamano_bloque=args.tamano_bloque,
+        procesos=args.procesos,
+        semilla=args.semilla,
+        tablas_oms=args.tablas_oms,
+    )
+    return 0
+
+
+def _zscore(args: argparse.Namespace) -> int:
+    (malnutricion,) = importar("zscore")
+    ruta = malnutricion.DescargadorDatosMalnutricion().calcular_zscores(
+        args.archivo, args.tablas_oms, args.salida, tamano_bloque=args.tamano_bloque
+    )
+    return 0 if ruta is not None else 1
+
+
+def _filtro(texto: str) -> tuple[str, list[str]]:
+    """``DIMENSION=valor[,valor...]``"""
+    dimension, separador, valores = texto.partition("=")
+    if not separador:
+        raise argparse.ArgumentTypeError(f"Se esperaba DIMENSION=valor: {texto!r}")
+    return dimension, valores.split(",")
+
+
+def _cube(args: argparse.Namespace) -> int:
+    (malnutricion,) = importar("cube")
+    conteos = malnutricion.DescargadorDatosMalnutricion().consultar_cubo(
+        args.archivo, args.por, dict(args.filtro)
+    )
+    print(conteos.to_string())
+    return 0
+
+
+def _train(args: argparse.Namespace) -> int:
+    (malnutricion,) = importar("train")
+    ruta = malnutricion.DescargadorDatosMalnutricion().entrenar_modelos(
+        args.archivo, args.salida, epocas=args.epocas, tamano_bloque=args.tamano_bloque
+    )
+    return 0 if ruta is not None else 1
+
+
+def _predict(args: argparse.Namespace) -> int:
+    (malnutricion,) = importar("predict")
+    malnutricion.DescargadorDatosMalnutricion().predecir_modelos(
+        args.archivo, args.modelos, args.salida, tamano_bloque=args.tamano_bloque
+    )
+    return 0
+
+
+def _cv(args: argparse.Namespace) -> int:
+    (malnutricion,) = importar("cv")
+    resumenes = malnutricion.DescargadorDatosMalnutricion().comparar_modelos(
+        args.archivo,
+        args.objetivo,
+        args.modelos,
+        pliegues=args.pliegues,
+        procesos=args.procesos,
+        output_filename=args.salida,
+    )
+    return 0 if resumenes else 1
+
+
+def _pipeline(args: argparse.Namespace) -> int:
+    (pipeline,) = importar("pipeline")
+    resultados = pipeline.ejecutar(
+        args.archivo,
+        args.modo,
+        dpi=args.dpi,
+        separados=args.separados,
+        forzar=args.forzar,
+        objetivos=args.solo,
+        hilos=args.hilos,
+        procesos=args.procesos,
+    )
+    fallidas = [r for r in resultados.values() if r.estado in ("error", "bloqueada")]
+    return 1 if fallidas else 0
+
+
+def _serve(args: argparse.Namespace) -> int:
+    import asyncio
+
+    (servidor,) = importar("serve")
+    try:
+        asyncio.run(
+            servidor.servir(
+                args.archivo,
+                args.host,
+                args.puerto,
+                ttl=args.ttl,
+                max_entradas=args.max_entradas,
+                intervalo=args.intervalo,
+            )
+        )
+    except KeyboardInterrupt:
+        print("\n👋 Servidor detenido")
+    return 0
+
+
+def _loadtest(args: argparse.Namespace) -> int:
+    (carga,) = importar("loadtest")
+    resultado = carga.probar_carga(
+        args.url,
+        args.rutas or carga.RUTAS,
+        peticiones=args.peticiones,
+        conexiones=args.conexiones,
+    )
+    return 0 if resultado.latencias else 1
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    """Parser con un subcomando por tarea"""
+    parser = argparse.ArgumentParser(
+        prog="curso_machine_learning",
+        description="Datos de malnutrición de Bogotá: descarga, análisis y gráficos",
+    )
+    parser.add_argument("--traza", type=Path, help="guardar la traza JSON por etapa")
+    parser.add_argument("--perfil", type=Path, help="guardar un volcado de cProfile")
+    parser.add_argument(
+        "--memoria",
+        action="store_true",
+        help="medir el pico de memoria de cada etapa (tracemalloc, más lento)",
+    )
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    download = sub.add_parser("download", help="descargar el CSV de malnutrición")
+    download.add_argument(
+        "--secuencial",
+        action="store_true",
+        help="probar las URLs una a una en lugar de en paralelo",
+    )
+    download.set_defaults(funcion=_download)
+
+    sync = sub.add_parser("sync", help="sincronizar un recurso de datastore_search")
+    sync.add_argument("--recurso", help="resource_id (por defecto el de 123.py)")
+    sync.add_argument("--salida", type=Path, help="CSV o .parquet de destino")
+    sync.add_argument("--limite", type=int, default=1000)
+    sync.add_argument("--concurrencia", type=int, default=8)
+    sync.set_defaults(funcion=_sync)
+
+    batch = sub.add_parser(
+        "batch", help="sincronizar los recursos de un manifiesto (JSON o texto)"
+    )
+    batch.add_argument("manifiesto", type=Path)
+    batch.add_argument("--directorio", type=Path, default=Path("."))
+    batch.add_argument("--formato", choices=["csv", "parquet"], default="csv")
+    batch.add_argument("--resumen", type=Path, help="JSON del resumen de la ejecución")
+    batch.add_argument("--base-url", help="datastore_search de otro portal")
+    batch.add_argument(
+        "--concurrencia", type=int, default=8, help="peticiones en curso en total"
+    )
+    batch.add_argument(
+        "--simultaneos", type=int, default=4, help="recursos descargándose a la vez"
+    )
+    batch.add_argument(
+        "--tasa", type=float, default=10.0, help="peticiones por segundo por host"
+    )
+    batch.add_argument("--limite", type=int, default=1000)
+    batch.add_argument(
+        "--max-antiguedad",
+        type=float,
+        default=24.0,
+        help="horas tras las que un recurso se considera atrasado",
+    )
+    batch.set_defaults(funcion=_batch)
+
+    analyze = sub.add_parser("analyze", help="reporte descriptivo de un CSV")
+    analyze.add_argument("archivo")
+    analyze.add_argument("--columnas", nargs="+")
+    analyze.add_argument(
+        "--por-bloques", action="store_true", help="sin cargar el archivo entero"
+    )
+    analyze.add_argument("--tamano-bloque", type=int, default=250_000)
+    analyze.add_argument("--procesos", type=int, default=1)
+    analyze.add_argument("--sin-cache", action="store_true")
+    analyze.set_defaults(funcion=_analyze)
+
+    plot = sub.add_parser("plot", help="visualizaciones de un CSV")
+    plot.add_argument("archivo")
+    plot.add_argument("--salida", help="PNG de destino")
+    plot.add_argument("--columnas", nargs="+")
+    plot.add_argument("--modo", choices=["auto", "grande", "normal"], default="auto")
+    plot.add_argument("--separados", action="store_true", help="un archivo por panel")
+    plot.add_argument("--procesos", type=int, default=1)
+    plot.set_defaults(funcion=_plot)
+
+    simulate = sub.add_parser("simulate", help="generar datos simulados")
+    simulate.add_argument("--muestras", type=int, default=2000)
+    simulate.add_argument("--tamano-bloque", type=int, default=1_000_000)
+    simulate.add_argument("--procesos", type=int, default=1)
+    simulate.add_argument("--semilla", type=int, default=42)
+    simulate.add_argument(
+        "--tablas-oms", type=Path, help="calcular los puntajes Z con estas tablas LMS"
+    )
+    simulate.set_defaults(funcion=_simulate)
+
+    zscore = sub.add_parser("zscore", help="puntajes Z OMS de un CSV, por bloques")
+    zscore.add_argument("archivo")
+    zscore.add_argument(
+        "--tablas-oms",
+        type=Path,
+        help="directorio con las tablas LMS de la OMS (o el .npz compilado)",
+    )
+    zscore.add_argument("--salida", help="CSV de destino")
+    zscore.add_argument("--tamano-bloque", type=int, default=250_000)
+    zscore.set_defaults(funcion=_zscore)
+
+    cube = sub.add_parser("cube", help="conteos por localidad, año, sexo...")
+    cube.add_argument("archivo")
+    cube.add_argument("--por", nargs="*", default=[], help="dimensiones a conservar")
+    cube.add_argument(
+        "--filtro",
+        type=_filtro,
+        action="append",
+        default=[],
+        help="DIMENSION=valor[,valor...] (se puede repetir)",
+    )
+    cube.set_defaults(funcion=_cube)
+
+    train = sub.add_parser("train", help="entrenar modelos incrementales por bloques")
+    train.add_argument("archivo")
+    train.add_argument("--salida", help="pickle de destino de los modelos")
+    train.add_argument("--epocas", type=int, default=1)
+    train.add_argument("--tamano-bloque", type=int, default=250_000)
+    train.set_defaults(funcion=_train)
+
+    predict = sub.add_parser("predict", help="predicciones por bloques a un CSV")
+    predict.add_argument("archivo")
+    predict.add_argument("modelos", help="pickle guardado por 'train'")
+    predict.add_argument("--salida", help="CSV de destino")
+    predict.add_argument("--tamano-bloque", type=int, default=250_000)
+    predict.set_defaults(funcion=_predict)
+
+    cv = sub.add_parser(
+        "cv", help="comparar modelos con validación cruzada en paralelo"
+    )
+    cv.add_argument("archivo")
+    cv.add_argument("--objetivo", default="PESO_KG")
+    cv.add_argument(
+        "--modelos",
+        nargs="+",
+        help="candidatos: 'modelo' o 'modelo:param=v1,v2;otro=v3' (ridge:alpha=0.1,1)",
+    )
+    cv.add_argument("--pliegues", type=int, default=5)
+    cv.add_argument("--procesos", type=int, help="procesos del pool (todas las CPU)")
+    cv.add_argument("--salida", help="JSON Lines con el resultado de cada pliegue")
+    cv.set_defaults(funcion=_cv)
+
+    pipeline = sub.add_parser(
+        "pipeline", help="descarga, análisis y figuras; solo rehace lo que cambió"
+    )
+    pipeline.add_argument("--archivo", help="usar este CSV en lugar de descargar")
+    pipeline.add_argument(
+        "--modo",
+        choices=["carrera", "secuencial", "directo", "simulado"],
+        default="carrera",
+        help="cómo obtener los datos si no se da --archivo",
+    )
+    pipeline.add_argument("--dpi", type=int, default=300)
+    pipeline.add_argument("--separados", action="store_true", help="un PNG por panel")
+    pipeline.add_argument(
+        "--forzar", nargs="+", default=[], help="etapas a ejecutar aunque no cambien"
+    )
+    pipeline.add_argument("--solo", nargs="+", help="ejecutar solo estas etapas")
+    pipeline.add_argument("--hilos", type=int, default=4)
+    pipeline.add_argument("--procesos", type=int, default=2)
+    pipeline.set_defaults(funcion=_pipeline)
+
+    serve = sub.add_parser("serve", help="servir resumen, desgloses y predicciones")
+    serve.add_argument("archivo")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--puerto", type=int, default=8000)
+    serve.add_argument("--ttl", type=float, default=300.0, help="segundos en caché")
+    serve.add_argument("--max-entradas", type=int, default=1024)
+    serve.add_argument(
+        "--intervalo",
+        type=float,
+        default=2.0,
+        help="segundos entre comprobaciones de cambios en el archivo",
+    )
+    serve.set_defaults(funcion=_serve)
+
+    loadtest = sub.add_parser("loadtest", help="prueba de carga contra 'serve'")
+    loadtest.add_argument("--url", default="http://127.0.0.1:8000")
+    loadtest.add_argument("--rutas", nargs="+", help="rutas a pedir en orden circular")
+    loadtest.add_argument("--peticiones", type=int, default=5000)
+    loadtest.add_argument("--conexiones", type=int, default=16)
+    loadtest.set_defaults(funcion=_loadtest)
+
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Ejecutar el subcomando indicado en ``argv``"""
+    args = crear_parser().parse_args(argv)
+    funcion: Callable[[argparse.Namespace], int] = args.funcion
+    with trazas.trazar(args.traza, perfil=args.perfil, memoria=args.memoria or None):
+        with trazas.span(args.comando):
+            return funcion(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,3 @@
+"""
+Infraestructura compartida por los casos: acceso a datos abiertos y utilidades
+"""
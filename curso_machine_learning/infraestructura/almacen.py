@@ -0,0 +1,226 @@
+"""
+Almacén local columnar (Feather/Parquet) con carga memory-mapped
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+FORMATO_POR_DEFECTO = "feather"
+SUFIJOS_COLUMNARES = (".feather", ".parquet")
+
+
+def hay_pyarrow() -> bool:
+    """Indicar si ``pyarrow`` está instalado"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def ruta_columnar(ruta_csv: str | Path, formato: str = FORMATO_POR_DEFECTO) -> Path:
+    """Ruta del archivo columnar asociado a un CSV"""
+    return Path(ruta_csv).with_suffix(f".{formato}")
+
+
+def ruta_esquema(ruta: str | Path) -> Path:
+    """Ruta del esquema persistido junto a un archivo columnar"""
+    ruta = Path(ruta)
+    return ruta.with_name(ruta.name + ".schema.json")
+
+
+def leer_esquema(ruta: str | Path) -> dict[str, Any]:
+    """Leer el esquema persistido (vacío si no existe)"""
+    try:
+        with open(ruta_esquema(ruta), encoding="utf-8") as f:
+            esquema: dict[str, Any] = json.load(f)
+            return esquema
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _huella_origen(ruta_csv: Path) -> dict[str, Any]:
+    stat = ruta_csv.stat()
+    return {"origen": str(ruta_csv), "bytes": stat.st_size, "mtime": stat.st_mtime}
+
+
+def esta_actualizado(ruta_csv: str | Path, destino: str | Path) -> bool:
+    """Indicar si ``destino`` se generó a partir de la versión actual del CSV"""
+    destino = Path(destino)
+    if not destino.exists():
+        return False
+    esquema = leer_esquema(destino)
+    huella = _huella_origen(Path(ruta_csv))
+    return all(esquema.get(k) == v for k, v in huella.items())
+
+
+def _escribir_lotes(lotes: Any, schema: Any, destino: Path) -> tuple[Any, int]:
+    """Escribir lotes de Arrow en Parquet o Feather (IPC sin compresión)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    filas = 0
+    if destino.name.endswith(".parquet.tmp"):
+        writer: Any = pq.ParquetWriter(destino, schema)
+        escribir = writer.write_batch
+    else:
+        writer = pa.ipc.new_file(str(destino), schema)
+        escribir = writer.write
+    try:
+        for lote in lotes:
+            escribir(lote)
+            filas += lote.num_rows
+    finally:
+        writer.close()
+    return schema, filas
+
+
+def convertir_a_columnar(
+    ruta_csv: str | Path,
+    destino: str | Path | None = None,
+    *,
+    formato: str = FORMATO_POR_DEFECTO,
+    forzar: bool = False,
+) -> Path:
+    """Convertir un CSV a Feather o Parquet una sola vez.
+
+    La lectura es por bloques (``pyarrow.csv.open_csv``) y la escritura por
+    lotes, así que la conversión no necesita el CSV entero en memoria. El
+    esquema se guarda en ``<destino>.schema.json`` y se reutiliza en
+    conversiones posteriores para que los tipos no cambien entre ejecuciones.
+    Feather se escribe sin compresión para poder mapearlo en memoria.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    ruta_csv = Path(ruta_csv)
+    destino = Path(destino) if destino else ruta_columnar(ruta_csv, formato)
+    if not forzar and esta_actualizado(ruta_csv, destino):
+        return destino
+
+    previo = leer_esquema(destino)
+    tipos = {c["nombre"]: c["tipo"] for c in previo.get("columnas", [])}
+    convert_options = pacsv.ConvertOptions(
+        column_types={nombre: pa.type_for_alias(t) for nombre, t in tipos.items()},
+        strings_can_be_null=True,
+    )
+
+    tmp = destino.with_name(destino.name + ".tmp")
+    try:
+        with pacsv.open_csv(ruta_csv, convert_options=convert_options) as reader:
+            schema, filas = _escribir_lotes(reader, reader.schema, tmp)
+    except pa.ArrowInvalid:
+        # El tipo inferido en el primer bloque no vale para todo el archivo:
+        # inferir con el archivo completo
+        tabla = pacsv.read_csv(ruta_csv, convert_options=convert_options)
+        schema, filas = _escribir_lotes(tabla.to_batches(), tabla.schema, tmp)
+    os.replace(tmp, destino)
+
+    esquema = {
+        **_huella_origen(ruta_csv),
+        "formato": destino.suffix.lstrip("."),
+        "filas": filas,
+        "columnas": [{"nombre": f.name, "tipo": str(f.type)} for f in schema],
+    }
+    with open(ruta_esquema(destino), "w", encoding="utf-8") as f:
+        json.dump(esquema, f, ensure_ascii=False, indent=2)
+
+    print(f"🗄️ '{ruta_csv}' convertido a '{destino}' ({filas} filas)")
+    return destino
+
+
+def _resolver_ruta(ruta: Path, convertir: bool) -> Path:
+    """Usar la versión columnar de un CSV si está al día (o crearla)"""
+    if ruta.suffix not in SUFIJOS_COLUMNARES and hay_pyarrow():
+        destino = ruta_columnar(ruta)
+        if esta_actualizado(ruta, destino):
+            return destino
+        if convertir:
+            return convertir_a_columnar(ruta, destino)
+    return ruta
+
+
+def _leer_arrow(ruta: Path, columnas: list[str] | None) -> Any:
+    """Abrir un archivo Feather/Parquet memory-mapped como tabla de Arrow"""
+    if ruta.suffix == ".feather":
+        import pyarrow.feather as feather
+
+        return feather.read_table(ruta, columns=columnas, memory_map=True)
+
+    import pyarrow.parquet as pq
+
+    return pq.read_table(ruta, columns=columnas, memory_map=True)
+
+
+def _aplicar_tipos_arrow(tabla: Any, tipos: dict[str, str]) -> Any:
+    """Convertir columnas en Arrow antes de pasar a pandas.
+
+    ``category`` se codifica como diccionario (llega a pandas como
+    Categorical sin crear un objeto por fila). Si una conversión no es
+    posible (desbordamiento, nulos en enteros) la columna se deja como está.
+    """
+    import pyarrow as pa
+
+    for i, nombre in enumerate(tabla.column_names):
+        tipo = tipos.get(nombre)
+        if tipo is None:
+            continue
+        columna = tabla.column(i)
+        try:
+            if tipo == "category":
+                nueva = columna.dictionary_encode()
+            else:
+                nueva = columna.cast(pa.type_for_alias(tipo))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            continue
+        tabla = tabla.set_column(i, nombre, nueva)
+    return tabla
+
+
+def columnas_de(ruta: str | Path) -> list[str]:
+    """Nombres de columna de un CSV o archivo columnar, sin leer los datos"""
+    ruta = Path(ruta)
+    if ruta.suffix in SUFIJOS_COLUMNARES:
+        return list(_leer_arrow(ruta, None).schema.names)
+    return list(pd.read_csv(ruta, nrows=0).columns)
+
+
+def cargar_tabla(
+    ruta: str | Path,
+    columnas: list[str] | None = None,
+    *,
+    tipos: dict[str, str] | None = None,
+    convertir: bool = True,
+    filas: int | None = None,
+) -> pd.DataFrame:
+    """Cargar un dataset leyendo solo ``columnas``.
+
+    Los archivos Feather/Parquet se abren memory-mapped. Para un CSV se usa
+    su versión columnar si está al día; si no existe y ``convertir`` es
+    verdadero (y hay ``pyarrow``) se crea en ese momento. Sin ``pyarrow`` se
+    recurre a ``pd.read_csv(usecols=...)``. ``tipos`` aplica dtypes
+    compactos durante la carga y ``filas`` limita la lectura a las primeras.
+    """
+    ruta = _resolver_ruta(Path(ruta), convertir)
+    tipos = tipos or {}
+
+    if ruta.suffix in SUFIJOS_COLUMNARES:
+        tabla = _leer_arrow(ruta, columnas)
+        if filas is not None:
+            tabla = tabla.slice(0, filas)
+        tabla = _aplicar_tipos_arrow(tabla, tipos)
+        return tabla.to_pandas(split_blocks=True)
+
+    try:
+        return pd.read_csv(ruta, usecols=columnas, dtype=tipos, nrows=filas)
+    except (ValueError, OverflowError):
+        # Enteros con nulos o fuera de rango: leerlos como float32
+        tipos = {
+            c: "float32" if t.lower().startswith(("int", "uint")) else t
+            for c, t in tipos.items()
+        }
+        return pd.read_csv(ruta, usecols=columnas, dtype=tipos, nrows=filas)
@@ -0,0 +1,3 @@
+"""
+Servicio HTTP local con los resúmenes, desgloses y predicciones del análisis
+"""
@@ -0,0 +1,98 @@
+"""
+Caché en memoria LRU con caducidad para los resultados del servicio
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+MAX_ENTRADAS = 1024
+TTL_SEGUNDOS = 300.0
+
+
+class CacheLRU:
+    """Resultados calculados, con como mucho ``maximo`` entradas y ``ttl`` segundos.
+
+    Al llenarse se descarta la entrada usada hace más tiempo. Varias
+    peticiones simultáneas de la misma clave esperan un único cálculo en
+    lugar de repetirlo. Pensada para usarse desde un solo bucle de asyncio.
+    """
+
+    def __init__(self, maximo: int = MAX_ENTRADAS, ttl: float = TTL_SEGUNDOS):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._entradas: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._pendientes: dict[Hashable, asyncio.Future[Any]] = {}
+        self.aciertos = 0
+        self.fallos = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def leer(self, clave: Hashable) -> tuple[bool, Any]:
+        """``(True, valor)`` si ``clave`` está y no caducó; si no ``(False, None)``"""
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return False, None
+        expira, valor = entrada
+        if expira < time.monotonic():
+            del self._entradas[clave]
+            return False, None
+        self._entradas.move_to_end(clave)
+        return True, valor
+
+    def guardar(self, clave: Hashable, valor: Any) -> None:
+        """Guardar ``valor`` y descartar las entradas más antiguas si sobran"""
+        self._entradas[clave] = (time.monotonic() + self.ttl, valor)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.maximo:
+            self._entradas.popitem(last=False)
+
+    async def obtener(
+        self, clave: Hashable, calcular: Callable[[], Awaitable[Any]]
+    ) -> tuple[Any, bool]:
+        """Valor de ``clave`` y si salió de la caché, calculándolo si hace falta"""
+        encontrado, valor = self.leer(clave)
+        if encontrado:
+            self.aciertos += 1
+            return valor, True
+
+        pendiente = self._pendientes.get(clave)
+        if pendiente is not None:
+            self.aciertos += 1
+            return await asyncio.shield(pendiente), True
+
+        self.fallos += 1
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendientes[clave] = futuro
+        try:
+            valor = await calcular()
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except Exception as e:
+            futuro.set_exception(e)
+            # Que nadie se quede sin recoger la excepción si no había espera
+            futuro.exception()
+            raise
+        else:
+            futuro.set_result(valor)
+            self.guardar(clave, valor)
+            return valor, False
+        finally:
+            del self._pendientes[clave]
+
+    def limpiar(self) -> None:
+        """Vaciar la caché (los cálculos en curso siguen su camino)"""
+        self._entradas.clear()
+
+    def estado(self) -> dict[str, Any]:
+        """Entradas, capacidad, caducidad y aciertos/fallos"""
+        return {
+            "entradas": len(self._entradas),
+            "maximo": self.maximo,
+            "ttl": self.ttl,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+        }
@@ -0,0 +1,138 @@
+"""
+Prueba de carga del servicio: latencias p50/p99 y peticiones por segundo
+"""
+
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from urllib.parse import quote, urlsplit
+
+RUTAS = (
+    "/resumen",
+    "/desglose?por=LOCALIDAD",
+    "/desglose?por=AÑO&SEXO=FEMENINO",
+    "/desglose?por=LOCALIDAD,AÑO&CLASIFICACION_P_T=DESNUTRICIÓN%20SEVERA",
+    "/prediccion?EDAD_MESES=24&TALLA_CM=85",
+)
+
+
+@dataclass
+class ResultadoCarga:
+    """Latencias (segundos) de las peticiones correctas y número de errores"""
+
+    conexiones: int
+    segundos: float = 0.0
+    errores: int = 0
+    latencias: list[float] = field(default_factory=list)
+
+    @property
+    def peticiones(self) -> int:
+        return len(self.latencias) + self.errores
+
+    @property
+    def rps(self) -> float:
+        """Peticiones completadas por segundo"""
+        return self.peticiones / self.segundos if self.segundos else 0.0
+
+    def percentil(self, p: float) -> float:
+        """Latencia del percentil ``p`` (0-100), por rango más cercano"""
+        if not self.latencias:
+            return float("nan")
+        ordenadas = sorted(self.latencias)
+        posicion = max(0, -(-len(ordenadas) * p // 100) - 1)
+        return ordenadas[int(posicion)]
+
+    def imprimir(self) -> None:
+        print(
+            f"📈 {self.peticiones} peticiones con {self.conexiones} conexiones "
+            f"en {self.segundos:.2f} s ({self.errores} errores)"
+        )
+        print(
+            f"   p50 {self.percentil(50) * 1000:.2f} ms  "
+            f"p99 {self.percentil(99) * 1000:.2f} ms  "
+            f"{self.rps:.0f} peticiones/s"
+        )
+
+
+async def _peticion(
+    lector: asyncio.StreamReader, escritor: asyncio.StreamWriter, host: str, ruta: str
+) -> int:
+    """Enviar un GET por una conexión abierta y leer la respuesta; devuelve el
+    código de estado"""
+    escritor.write(f"GET {ruta} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("utf-8"))
+    await escritor.drain()
+    estado = int((await lector.readline()).split()[1])
+    largo = 0
+    while (linea := await lector.readline()) not in (b"\r\n", b""):
+        nombre, _, valor = linea.decode("latin-1").partition(":")
+        if nombre.lower() == "content-length":
+            largo = int(valor)
+    await lector.readexactly(largo)
+    return estado
+
+
+async def medir_carga(
+    url: str,
+    rutas: tuple[str, ...] | list[str] = RUTAS,
+    *,
+    peticiones: int = 5000,
+    conexiones: int = 16,
+    calentamiento: int = 100,
+) -> ResultadoCarga:
+    """Lanzar ``peticiones`` GET repartidas en ``conexiones`` keep-alive.
+
+    Las rutas se recorren en orden circular. Las ``calentamiento`` primeras
+    peticiones llenan la caché del servicio y no se cuentan.
+    """
+    partes = urlsplit(url)
+    host, puerto = partes.hostname or "127.0.0.1", partes.port or 80
+    base = partes.path.rstrip("/")
+    rutas = [quote(base + r, safe="/?=&,%") for r in rutas]
+    resultado = ResultadoCarga(conexiones)
+    siguiente = itertools.count()
+
+    async def cliente(total: int, medir: bool) -> None:
+        lector, escritor = await asyncio.open_connection(host, puerto)
+        try:
+            while (i := next(siguiente)) < total:
+                inicio = time.perf_counter()
+                try:
+                    estado = await _peticion(
+                        lector, escritor, host, rutas[i % len(rutas)]
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+                    resultado.errores += medir
+                    escritor.close()
+                    lector, escritor = await asyncio.open_connection(host, puerto)
+                    continue
+                if not medir:
+                    continue
+                if estado == 200:
+                    resultado.latencias.append(time.perf_counter() - inicio)
+                else:
+                    resultado.errores += 1
+        finally:
+            escritor.close()
+
+    await asyncio.gather(*(cliente(calentamiento, False) for _ in range(conexiones)))
+    siguiente = itertools.count()
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(peticiones, True) for _ in range(conexiones)))
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
+
+
+def probar_carga(
+    url: str,
+    rutas: tuple[str, ...] | list[str] = RUTAS,
+    *,
+    peticiones: int = 5000,
+    conexiones: int = 16,
+) -> ResultadoCarga:
+    """Ejecutar ``medir_carga`` e imprimir el resultado"""
+    resultado = asyncio.run(
+        medir_carga(url, rutas, peticiones=peticiones, conexiones=conexiones)
+    )
+    resultado.imprimir()
+    return resultado
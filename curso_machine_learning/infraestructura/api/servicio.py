@@ -0,0 +1,351 @@
+"""
+Resultados del análisis de un archivo, recalculados cuando el archivo cambia
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Sequence
+
+from curso_machine_learning.infraestructura.api.cache import CacheLRU
+
+if TYPE_CHECKING:
+    from curso_machine_learning.analisis.cache import CacheAnalisis
+    from curso_machine_learning.analisis.cubo import CuboAgregado
+    from curso_machine_learning.analisis.eda import ResumenEDA
+
+# Modelo de regresión que se sirve: peso según edad y talla
+OBJETIVO = "PESO_KG"
+PREDICTORES = ("EDAD_MESES", "TALLA_CM")
+# Segundos entre comprobaciones de cambios en el archivo
+INTERVALO_VIGILANCIA = 2.0
+# Filas de un desglose cuando no se pide ``limite``
+LIMITE_DESGLOSE = 1000
+
+
+class ErrorConsulta(ValueError):
+    """Parámetros de consulta no válidos (respuesta 400)"""
+
+
+class DatosNoCargados(RuntimeError):
+    """Todavía no hay ninguna versión del archivo cargada (respuesta 503)"""
+
+
+@dataclass
+class ModeloLineal:
+    """Regresión lineal por mínimos cuadrados: intercepto y un coeficiente por
+    predictor"""
+
+    objetivo: str
+    predictores: list[str]
+    coeficientes: list[float]
+    r2: float
+    filas: int
+
+    def predecir(self, valores: dict[str, Sequence[float]]) -> list[float]:
+        """Predicciones para listas paralelas de valores de los predictores"""
+        import numpy as np
+
+        X = np.column_stack([np.asarray(valores[p], float) for p in self.predictores])
+        return (self.coeficientes[0] + X @ np.asarray(self.coeficientes[1:])).tolist()
+
+
+def ajustar_modelo(
+    ruta: str | Path,
+    objetivo: str = OBJETIVO,
+    predictores: Sequence[str] = PREDICTORES,
+    *,
+    tamano_bloque: int = 250_000,
+) -> ModeloLineal | None:
+    """Ajustar ``objetivo ~ predictores`` en una pasada por bloques.
+
+    Se acumulan las ecuaciones normales (X'X, X'y, y'y), así que la memoria
+    no depende del número de filas. ``None`` si faltan columnas o datos.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from curso_machine_learning.analisis.eda import leer_bloques
+    from curso_machine_learning.infraestructura.almacen import columnas_de
+
+    columnas = [*predictores, objetivo]
+    if not set(columnas) <= set(columnas_de(ruta)):
+        return None
+
+    k = len(predictores) + 1
+    xtx = np.zeros((k, k))
+    xty = np.zeros(k)
+    yty = suma_y = 0.0
+    n = 0
+    for bloque in leer_bloques(ruta, columnas, tamano_bloque=tamano_bloque):
+        datos = bloque[columnas].apply(pd.to_numeric, errors="coerce")
+        datos = datos.to_numpy(float)
+        datos = datos[~np.isnan(datos).any(axis=1)]
+        X = np.column_stack([np.ones(len(datos)), datos[:, :-1]])
+        y = datos[:, -1]
+        xtx += X.T @ X
+        xty += X.T @ y
+        yty += float(y @ y)
+        suma_y += float(y.sum())
+        n += len(y)
+    if n <= k:
+        return None
+
+    b = np.linalg.lstsq(xtx, xty, rcond=None)[0]
+    residual = yty - 2 * b @ xty + b @ xtx @ b
+    total = yty - suma_y**2 / n
+    r2 = float(1 - residual / total) if total > 0 else float("nan")
+    return ModeloLineal(objetivo, list(predictores), b.tolist(), r2, n)
+
+
+def _a_json(valor: Any) -> Any:
+    """Convertir escalares de NumPy y NaN para ``json.dumps``"""
+    if hasattr(valor, "item"):
+        valor = valor.item()
+    if isinstance(valor, float) and valor != valor:
+        return None
+    return valor
+
+
+def _codificar(datos: Any) -> bytes:
+    return json.dumps(datos, ensure_ascii=False, default=_a_json).encode("utf-8")
+
+
+def _firma(ruta: Path) -> tuple[int, int]:
+    stat = ruta.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+@dataclass
+class Estado:
+    """Resultados de una versión del archivo"""
+
+    generacion: int
+    firma: tuple[int, int]
+    resumen: "ResumenEDA"
+    cubo: "CuboAgregado"
+    modelo: ModeloLineal | None
+    actualizado: float
+
+
+class ServicioDatos:
+    """Resumen, desgloses y predicciones de ``ruta`` con caché en memoria.
+
+    Los resultados pesados (resumen EDA, cubo de conteos y modelo) se
+    calculan una vez por versión del archivo con ``CacheAnalisis``, así que
+    una resincronización que solo añade filas se incorpora de forma
+    incremental. Las respuestas ya codificadas se guardan en una ``CacheLRU``
+    con la generación del archivo en la clave: al detectar un cambio se
+    carga la nueva versión en segundo plano mientras se sigue respondiendo
+    con la anterior, y después se vacía la caché.
+    """
+
+    def __init__(
+        self,
+        ruta: str | Path,
+        *,
+        cache: CacheLRU | None = None,
+        cache_analisis: "CacheAnalisis | None" = None,
+        intervalo: float = INTERVALO_VIGILANCIA,
+    ):
+        self.ruta = Path(ruta)
+        self.cache = cache or CacheLRU()
+        self._cache_analisis = cache_analisis
+        self.intervalo = intervalo
+        self.estado: Estado | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def cache_analisis(self) -> "CacheAnalisis":
+        if self._cache_analisis is None:
+            from curso_machine_learning.analisis.cache import CacheAnalisis
+
+            self._cache_analisis = CacheAnalisis()
+        return self._cache_analisis
+
+    def _calcular_estado(self, firma: tuple[int, int], generacion: int) -> Estado:
+        ruta = self.ruta
+        resumen = self.cache_analisis.resumen_eda(ruta)
+        cubo = self.cache_analisis.cubo(ruta)
+        modelo = self.cache_analisis.obtener(
+            ruta,
+            "modelo_lineal",
+            {"objetivo": OBJETIVO, "predictores": list(PREDICTORES)},
+            lambda: ajustar_modelo(ruta),
+        )
+        return Estado(generacion, firma, resumen, cubo, modelo, time.time())
+
+    async def cargar(self) -> bool:
+        """Cargar la versión actual del archivo si cambió; indica si lo hizo"""
+        async with self._lock:
+            firma = _firma(self.ruta)
+            if self.estado is not None and self.estado.firma == firma:
+                return False
+            generacion = self.estado.generacion + 1 if self.estado else 1
+            estado = await asyncio.to_thread(self._calcular_estado, firma, generacion)
+            self.estado = estado
+            self.cache.limpiar()
+            print(
+                f"🔄 '{self.ruta}' cargado: {estado.resumen.filas} filas "
+                f"(generación {generacion})"
+            )
+            return True
+
+    async def vigilar(self) -> None:
+        """Recargar en segundo plano cada vez que el archivo cambie"""
+        while True:
+            await asyncio.sleep(self.intervalo)
+            try:
+                await self.cargar()
+            except (OSError, ValueError) as e:
+                # Se sigue respondiendo con la última versión cargada
+                print(f"⚠️ No se pudo recargar '{self.ruta}': {e}")
+
+    async def consultar(
+        self, operacion: str, parametros: dict[str, list[str]]
+    ) -> tuple[bytes, bool]:
+        """Respuesta JSON de ``operacion`` y si salió de la caché"""
+        funcion = OPERACIONES.get(operacion)
+        if funcion is None:
+            raise KeyError(operacion)
+        estado = self.estado
+        if estado is None:
+            raise DatosNoCargados("Los datos aún no están cargados")
+
+        clave = (
+            estado.generacion,
+            operacion,
+            tuple(sorted((k, tuple(v)) for k, v in parametros.items())),
+        )
+
+        async def calcular() -> bytes:
+            return await asyncio.to_thread(
+                lambda: _codificar(funcion(self, estado, parametros))
+            )
+
+        return await self.cache.obtener(clave, calcular)
+
+    def informacion(self) -> dict[str, Any]:
+        """Archivo, generación y estado de la caché"""
+        estado = self.estado
+        return {
+            "archivo": str(self.ruta),
+            "generacion": estado.generacion if estado else None,
+            "filas": estado.resumen.filas if estado else None,
+            "actualizado": estado.actualizado if estado else None,
+            "cache": self.cache.estado(),
+        }
+
+
+def _valores(parametros: dict[str, list[str]], nombre: str) -> list[str]:
+    """Valores de un parámetro repetido o separado por comas"""
+    return [v for valor in parametros.get(nombre, []) for v in valor.split(",") if v]
+
+
+def _entero(parametros: dict[str, list[str]], nombre: str, defecto: int) -> int:
+    valores = _valores(parametros, nombre)
+    try:
+        return int(valores[-1]) if valores else defecto
+    except ValueError:
+        raise ErrorConsulta(f"'{nombre}' debe ser un entero") from None
+
+
+def resumen(
+    servicio: ServicioDatos, estado: Estado, parametros: dict[str, list[str]]
+) -> dict[str, Any]:
+    """Filas, columnas, nulos, estadísticas descriptivas y distribuciones"""
+    r = estado.resumen
+    return {
+        "archivo": str(servicio.ruta),
+        "generacion": estado.generacion,
+        "filas": r.filas,
+        "columnas": [
+            {"nombre": col, "tipo": r.tipos[col], "nulos": r.nulos[col]}
+            for col in r.columnas
+        ],
+        "estadisticas": {
+            col: {k: _a_json(v) for k, v in estadisticas.items()}
+            for col, estadisticas in r.describe().to_dict().items()
+        },
+        "distribuciones": {
+            col: {str(k): v for k, v in r.value_counts(col).items()}
+            for col in r.categoricos
+        },
+    }
+
+
+def desglose(
+    servicio: ServicioDatos, estado: Estado, parametros: dict[str, list[str]]
+) -> dict[str, Any]:
+    """Conteos por ``por`` (p. ej. ``LOCALIDAD,AÑO``) con el resto de
+    parámetros como filtros ``DIMENSION=valor[,valor...]``"""
+    por = _valores(parametros, "por")
+    limite = _entero(parametros, "limite", LIMITE_DESGLOSE)
+    filtros = {
+        k: _valores(parametros, k) for k in parametros if k not in ("por", "limite")
+    }
+    try:
+        conteos = estado.cubo.consultar(por, filtros)
+    except KeyError as e:
+        raise ErrorConsulta(e.args[0]) from None
+
+    total = int(conteos.sum())
+    if por:
+        conteos = conteos[conteos > 0].sort_values(ascending=False, kind="stable")
+    filas = [
+        {**dict(zip(por, k if len(por) > 1 else (k,))), "conteo": int(v)}
+        for k, v in conteos.head(limite).items()
+    ]
+    return {
+        "generacion": estado.generacion,
+        "por": por,
+        "filtros": filtros,
+        "total": total,
+        "filas": filas if por else [],
+    }
+
+
+def prediccion(
+    servicio: ServicioDatos, estado: Estado, parametros: dict[str, list[str]]
+) -> dict[str, Any]:
+    """Predicción del modelo lineal para ``EDAD_MESES=..&TALLA_CM=..``"""
+    modelo = estado.modelo
+    if modelo is None:
+        raise ErrorConsulta(
+            f"El archivo no tiene las columnas del modelo: {OBJETIVO}, "
+            f"{', '.join(PREDICTORES)}"
+        )
+    parametros = {k.upper(): v for k, v in parametros.items()}
+    try:
+        valores = {
+            p: [float(v) for v in _valores(parametros, p)] for p in modelo.predictores
+        }
+    except ValueError:
+        raise ErrorConsulta("Los predictores deben ser números") from None
+    largos = {len(v) for v in valores.values()}
+    if len(largos) != 1 or 0 in largos:
+        raise ErrorConsulta(
+            f"Indique el mismo número de valores de {', '.join(modelo.predictores)}"
+        )
+    return {
+        "generacion": estado.generacion,
+        "objetivo": modelo.objetivo,
+        "coeficientes": dict(
+            zip(["intercepto", *modelo.predictores], modelo.coeficientes)
+        ),
+        "r2": _a_json(modelo.r2),
+        "filas": modelo.filas,
+        "entradas": valores,
+        "predicciones": modelo.predecir(valores),
+    }
+
+
+OPERACIONES: dict[
+    str, Callable[[ServicioDatos, Estado, dict[str, list[str]]], dict[str, Any]]
+] = {
+    "resumen": resumen,
+    "desglose": desglose,
+    "prediccion": prediccion,
+}
@@ -0,0 +1,172 @@
+"""
+Servidor HTTP/1.1 sobre asyncio para ``ServicioDatos`` (solo biblioteca estándar)
+"""
+
+import asyncio
+import json
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+from curso_machine_learning.infraestructura.api.cache import (
+    MAX_ENTRADAS,
+    TTL_SEGUNDOS,
+    CacheLRU,
+)
+from curso_machine_learning.infraestructura.api.servicio import (
+    INTERVALO_VIGILANCIA,
+    OPERACIONES,
+    DatosNoCargados,
+    ErrorConsulta,
+    ServicioDatos,
+)
+
+HOST = "127.0.0.1"
+PUERTO = 8000
+# Tamaño máximo de la línea de petición y de cada cabecera
+MAX_LINEA = 16 * 1024
+
+
+def _respuesta(
+    estado: int, cuerpo: bytes, *, mantener: bool, cabeceras: dict[str, str]
+) -> bytes:
+    """Respuesta HTTP/1.1 completa con cuerpo JSON"""
+    lineas = [
+        f"HTTP/1.1 {estado} {HTTPStatus(estado).phrase}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(cuerpo)}",
+        f"Connection: {'keep-alive' if mantener else 'close'}",
+        *(f"{k}: {v}" for k, v in cabeceras.items()),
+    ]
+    return ("\r\n".join(lineas) + "\r\n\r\n").encode("latin-1") + cuerpo
+
+
+def _error(mensaje: str) -> bytes:
+    return json.dumps({"error": mensaje}, ensure_ascii=False).encode("utf-8")
+
+
+async def responder(
+    servicio: ServicioDatos, metodo: str, objetivo: str
+) -> tuple[int, bytes, dict[str, str]]:
+    """Estado, cuerpo y cabeceras extra para ``metodo objetivo``"""
+    if metodo != "GET":
+        return 405, _error("Solo se admite GET"), {"Allow": "GET"}
+
+    partes = urlsplit(objetivo)
+    ruta = partes.path.rstrip("/") or "/"
+    parametros = parse_qs(partes.query)
+    if ruta == "/salud":
+        return 200, b'{"ok": true}', {}
+    if ruta == "/estado":
+        return 200, json.dumps(servicio.informacion()).encode("utf-8"), {}
+
+    operacion = ruta.lstrip("/")
+    if operacion not in OPERACIONES:
+        return 404, _error(f"Ruta desconocida: {ruta}"), {}
+    try:
+        cuerpo, en_cache = await servicio.consultar(operacion, parametros)
+    except ErrorConsulta as e:
+        return 400, _error(str(e)), {}
+    except DatosNoCargados as e:
+        return 503, _error(str(e)), {"Retry-After": "1"}
+    return 200, cuerpo, {"X-Cache": "HIT" if en_cache else "MISS"}
+
+
+async def atender(
+    servicio: ServicioDatos,
+    lector: asyncio.StreamReader,
+    escritor: asyncio.StreamWriter,
+) -> None:
+    """Atender las peticiones de una conexión (con keep-alive)"""
+    try:
+        while True:
+            linea = await lector.readline()
+            if not linea:
+                break
+            try:
+                # Se aceptan rutas con UTF-8 sin codificar, además de %XX
+                metodo, objetivo, version = linea.decode("utf-8", "replace").split()
+            except ValueError:
+                escritor.write(
+                    _respuesta(
+                        400,
+                        _error("Petición mal formada"),
+                        mantener=False,
+                        cabeceras={},
+                    )
+                )
+                break
+
+            cabeceras = {}
+            while (cabecera := await lector.readline()) not in (b"\r\n", b"\n", b""):
+                nombre, _, valor = cabecera.decode("latin-1").partition(":")
+                cabeceras[nombre.strip().lower()] = valor.strip()
+            # Descartar el cuerpo para poder leer la siguiente petición
+            largo = int(cabeceras.get("content-length") or 0)
+            if largo:
+                await lector.readexactly(largo)
+
+            conexion = cabeceras.get("connection", "").lower()
+            if version == "HTTP/1.1":
+                mantener = conexion != "close"
+            else:
+                mantener = conexion == "keep-alive"
+
+            try:
+                estado, cuerpo, extra = await responder(servicio, metodo, objetivo)
+            except Exception as e:
+                estado, cuerpo, extra = 500, _error(f"{type(e).__name__}: {e}"), {}
+            escritor.write(
+                _respuesta(estado, cuerpo, mantener=mantener, cabeceras=extra)
+            )
+            await escritor.drain()
+            if not mantener:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        # Cliente desconectado, cabecera demasiado larga o Content-Length inválido
+        pass
+    finally:
+        escritor.close()
+
+
+async def iniciar_servidor(
+    servicio: ServicioDatos, host: str = HOST, puerto: int = PUERTO
+) -> asyncio.Server:
+    """Empezar a aceptar conexiones (``puerto=0`` elige uno libre)"""
+
+    async def conexion(
+        lector: asyncio.StreamReader, escritor: asyncio.StreamWriter
+    ) -> None:
+        await atender(servicio, lector, escritor)
+
+    return await asyncio.start_server(conexion, host, puerto, limit=MAX_LINEA)
+
+
+async def servir(
+    ruta: str | Path,
+    host: str = HOST,
+    puerto: int = PUERTO,
+    *,
+    ttl: float = TTL_SEGUNDOS,
+    max_entradas: int = MAX_ENTRADAS,
+    intervalo: float = INTERVALO_VIGILANCIA,
+) -> None:
+    """Cargar ``ruta`` y servirla hasta que se interrumpa el proceso"""
+    servicio = ServicioDatos(
+        ruta, cache=CacheLRU(max_entradas, ttl), intervalo=intervalo
+    )
+    await servicio.cargar()
+    servidor = await iniciar_servidor(servicio, host, puerto)
+    direccion: Any = servidor.sockets[0].getsockname()
+    print(f"🌐 Sirviendo '{ruta}' en http://{direccion[0]}:{direccion[1]}")
+    print(
+        "   /resumen  /desglose?por=LOCALIDAD,AÑO  /prediccion?EDAD_MESES=24&TALLA_CM=85"
+    )
+
+    vigilancia = asyncio.create_task(servicio.vigilar())
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        vigilancia.cancel()
@@ -0,0 +1,644 @@
+"""
+Cliente para la API datastore_search de CKAN (datos abiertos de Bogotá)
+"""
+
+import functools
+import json
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Mapping, overload
+from urllib.parse import urlencode
+
+import urllib3
+
+from curso_machine_learning.infraestructura import trazas
+from curso_machine_learning.infraestructura.cliente_http import (
+    MAX_CONEXIONES,
+    ClienteHTTP,
+    ErrorHTTP,
+    cliente_compartido,
+    crear_retry,
+)
+from curso_machine_learning.infraestructura.sumideros import crear_sumidero
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+BASE_URL = "https://datosabiertos.bogota.gov.co/api/3/action/datastore_search"
+
+Page = tuple[int, int, list[dict[str, Any]]]
+
+
+@functools.cache
+def _parser_json() -> Callable[[bytes], Any]:
+    """``orjson.loads`` si está instalado (varias veces más rápido), si no
+    ``json.loads``"""
+    try:
+        import orjson
+    except ImportError:
+        return json.loads
+    return orjson.loads
+
+
+def _identificador_sql(nombre: str) -> str:
+    return '"' + nombre.replace('"', '""') + '"'
+
+
+def _literal_sql(valor: Any) -> str:
+    if valor is None:
+        return "NULL"
+    if isinstance(valor, bool):
+        return "TRUE" if valor else "FALSE"
+    if isinstance(valor, (int, float)):
+        return repr(valor)
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+@dataclass(frozen=True)
+class DatastoreQuery:
+    """Columnas y condiciones que se resuelven en el servidor.
+
+    ``fields`` limita las columnas devueltas; ``filters`` pide igualdad (una
+    lista equivale a "cualquiera de"); ``ranges`` pide ``min <= campo <= max``
+    con extremos opcionales (``None``); ``q`` es la búsqueda de texto de
+    CKAN y ``sort`` el orden (``"AÑO desc, LOCALIDAD"``).
+
+    ``datastore_search`` no admite rangos, así que con ``ranges`` (y sin
+    ``q``) la consulta se envía como SQL a ``datastore_search_sql``; con
+    ``q`` los rangos se aplican en local sobre cada página.
+    """
+
+    fields: tuple[str, ...] = ()
+    filters: Mapping[str, Any] = field(default_factory=dict)
+    ranges: Mapping[str, tuple[Any, Any]] = field(default_factory=dict)
+    q: str | None = None
+    sort: str | None = None
+
+    @property
+    def uses_sql(self) -> bool:
+        """Indicar si hay que usar ``datastore_search_sql``"""
+        return bool(self.ranges) and self.q is None
+
+    def params(self) -> dict[str, str]:
+        """Parámetros de ``datastore_search`` (sin los rangos)"""
+        params = {}
+        if self.fields:
+            params["fields"] = ",".join(self.fields)
+        if self.filters:
+            params["filters"] = json.dumps(dict(self.filters), ensure_ascii=False)
+        if self.q:
+            params["q"] = self.q
+        if self.sort:
+            params["sort"] = self.sort
+        return params
+
+    def _where(self) -> str:
+        condiciones = []
+        for campo, valor in self.filters.items():
+            columna = _identificador_sql(campo)
+            if isinstance(valor, (list, tuple)):
+                valores = ", ".join(_literal_sql(v) for v in valor)
+                condiciones.append(f"{columna} IN ({valores})")
+            else:
+                condiciones.append(f"{columna} = {_literal_sql(valor)}")
+        for campo, (minimo, maximo) in self.ranges.items():
+            columna = _identificador_sql(campo)
+            if minimo is not None:
+                condiciones.append(f"{columna} >= {_literal_sql(minimo)}")
+            if maximo is not None:
+                condiciones.append(f"{columna} <= {_literal_sql(maximo)}")
+        return f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+    def _order_by(self) -> str:
+        if not self.sort:
+            # Orden estable para que LIMIT/OFFSET no repita ni salte filas
+            return ' ORDER BY "_id"'
+        partes = []
+        for parte in self.sort.split(","):
+            campo, _, direccion = parte.strip().partition(" ")
+            direccion = direccion.strip().upper()
+            sufijo = f" {direccion}" if direccion in ("ASC", "DESC") else ""
+            partes.append(_identificador_sql(campo) + sufijo)
+        return f" ORDER BY {', '.join(partes)}"
+
+    def sql(self, resource_id: str, *, limit: int, offset: int) -> str:
+        """``SELECT`` de una página para ``datastore_search_sql``"""
+        columnas = ", ".join(map(_identificador_sql, self.fields)) or "*"
+        return (
+            f"SELECT {columnas} FROM {_identificador_sql(resource_id)}"
+            f"{self._where()}{self._order_by()} LIMIT {limit} OFFSET {offset}"
+        )
+
+    def count_sql(self, resource_id: str) -> str:
+        """``SELECT COUNT(*)`` con las mismas condiciones"""
+        return (
+            f"SELECT COUNT(*) AS total FROM {_identificador_sql(resource_id)}"
+            f"{self._where()}"
+        )
+
+    def without_ranges(self) -> "DatastoreQuery":
+        """Consulta para ``datastore_search`` cuyos rangos se filtran en local"""
+        fields = self.fields
+        if fields:
+            fields += tuple(c for c in self.ranges if c not in fields)
+        return replace(self, fields=fields, ranges={})
+
+    def matches(self, record: Mapping[str, Any]) -> bool:
+        """Indicar si ``record`` cumple los rangos"""
+        for campo, (minimo, maximo) in self.ranges.items():
+            valor = record.get(campo)
+            if valor is None:
+                return False
+            if minimo is not None and valor < minimo:
+                return False
+            if maximo is not None and valor > maximo:
+                return False
+        return True
+
+    def apply_ranges(self, records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Filtrar por rangos en local y quitar las columnas añadidas para ello"""
+        filtrados = [r for r in records if self.matches(r)]
+        if not self.fields:
+            return filtrados
+        return [{k: r[k] for k in self.fields if k in r} for r in filtrados]
+
+
+def action_url(accion: str, base_url: str = BASE_URL) -> str:
+    """URL de otra acción de la API junto a la de ``datastore_search``"""
+    return f"{base_url.rsplit('/', 1)[0]}/{accion}"
+
+
+def sql_url(base_url: str = BASE_URL) -> str:
+    """URL de ``datastore_search_sql`` junto a la de ``datastore_search``"""
+    return action_url("datastore_search_sql", base_url)
+
+
+def crear_pool(concurrency: int = 1) -> ClienteHTTP:
+    """Cliente HTTP con al menos tantas conexiones como hilos de descarga.
+
+    Hasta ``MAX_CONEXIONES`` hilos se usa el cliente compartido, de modo que
+    las páginas sucesivas (y otras descargas) reutilizan las conexiones TLS.
+    """
+    if concurrency <= MAX_CONEXIONES:
+        return cliente_compartido()
+    return ClienteHTTP(maxsize=concurrency)
+
+
+def fetch_page(
+    http: ClienteHTTP,
+    resource_id: str,
+    *,
+    limit: int,
+    offset: int,
+    base_url: str = BASE_URL,
+    retries: int | None = None,
+    query: DatastoreQuery | None = None,
+    records_format: str | None = None,
+) -> dict[str, Any]:
+    """Descargar una página de datastore_search y devolver su ``result``.
+
+    Con ``query`` solo viajan las columnas y filas pedidas (por SQL si hay
+    rangos; esas respuestas no traen ``total``). Los errores de conexión,
+    timeouts y respuestas 429/5xx los reintenta el cliente HTTP
+    (``retries`` veces) antes de lanzar ``ErrorHTTP``. Con
+    ``records_format="lists"`` cada registro llega como una lista en el
+    orden de ``fields`` (``datastore_search_sql`` lo ignora).
+    """
+    if query is not None and query.uses_sql:
+        accion = "datastore_search_sql"
+        sql = query.sql(resource_id, limit=limit, offset=offset)
+        url = f"{sql_url(base_url)}?{urlencode({'sql': sql})}"
+    else:
+        accion = "datastore_search"
+        params = {"resource_id": resource_id, "limit": limit, "offset": offset}
+        if query is not None:
+            params.update(query.params())
+        if records_format is not None:
+            params["records_format"] = records_format
+        url = f"{base_url}?{urlencode(params)}"
+    with trazas.span("pagina", offset=offset, limit=limit):
+        return _get_result(http, url, accion, retries=retries)
+
+
+def _get_result(
+    http: ClienteHTTP, url: str, accion: str, *, retries: int | None
+) -> dict[str, Any]:
+    """Hacer la petición y devolver el ``result`` de la respuesta CKAN"""
+    reintentos = None if retries is None else crear_retry(retries)
+    resp = http.get(url, retries=reintentos)
+
+    if resp.status != 200:
+        raise ErrorHTTP(resp.status, accion)
+
+    payload = _parser_json()(resp.data)
+    if not payload.get("success"):
+        raise RuntimeError(f"Respuesta no exitosa: {payload}")
+
+    result: dict[str, Any] = payload["result"]
+    trazas.registrar(bytes=len(resp.data), filas=len(result.get("records", [])))
+    return result
+
+
+def count_records(
+    http: ClienteHTTP,
+    resource_id: str,
+    query: DatastoreQuery,
+    *,
+    retries: int = 3,
+    base_url: str = BASE_URL,
+) -> int:
+    """Número de registros que cumplen ``query``, sin descargarlos"""
+    if not query.uses_sql:
+        result = fetch_page(
+            http,
+            resource_id,
+            limit=0,
+            offset=0,
+            base_url=base_url,
+            retries=retries,
+            query=query,
+        )
+        return int(result.get("total", 0))
+
+    sql = query.count_sql(resource_id)
+    url = f"{sql_url(base_url)}?{urlencode({'sql': sql})}"
+    result = _get_result(http, url, "datastore_search_sql", retries=retries)
+    return int(result["records"][0]["total"])
+
+
+def fetch_resource(
+    http: ClienteHTTP,
+    resource_id: str,
+    *,
+    retries: int = 3,
+    base_url: str = BASE_URL,
+) -> dict[str, Any]:
+    """Metadatos del recurso (``resource_show``): ``last_modified``,
+    ``metadata_modified``, ``datastore_active``..."""
+    url = f"{action_url('resource_show', base_url)}?{urlencode({'id': resource_id})}"
+    return _get_result(http, url, "resource_show", retries=retries)
+
+
+def fetch_page_with_retries(
+    http: ClienteHTTP,
+    resource_id: str,
+    *,
+    limit: int,
+    offset: int,
+    retries: int = 3,
+    backoff: float = 0.5,
+    base_url: str = BASE_URL,
+    query: DatastoreQuery | None = None,
+    records_format: str | None = None,
+) -> dict[str, Any]:
+    """Descargar una página reintentando con espera exponencial si falla.
+
+    Los fallos HTTP ya los reintenta el cliente; aquí se reintentan las
+    respuestas 200 inválidas (JSON cortado, ``success: false``) y los cortes
+    de conexión a mitad del cuerpo.
+    """
+    for intento in range(retries + 1):
+        try:
+            return fetch_page(
+                http,
+                resource_id,
+                limit=limit,
+                offset=offset,
+                base_url=base_url,
+                retries=retries,
+                query=query,
+                records_format=records_format,
+            )
+        except (ErrorHTTP, urllib3.exceptions.MaxRetryError):
+            raise
+        except (RuntimeError, ValueError, urllib3.exceptions.HTTPError) as e:
+            if intento == retries:
+                raise
+            print(f"Reintentando offset {offset} ({intento + 1}/{retries}): {e}")
+            time.sleep(backoff * 2**intento)
+
+    raise AssertionError("inalcanzable")
+
+
+def _fetch_block(
+    http: ClienteHTTP,
+    resource_id: str,
+    *,
+    start: int,
+    end: int,
+    retries: int,
+    base_url: str,
+    query: DatastoreQuery | None = None,
+    records_format: str | None = None,
+) -> dict[str, Any]:
+    """Descargar el bloque de registros [start, end) completando páginas cortas.
+
+    Devuelve el ``result`` de la primera página con los registros de todas.
+    """
+    bloque: dict[str, Any] = {}
+    records: list[Any] = []
+    while start + len(records) < end:
+        offset = start + len(records)
+        result = fetch_page_with_retries(
+            http,
+            resource_id,
+            limit=end - offset,
+            offset=offset,
+            retries=retries,
+            base_url=base_url,
+            query=query,
+            records_format=records_format,
+        )
+        bloque = bloque or result
+        page = result.get("records", [])
+        if not page:
+            break
+        records.extend(page)
+    return {**bloque, "records": records}
+
+
+def _iter_results(
+    http: ClienteHTTP,
+    resource_id: str,
+    *,
+    limit: int,
+    concurrency: int,
+    retries: int,
+    base_url: str,
+    start: int,
+    query: DatastoreQuery | None,
+    known_total: int | None = None,
+    records_format: str | None = None,
+) -> Iterator[tuple[int, int, dict[str, Any]]]:
+    """``(offset, total, result)`` de cada página en orden de offset; ver
+    ``iter_pages``"""
+    if concurrency <= 1:
+        offset = start
+        total = known_total
+        while True:
+            result = fetch_page_with_retries(
+                http,
+                resource_id,
+                limit=limit,
+                offset=offset,
+                retries=retries,
+                base_url=base_url,
+                query=query,
+                records_format=records_format,
+            )
+            if total is None:
+                total = int(result.get("total", 0))
+
+            records = result.get("records", [])
+            yield offset, total, result
+
+            offset += len(records)
+            if not records or offset >= total:
+                return
+
+    first = fetch_page_with_retries(
+        http,
+        resource_id,
+        limit=limit,
+        offset=start,
+        retries=retries,
+        base_url=base_url,
+        query=query,
+        records_format=records_format,
+    )
+    total = known_total if known_total is not None else int(first.get("total", 0))
+    records = first.get("records", [])
+    yield start, total, first
+
+    if not records:
+        return
+
+    offsets = iter(range(start + len(records), total, limit))
+    pendientes: deque[tuple[int, Future[dict[str, Any]]]] = deque()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+
+        def enviar() -> None:
+            inicio = next(offsets, None)
+            if inicio is None:
+                return
+            future = pool.submit(
+                _fetch_block,
+                http,
+                resource_id,
+                start=inicio,
+                end=min(inicio + limit, total),
+                retries=retries,
+                base_url=base_url,
+                query=query,
+                records_format=records_format,
+            )
+            pendientes.append((inicio, future))
+
+        try:
+            for _ in range(concurrency):
+                enviar()
+
+            while pendientes:
+                inicio, future = pendientes.popleft()
+                block = future.result()
+                enviar()
+                yield inicio, total, block
+        finally:
+            for _, future in pendientes:
+                future.cancel()
+
+
+def iter_pages(
+    resource_id: str,
+    *,
+    limit: int = 1000,
+    concurrency: int = 1,
+    retries: int = 3,
+    base_url: str = BASE_URL,
+    start: int = 0,
+    query: DatastoreQuery | None = None,
+    http: ClienteHTTP | None = None,
+) -> Iterator[Page]:
+    """Recorrer las páginas de un recurso en orden de offset.
+
+    Produce tuplas ``(offset, total, records)`` empezando en ``start``. Con
+    ``concurrency > 1`` la primera página fija el ``total`` y el resto de
+    offsets se descargan en un pool de hilos acotado; como mucho
+    ``concurrency`` páginas quedan en memoria a la espera de ser consumidas.
+
+    Con ``query`` los offsets y el ``total`` se refieren a las filas que la
+    cumplen. Si el portal no permite ``datastore_search_sql``, o si hay
+    ``q`` además de rangos, los rangos se filtran en local: entonces
+    ``total`` y ``offset`` cuentan las filas antes de aplicar los rangos y
+    las páginas pueden llegar más cortas.
+
+    ``http`` permite compartir un cliente (y sus límites) entre recursos.
+    """
+    http = http or crear_pool(concurrency)
+
+    local: DatastoreQuery | None = None
+    known_total: int | None = None
+    if query is not None and query.uses_sql:
+        try:
+            known_total = count_records(
+                http, resource_id, query, retries=retries, base_url=base_url
+            )
+        except ErrorHTTP as e:
+            print(f"⚠️ Sin datastore_search_sql ({e}): los rangos se filtran en local")
+            local, query = query, query.without_ranges()
+    elif query is not None and query.ranges:
+        # Con ``q`` la consulta no va por SQL: los rangos no llegan al servidor
+        local, query = query, query.without_ranges()
+
+    for offset, total, result in _iter_results(
+        http,
+        resource_id,
+        limit=limit,
+        concurrency=concurrency,
+        retries=retries,
+        base_url=base_url,
+        start=start,
+        query=query,
+        known_total=known_total,
+    ):
+        records = result.get("records", [])
+        yield offset, total, records if local is None else local.apply_ranges(records)
+
+
+def _fetch_dataframe(
+    resource_id: str,
+    *,
+    limit: int,
+    concurrency: int,
+    retries: int,
+    base_url: str,
+    query: DatastoreQuery | None,
+) -> "pd.DataFrame":
+    """Descargar un recurso directamente en columnas tipadas.
+
+    Las páginas se piden con ``records_format=lists`` y se copian en los
+    arrays de ``DecodificadorColumnas`` (reservados con el ``total`` de la
+    primera página), sin crear un dict por registro.
+    """
+    from curso_machine_learning.infraestructura.decodificacion import (
+        DecodificadorColumnas,
+    )
+
+    decodificador: DecodificadorColumnas | None = None
+    for _, total, result in _iter_results(
+        crear_pool(concurrency),
+        resource_id,
+        limit=limit,
+        concurrency=concurrency,
+        retries=retries,
+        base_url=base_url,
+        start=0,
+        query=query,
+        records_format="lists",
+    ):
+        if decodificador is None:
+            decodificador = DecodificadorColumnas(result.get("fields", []), total)
+        decodificador.agregar(result.get("records", []))
+        print(f"Descargados {decodificador.filas}/{total} registros")
+
+    assert decodificador is not None
+    return decodificador.a_dataframe()
+
+
+@overload
+def fetch_all_records(
+    resource_id: str,
+    *,
+    limit: int = ...,
+    concurrency: int = ...,
+    retries: int = ...,
+    base_url: str = ...,
+    out_path: None = ...,
+    query: DatastoreQuery | None = ...,
+) -> "pd.DataFrame": ...
+
+
+@overload
+def fetch_all_records(
+    resource_id: str,
+    *,
+    limit: int = ...,
+    concurrency: int = ...,
+    retries: int = ...,
+    base_url: str = ...,
+    out_path: str | Path,
+    query: DatastoreQuery | None = ...,
+) -> tuple[Path, int]: ...
+
+
+def fetch_all_records(
+    resource_id: str,
+    *,
+    limit: int = 1000,
+    concurrency: int = 1,
+    retries: int = 3,
+    base_url: str = BASE_URL,
+    out_path: str | Path | None = None,
+    query: DatastoreQuery | None = None,
+) -> "pd.DataFrame | tuple[Path, int]":
+    """Descargar todos los registros de un recurso.
+
+    Sin ``out_path`` devuelve un DataFrame armado por columnas tipadas según
+    los ``fields`` de CKAN (salvo con rangos, que se filtran sobre
+    registros completos). Con ``out_path`` cada página se escribe
+    directamente en disco (CSV, o Parquet si la extensión es ``.parquet``)
+    y se devuelve ``(ruta, filas)``, de modo que la memoria usada no
+    depende del tamaño del recurso. ``query`` restringe columnas y filas en
+    el servidor, por ejemplo::
+
+        DatastoreQuery(
+            fields=("LOCALIDAD", "AÑO", "CLASIFICACION"),
+            filters={"LOCALIDAD": "SUBA"},
+            ranges={"AÑO": (2020, 2023)},
+        )
+    """
+    with trazas.span("fetch_all_records", resource_id=resource_id) as span:
+        if out_path is None and (query is None or not query.ranges):
+            df = _fetch_dataframe(
+                resource_id,
+                limit=limit,
+                concurrency=concurrency,
+                retries=retries,
+                base_url=base_url,
+                query=query,
+            )
+            span.registrar(filas=len(df))
+            return df
+
+        pages = iter_pages(
+            resource_id,
+            limit=limit,
+            concurrency=concurrency,
+            retries=retries,
+            base_url=base_url,
+            query=query,
+        )
+
+        if out_path is not None:
+            with crear_sumidero(out_path) as sumidero:
+                for _, total, records in pages:
+                    sumidero.escribir(records)
+                    print(f"Descargados {sumidero.filas}/{total} registros")
+            span.registrar(filas=sumidero.filas)
+            return sumidero.ruta, sumidero.filas
+
+        import pandas as pd
+
+        all_records: list[dict[str, Any]] = []
+
+        for _, total, records in pages:
+            all_records.extend(records)
+            print(f"Descargados {len(all_records)}/{total} registros")
+
+        span.registrar(filas=len(all_records))
+        return pd.DataFrame(all_records)
@@ -0,0 +1,178 @@
+"""
+Cliente HTTP compartido: conexiones persistentes, reintentos y compresión
+"""
+
+import functools
+import ssl
+import threading
+import time
+from typing import Any, Mapping
+from urllib.parse import urlsplit
+
+import urllib3
+from urllib3 import BaseHTTPResponse, PoolManager
+from urllib3.util import Retry, make_headers
+
+# Desactivar advertencias SSL
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# Conexiones que se mantienen abiertas por host
+MAX_CONEXIONES = 16
+# Respuestas que se reintentan (además de errores de conexión y timeouts)
+ESTADOS_REINTENTABLES = (429, 500, 502, 503, 504)
+# Redirecciones que se siguen (no cuentan como reintentos)
+MAX_REDIRECCIONES = 5
+# Espera máxima por límite de peticiones anunciado por el servidor
+MAX_ESPERA_LIMITE = 60.0
+
+
+class ErrorHTTP(RuntimeError):
+    """Respuesta con estado de error después de agotar los reintentos"""
+
+    def __init__(self, status: int, url: str):
+        super().__init__(f"HTTP {status} al consultar {url}")
+        self.status = status
+        self.url = url
+
+
+@functools.cache
+def contexto_ssl() -> ssl.SSLContext:
+    """Contexto SSL sin verificación, creado al primer uso.
+
+    Cargar los certificados del sistema cuesta decenas de milisegundos, así
+    que no se hace al importar el módulo.
+    """
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+    return ssl_context
+
+
+def crear_retry(
+    intentos: int = 3,
+    backoff: float = 0.5,
+    *,
+    lectura: int | None = None,
+    conexion: int | None = None,
+) -> Retry:
+    """Reintentos con espera exponencial para GET/HEAD.
+
+    Cubre errores de conexión, timeouts y los estados de
+    ``ESTADOS_REINTENTABLES``; ante 429/503 con ``Retry-After`` se espera lo
+    que indique el servidor. Agotados los intentos se devuelve la última
+    respuesta en lugar de lanzar la excepción. Las redirecciones se cuentan
+    aparte, así que con ``intentos=0`` se siguen igual. ``lectura`` y
+    ``conexion`` fijan por separado los reintentos de timeouts de lectura y
+    de errores de conexión (por defecto, ``intentos``).
+    """
+    return Retry(
+        total=None,
+        connect=intentos if conexion is None else conexion,
+        read=intentos if lectura is None else lectura,
+        status=intentos,
+        other=intentos,
+        redirect=MAX_REDIRECCIONES,
+        backoff_factor=backoff,
+        status_forcelist=ESTADOS_REINTENTABLES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def _segundos_hasta_reinicio(headers: Mapping[str, str]) -> float | None:
+    """Espera pedida por cabeceras ``RateLimit-*`` / ``X-RateLimit-*``"""
+    for prefijo in ("RateLimit", "X-RateLimit"):
+        if headers.get(f"{prefijo}-Remaining") != "0":
+            continue
+        try:
+            espera = float(headers.get(f"{prefijo}-Reset", "1"))
+        except ValueError:
+            espera = 1.0
+        # Algunos servidores envían un instante epoch en lugar de segundos
+        if espera > 1e9:
+            espera -= time.time()
+        return min(max(espera, 0.0), MAX_ESPERA_LIMITE)
+    return None
+
+
+class ClienteHTTP:
+    """Cliente sobre un ``PoolManager`` con keep-alive, reintentos y gzip.
+
+    Es seguro usarlo desde varios hilos. Las conexiones (y sus sesiones TLS)
+    se reutilizan entre peticiones al mismo host. Si el servidor anuncia que
+    no quedan peticiones disponibles (``RateLimit-Remaining: 0``) las
+    siguientes peticiones a ese host esperan al reinicio indicado.
+    """
+
+    def __init__(
+        self,
+        *,
+        maxsize: int = MAX_CONEXIONES,
+        intentos: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 30,
+    ):
+        self.retry = crear_retry(intentos, backoff)
+        self.timeout = timeout
+        self.headers = make_headers(accept_encoding=True, keep_alive=True)
+        self.pool = PoolManager(
+            maxsize=max(1, maxsize),
+            retries=self.retry,
+            cert_reqs="CERT_NONE",
+            ssl_context=contexto_ssl(),
+        )
+        self._pausas: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _esperar_limite(self, host: str) -> None:
+        with self._lock:
+            hasta = self._pausas.get(host, 0.0)
+        espera = hasta - time.monotonic()
+        if espera > 0:
+            time.sleep(espera)
+
+    def _anotar_limite(self, host: str, headers: Mapping[str, str]) -> None:
+        espera = _segundos_hasta_reinicio(headers)
+        if espera is not None:
+            with self._lock:
+                self._pausas[host] = time.monotonic() + espera
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        headers: Mapping[str, str] | None = None,
+        timeout: float | None = None,
+        retries: Retry | int | None = None,
+        preload_content: bool = True,
+    ) -> BaseHTTPResponse:
+        """Hacer una petición; el cuerpo se descomprime de forma transparente.
+
+        Con ``preload_content=False`` el cuerpo se lee después con
+        ``stream()`` y hay que llamar a ``release_conn()`` al terminar.
+        """
+        host = urlsplit(url).netloc
+        self._esperar_limite(host)
+        response = self.pool.request(
+            method,
+            url,
+            headers={**self.headers, **(headers or {})},
+            timeout=self.timeout if timeout is None else timeout,
+            retries=self.retry if retries is None else retries,
+            preload_content=preload_content,
+            decode_content=True,
+        )
+        self._anotar_limite(host, response.headers)
+        return response
+
+    def get(self, url: str, **opciones: Any) -> BaseHTTPResponse:
+        """``request("GET", url, ...)``"""
+        return self.request("GET", url, **opciones)
+
+
+@functools.cache
+def cliente_compartido() -> ClienteHTTP:
+    """Cliente único del proceso, creado al primer uso"""
+    return ClienteHTTP()
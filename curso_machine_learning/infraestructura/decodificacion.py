@@ -0,0 +1,174 @@
+"""
+Decodificación columnar de páginas de datastore_search en arrays tipados
+"""
+
+from typing import Any, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Tipos de CKAN (PostgreSQL) y el dtype de NumPy de su buffer
+TIPOS_CKAN = {
+    "int": np.int64,
+    "int2": np.int64,
+    "int4": np.int64,
+    "int8": np.int64,
+    "integer": np.int64,
+    "smallint": np.int64,
+    "bigint": np.int64,
+    "numeric": np.float64,
+    "float": np.float64,
+    "float4": np.float64,
+    "float8": np.float64,
+    "double precision": np.float64,
+    "bool": np.bool_,
+    "boolean": np.bool_,
+}
+
+
+# Tipos de valores que cada buffer acepta sin perder información (además de
+# ``np.can_cast(..., casting="safe")``): una página de ``bool`` no entra en una
+# columna ``int`` aunque NumPy lo permita, porque pandas la dejaría en object
+TIPOS_ADMITIDOS = {"i": "iu", "f": "iuf", "b": "b"}
+
+
+def _como_array(datos: Sequence[Any]) -> np.ndarray | None:
+    """Array 1-D con el tipo que NumPy infiere para ``datos`` (o ``None``)"""
+    try:
+        valores = np.asarray(datos)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return valores if valores.ndim == 1 else None
+
+
+class _Columna:
+    """Buffer preasignado de una columna con máscara de nulos.
+
+    Si un valor no cabe en el tipo declarado sin perder información la
+    columna se promueve conservando lo ya escrito: de ``int`` a ``float64``
+    ante decimales y a ``object`` ante cualquier otra cosa (texto, bool).
+    """
+
+    def __init__(self, tipo: str, capacidad: int):
+        self.dtype = np.dtype(TIPOS_CKAN.get(tipo, object))
+        self.valores = np.empty(capacidad, dtype=self.dtype)
+        self.nulos = np.zeros(capacidad, dtype=bool)
+
+    def crecer(self, capacidad: int) -> None:
+        valores = np.empty(capacidad, dtype=self.dtype)
+        valores[: len(self.valores)] = self.valores
+        nulos = np.zeros(capacidad, dtype=bool)
+        nulos[: len(self.nulos)] = self.nulos
+        self.valores, self.nulos = valores, nulos
+
+    def _promover(self, filas: int, dtype: np.dtype) -> None:
+        valores = np.empty(len(self.valores), dtype=dtype)
+        valores[:filas] = self.valores[:filas]
+        valores[:filas][self.nulos[:filas]] = None if dtype == object else np.nan
+        self.dtype = valores.dtype
+        self.valores = valores
+
+    def _tipo_para(self, valores: np.ndarray | None) -> np.dtype:
+        """Tipo de la columna que admite ``valores`` sin conversión insegura"""
+        if valores is None:
+            return np.dtype(object)
+        if len(valores) == 0 or (
+            valores.dtype.kind in TIPOS_ADMITIDOS[self.dtype.kind]
+            and np.can_cast(valores.dtype, self.dtype, casting="safe")
+        ):
+            return self.dtype
+        if self.dtype.kind == "i" and valores.dtype.kind == "f":
+            return np.dtype(np.float64)
+        return np.dtype(object)
+
+    def escribir(self, inicio: int, datos: Sequence[Any]) -> None:
+        fin = inicio + len(datos)
+        nulos = None
+        if self.dtype != object:
+            # Camino rápido: sin nulos NumPy infiere el tipo de la página de
+            # una vez; con ``None`` el array sale ``object`` y se convierten
+            # solo los valores presentes
+            valores = _como_array(datos)
+            if valores is not None and valores.dtype == object:
+                nulos = np.fromiter(
+                    (v is None for v in datos), dtype=bool, count=len(datos)
+                )
+                valores = _como_array([v for v in datos if v is not None])
+            dtype = self._tipo_para(valores)
+            if dtype != self.dtype:
+                self._promover(inicio, dtype)
+        if self.dtype == object:
+            self.valores[inicio:fin] = np.fromiter(
+                datos, dtype=object, count=len(datos)
+            )
+            return
+        bloque = self.valores[inicio:fin]
+        if nulos is None:
+            bloque[:] = valores
+        else:
+            bloque[nulos] = np.nan if self.dtype.kind == "f" else 0
+            bloque[~nulos] = valores
+        if self.dtype.kind == "f":
+            self.nulos[inicio:fin] = np.isnan(bloque)
+        else:
+            self.nulos[inicio:fin] = False if nulos is None else nulos
+
+    def serie(self, filas: int) -> np.ndarray:
+        """Array final con los mismos tipos que ``pd.DataFrame(records)``: los
+        enteros con nulos pasan a ``float64`` con NaN y los booleanos con nulos
+        a ``object``"""
+        valores = self.valores[:filas]
+        if self.dtype == object or self.dtype.kind == "f":
+            return valores
+        nulos = self.nulos[:filas]
+        if not nulos.any():
+            return valores
+        if self.dtype.kind == "b":
+            resultado = valores.astype(object)
+            resultado[nulos] = None
+            return resultado
+        resultado = valores.astype(np.float64)
+        resultado[nulos] = np.nan
+        return resultado
+
+
+class DecodificadorColumnas:
+    """Reúne páginas de ``datastore_search`` en columnas tipadas.
+
+    Usa los ``fields`` (``id`` y ``type``) que devuelve CKAN para reservar
+    un array por columna con ``capacidad`` filas (el ``total`` del recurso),
+    de modo que no se crea un dict por registro. Las páginas pueden venir
+    con ``records_format=lists`` (listas en el orden de ``fields``) o como
+    dicts (``datastore_search_sql`` no admite listas).
+    """
+
+    def __init__(self, fields: list[dict[str, Any]], capacidad: int = 0):
+        self.ids = [f["id"] for f in fields]
+        capacidad = max(capacidad, 0)
+        self.columnas = [_Columna(f.get("type", "text"), capacidad) for f in fields]
+        self.capacidad = capacidad
+        self.filas = 0
+
+    def agregar(self, records: list[Any]) -> None:
+        """Copiar una página en los buffers (ampliándolos si hace falta)"""
+        if not records:
+            return
+        if isinstance(records[0], dict):
+            datos = [tuple(r.get(i) for r in records) for i in self.ids]
+        else:
+            datos = list(zip(*records))
+        fin = self.filas + len(records)
+        if fin > self.capacidad:
+            self.capacidad = max(fin, 2 * self.capacidad)
+            for columna in self.columnas:
+                columna.crecer(self.capacidad)
+        for columna, valores in zip(self.columnas, datos):
+            columna.escribir(self.filas, valores)
+        self.filas = fin
+
+    def a_dataframe(self) -> pd.DataFrame:
+        """DataFrame con una columna por campo, sin pasar por filas"""
+        return pd.DataFrame(
+            {i: c.serie(self.filas) for i, c in zip(self.ids, self.columnas)},
+            copy=False,
+        )
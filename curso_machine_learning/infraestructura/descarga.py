@@ -0,0 +1,131 @@
+"""
+Descarga por bloques directamente a disco, con transferencia comprimida
+"""
+
+import hashlib
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Mapping
+
+from urllib3.util import Retry
+
+from curso_machine_learning.infraestructura.cliente_http import (
+    ClienteHTTP,
+    ErrorHTTP,
+    cliente_compartido,
+    crear_retry,
+)
+
+# Reintentos de una descarga: un timeout de lectura no se repite (con
+# ``timeout=30`` cada reintento costaría otros 30 s antes de pasar a la
+# siguiente URL) y un error de conexión se reintenta una vez
+RETRY_DESCARGA = crear_retry(lectura=0, conexion=1)
+
+
+@dataclass
+class ResultadoDescarga:
+    """Resultado de una descarga a disco"""
+
+    ruta: Path | None
+    status: int
+    bytes_escritos: int = 0
+    bytes_red: int = 0
+    sha256: str = ""
+    headers: Mapping[str, str] = field(default_factory=dict)
+
+
+def descargar_a_archivo(
+    url: str,
+    destino: str | Path,
+    *,
+    headers: dict[str, str] | None = None,
+    validar: Callable[[str, str], bool] | None = None,
+    timeout: float = 30,
+    chunk_size: int = 1 << 16,
+    cancelar: threading.Event | None = None,
+    cliente: ClienteHTTP | None = None,
+    retries: Retry | None = None,
+) -> ResultadoDescarga:
+    """Descargar ``url`` en ``destino`` por bloques, sin cargarla en memoria.
+
+    Se negocia ``gzip``/``deflate`` y el cuerpo se descomprime al vuelo. El
+    contenido se escribe primero en ``destino.part`` y se renombra al
+    terminar, así un archivo a medias nunca reemplaza al anterior.
+    ``validar(inicio, content_type)`` recibe el primer bloque como texto; si
+    devuelve ``False`` se aborta la descarga y ``ruta`` queda en ``None``.
+    Un 304 también devuelve ``ruta=None``. Si se activa ``cancelar`` antes
+    de validar el primer bloque la descarga se abandona de la misma forma.
+    Las conexiones salen de ``cliente`` (por defecto el compartido) y los
+    reintentos siguen ``retries`` (por defecto ``RETRY_DESCARGA``); si el
+    estado final es un error se lanza ``ErrorHTTP``.
+    """
+    destino = Path(destino)
+    if cancelar is not None and cancelar.is_set():
+        return ResultadoDescarga(None, 0)
+
+    cliente = cliente or cliente_compartido()
+    response = cliente.get(
+        url,
+        headers=headers,
+        timeout=timeout,
+        retries=RETRY_DESCARGA if retries is None else retries,
+        preload_content=False,
+    )
+    completa = False
+    try:
+        respuesta_headers = response.headers
+        if response.status == 304:
+            completa = True
+            return ResultadoDescarga(None, 304, headers=respuesta_headers)
+        if response.status >= 400:
+            raise ErrorHTTP(response.status, url)
+
+        content_type = response.headers.get("content-type", "")
+        parcial = destino.with_name(destino.name + ".part")
+        sha256 = hashlib.sha256()
+        escritos = 0
+        validado = False
+
+        try:
+            with open(parcial, "wb") as f:
+                for chunk in response.stream(chunk_size, decode_content=True):
+                    if cancelar is not None and cancelar.is_set() and not validado:
+                        break
+                    if validar is not None and not validado:
+                        inicio = chunk.decode("utf-8", errors="ignore")
+                        if not validar(inicio, content_type):
+                            break
+                        validado = True
+                    f.write(chunk)
+                    sha256.update(chunk)
+                    escritos += len(chunk)
+                else:
+                    completa = True
+        except BaseException:
+            parcial.unlink(missing_ok=True)
+            raise
+
+        bytes_red = response.tell()
+    finally:
+        # Solo una conexión leída hasta el final vuelve al pool; las
+        # descargas abandonadas cierran la suya
+        if not completa:
+            response.close()
+        response.release_conn()
+
+    cancelada = cancelar is not None and cancelar.is_set() and not validado
+    if cancelada or (validar is not None and not validado):
+        parcial.unlink(missing_ok=True)
+        return ResultadoDescarga(None, response.status, headers=respuesta_headers)
+
+    os.replace(parcial, destino)
+    return ResultadoDescarga(
+        destino,
+        response.status,
+        bytes_escritos=escritos,
+        bytes_red=bytes_red,
+        sha256=sha256.hexdigest(),
+        headers=respuesta_headers,
+    )
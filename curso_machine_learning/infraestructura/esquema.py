@@ -0,0 +1,156 @@
+"""
+Esquema de tipos compactos para el dataset de malnutrición y reporte de memoria
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from curso_machine_learning.infraestructura.almacen import cargar_tabla, columnas_de
+
+# Tipos declarados para las columnas conocidas del dataset de malnutrición
+ESQUEMA_MALNUTRICION = {
+    "AÑO": "int16",
+    "TRIMESTRE": "category",
+    "LOCALIDAD": "category",
+    "EDAD_MESES": "int16",
+    "SEXO": "category",
+    "PESO_KG": "float32",
+    "TALLA_CM": "float32",
+    "PESO_TALLA_Z": "float32",
+    "TALLA_EDAD_Z": "float32",
+    "PESO_EDAD_Z": "float32",
+    "IMC_EDAD_Z": "float32",
+    "IMC": "float32",
+    "INDICE_MASA_CORPORAL": "float32",
+    "TIPO_ATENCION": "category",
+    "REGIMEN_AFILIACION": "category",
+}
+
+# Columnas reconocidas por prefijo (CLASIFICACION_P_T, CLASIFICACION_NUTRICIONAL...)
+PREFIJOS_MALNUTRICION = {"CLASIFICACION": "category"}
+
+# Fracción máxima de valores distintos para convertir texto en categoría
+UMBRAL_CATEGORIA = 0.5
+
+
+def tipos_declarados(columnas: list[str]) -> dict[str, str]:
+    """Tipos del esquema declarado para las columnas presentes"""
+    tipos = {}
+    for col in columnas:
+        if col in ESQUEMA_MALNUTRICION:
+            tipos[col] = ESQUEMA_MALNUTRICION[col]
+            continue
+        for prefijo, tipo in PREFIJOS_MALNUTRICION.items():
+            if col.upper().startswith(prefijo):
+                tipos[col] = tipo
+    return tipos
+
+
+def _tipo_compacto(serie: pd.Series) -> str | None:
+    """Tipo compacto propuesto para una columna a partir de una muestra"""
+    if pd.api.types.is_bool_dtype(serie):
+        return None
+    if pd.api.types.is_integer_dtype(serie):
+        if serie.empty:
+            return None
+        # Margen amplio: la muestra no tiene por qué contener los extremos
+        maximo = max(abs(int(serie.min())), abs(int(serie.max())))
+        if maximo < 2**10:
+            return "int16"
+        if maximo < 2**24:
+            return "int32"
+        return None
+    if pd.api.types.is_float_dtype(serie):
+        return "float32"
+    if pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie):
+        if len(serie) and serie.nunique() / len(serie) <= UMBRAL_CATEGORIA:
+            return "category"
+    return None
+
+
+def inferir_tipos(
+    ruta: str | Path, columnas: list[str] | None = None, *, muestra: int = 10_000
+) -> dict[str, str]:
+    """Proponer tipos compactos para un CSV desconocido leyendo una muestra"""
+    df = cargar_tabla(ruta, columnas, filas=muestra)
+    tipos = {}
+    for col in df.columns:
+        tipo = _tipo_compacto(df[col])
+        if tipo is not None:
+            tipos[col] = tipo
+    return tipos
+
+
+def cargar_compacto(
+    ruta: str | Path,
+    columnas: list[str] | None = None,
+    *,
+    autodetectar: bool = False,
+) -> pd.DataFrame:
+    """Cargar un dataset aplicando el esquema compacto durante la lectura.
+
+    Con ``autodetectar`` las columnas fuera del esquema declarado reciben
+    tipos inferidos de una muestra (útil para CSV de la API de datos
+    abiertos con columnas desconocidas).
+    """
+    nombres = columnas or columnas_de(ruta)
+    tipos = tipos_declarados(nombres)
+    if autodetectar:
+        tipos = {**inferir_tipos(ruta, columnas), **tipos}
+    return cargar_tabla(ruta, columnas, tipos=tipos)
+
+
+def reducir_memoria(df: pd.DataFrame) -> pd.DataFrame:
+    """Reducir los dtypes de un DataFrame ya cargado"""
+    tipos = {}
+    for col in df.columns:
+        tipo = _tipo_compacto(df[col])
+        if tipo is not None and tipo != str(df[col].dtype):
+            tipos[col] = tipo
+    return df.astype(tipos)
+
+
+def _memoria_por_defecto(serie: pd.Series) -> int:
+    """Memoria estimada de la columna con los dtypes por defecto de pandas"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Texto como object: un puntero por fila más cada objeto str
+        conteos = np.bincount(
+            serie.cat.codes + 1, minlength=len(serie.cat.categories) + 1
+        )
+        tamanos = [sys.getsizeof(np.nan)] + [
+            sys.getsizeof(c) for c in serie.cat.categories
+        ]
+        return int(8 * len(serie) + np.dot(conteos, tamanos))
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return 8 * len(serie)
+    return int(serie.memory_usage(index=False, deep=True))
+
+
+def reporte_memoria(df: pd.DataFrame) -> pd.DataFrame:
+    """Memoria por columna con tipos por defecto (estimada) y compactos"""
+    reporte = pd.DataFrame(
+        {
+            "tipo": df.dtypes.astype(str),
+            "antes_bytes": [_memoria_por_defecto(df[col]) for col in df.columns],
+            "despues_bytes": df.memory_usage(index=False, deep=True),
+        }
+    )
+    return reporte
+
+
+def imprimir_reporte_memoria(df: pd.DataFrame) -> None:
+    """Mostrar el reporte de memoria antes/después del esquema compacto"""
+    reporte = reporte_memoria(df)
+    antes = reporte["antes_bytes"].sum()
+    despues = reporte["despues_bytes"].sum()
+    print("\n🧮 Memoria por columna (tipos por defecto → compactos):")
+    for col, fila in reporte.iterrows():
+        print(
+            f"  {col}: {fila['antes_bytes'] / 1e6:.2f} MB → "
+            f"{fila['despues_bytes'] / 1e6:.2f} MB ({fila['tipo']})"
+        )
+    factor = antes / despues if despues else float("nan")
+    print(f"  Total: {antes / 1e6:.2f} MB → {despues / 1e6:.2f} MB ({factor:.1f}x)")
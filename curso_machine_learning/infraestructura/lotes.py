@@ -0,0 +1,403 @@
+"""
+Ingesta por lotes de varios recursos de datastore_search con límites compartidos
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+from urllib3 import BaseHTTPResponse
+
+from curso_machine_learning.infraestructura import trazas
+from curso_machine_learning.infraestructura.ckan import BASE_URL, fetch_page
+from curso_machine_learning.infraestructura.cliente_http import ClienteHTTP
+from curso_machine_learning.infraestructura.sincronizacion import (
+    DIRECTORIO_CACHE,
+    CacheSincronizacion,
+    sincronizar_recurso,
+)
+
+# Peticiones en curso entre todos los recursos
+CONCURRENCIA = 8
+# Recursos que se descargan a la vez (cada uno con varias páginas en curso)
+RECURSOS_SIMULTANEOS = 4
+# Peticiones por segundo permitidas a cada host
+TASA = 10.0
+# Un recurso sincronizado hace menos de esto no está atrasado
+MAX_ANTIGUEDAD = 24 * 3600.0
+RESUMEN = "resumen_lote.json"
+
+
+class CuboTokens:
+    """Límite de peticiones por segundo con ráfagas de hasta ``rafaga``.
+
+    Cada petición reserva un token; si no hay, espera a que se reponga. Las
+    reservas pueden dejar el saldo en negativo, de modo que las esperas se
+    reparten en orden de llegada en lugar de despertar a todos a la vez.
+    """
+
+    def __init__(self, tasa: float, rafaga: float | None = None):
+        if tasa <= 0:
+            raise ValueError("La tasa debe ser positiva")
+        self.tasa = tasa
+        self.rafaga = max(1.0, rafaga if rafaga is not None else tasa)
+        self._tokens = self.rafaga
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def tomar(self) -> float:
+        """Reservar un token; devuelve los segundos esperados"""
+        with self._lock:
+            ahora = time.monotonic()
+            self._tokens = min(
+                self.rafaga, self._tokens + (ahora - self._ultimo) * self.tasa
+            )
+            self._ultimo = ahora
+            self._tokens -= 1
+            espera = -self._tokens / self.tasa if self._tokens < 0 else 0.0
+        if espera:
+            time.sleep(espera)
+        return espera
+
+
+class ClienteLimitado(ClienteHTTP):
+    """``ClienteHTTP`` con un máximo de peticiones en curso y un cubo de
+    tokens por host.
+
+    Cuenta peticiones y bytes recibidos por ``resource_id`` (o ``id``,
+    tomados de la URL) para el resumen del lote. Los reintentos internos de
+    urllib3 no pasan por el cubo: ya esperan con su propio ``backoff``.
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrencia: int = CONCURRENCIA,
+        tasa: float = TASA,
+        rafaga: float | None = None,
+        **opciones: Any,
+    ):
+        super().__init__(maxsize=concurrencia, **opciones)
+        self.tasa = tasa
+        self.rafaga = rafaga
+        self._en_curso = threading.BoundedSemaphore(max(1, concurrencia))
+        self._cubos: dict[str, CuboTokens] = {}
+        self.peticiones: Counter[str] = Counter()
+        self.bytes: Counter[str] = Counter()
+        self.espera = 0.0
+
+    def _cubo(self, host: str) -> CuboTokens:
+        with self._lock:
+            if host not in self._cubos:
+                self._cubos[host] = CuboTokens(self.tasa, self.rafaga)
+            return self._cubos[host]
+
+    def request(self, method: str, url: str, **opciones: Any) -> BaseHTTPResponse:
+        partes = urlsplit(url)
+        espera = self._cubo(partes.netloc).tomar()
+        with self._en_curso:
+            response = super().request(method, url, **opciones)
+        consulta = parse_qs(partes.query)
+        # ``resource_show`` identifica el recurso con ``id``
+        recurso = consulta.get("resource_id", consulta.get("id", [""]))[0]
+        with self._lock:
+            self.espera += espera
+            self.peticiones[recurso] += 1
+            if opciones.get("preload_content", True):
+                self.bytes[recurso] += len(response.data)
+        return response
+
+
+@dataclass
+class Recurso:
+    """Entrada del manifiesto"""
+
+    resource_id: str
+    salida: Path
+    base_url: str = BASE_URL
+    # Filas del recurso (de la última ejecución o consultadas al servidor)
+    tamano: int | None = None
+    # Instante (epoch) de la última sincronización correcta
+    ultima: float | None = None
+
+    @property
+    def clave(self) -> str:
+        return f"{self.base_url}|{self.resource_id}"
+
+    def antiguedad(self, ahora: float) -> float:
+        return math.inf if self.ultima is None else ahora - self.ultima
+
+    def prioridad(self, ahora: float, max_antiguedad: float) -> tuple[bool, int, float]:
+        """Clave de orden: primero los atrasados y, dentro de cada grupo, los
+        más grandes, para que las descargas largas no empiecen al final"""
+        antiguedad = self.antiguedad(ahora)
+        return antiguedad < max_antiguedad, -(self.tamano or 0), -antiguedad
+
+
+@dataclass
+class ResultadoRecurso:
+    """Fila del resumen de un recurso"""
+
+    resource_id: str
+    salida: str
+    estado: str
+    filas: int = 0
+    bytes: int = 0
+    bytes_archivo: int = 0
+    peticiones: int = 0
+    segundos: float = 0.0
+    error: str | None = None
+
+
+@dataclass
+class ResumenLote:
+    """Resultado de una ejecución por lotes"""
+
+    inicio: str
+    segundos: float = 0.0
+    concurrencia: int = CONCURRENCIA
+    tasa: float = TASA
+    espera_limite: float = 0.0
+    recursos: list[ResultadoRecurso] = field(default_factory=list)
+
+    @property
+    def errores(self) -> list[ResultadoRecurso]:
+        return [r for r in self.recursos if r.estado == "error"]
+
+    def guardar(self, ruta: str | Path) -> None:
+        ruta = Path(ruta)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        datos = {
+            **asdict(self),
+            "filas": sum(r.filas for r in self.recursos),
+            "bytes": sum(r.bytes for r in self.recursos),
+        }
+        tmp = ruta.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, ruta)
+
+    def imprimir(self) -> None:
+        print(f"\n📦 Lote de {len(self.recursos)} recursos en {self.segundos:.1f} s:")
+        for r in self.recursos:
+            icono = "✅" if r.estado == "ok" else "❌"
+            detalle = r.error or f"{r.filas} filas, {r.bytes / 1e6:.2f} MB"
+            print(f"  {icono} {r.resource_id}: {detalle} ({r.segundos:.1f} s)")
+        filas = sum(r.filas for r in self.recursos)
+        print(
+            f"   {filas} filas, {len(self.errores)} errores, "
+            f"{self.espera_limite:.1f} s de espera por el límite de tasa"
+        )
+
+
+class EstadoLotes:
+    """Última sincronización correcta y filas de cada recurso"""
+
+    def __init__(self, ruta: str | Path = Path(DIRECTORIO_CACHE) / "lotes.json"):
+        self.ruta = Path(ruta)
+        self._lock = threading.Lock()
+        try:
+            with open(self.ruta, encoding="utf-8") as f:
+                self.recursos: dict[str, dict[str, Any]] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.recursos = {}
+
+    def completar(self, recurso: Recurso) -> None:
+        """Rellenar ``tamano`` y ``ultima`` con lo guardado"""
+        datos = self.recursos.get(recurso.clave, {})
+        recurso.ultima = datos.get("ultima")
+        recurso.tamano = datos.get("filas")
+
+    def registrar(self, recurso: Recurso, filas: int) -> None:
+        with self._lock:
+            self.recursos[recurso.clave] = {"ultima": time.time(), "filas": filas}
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.ruta.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.recursos, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.ruta)
+
+
+def leer_manifiesto(
+    ruta: str | Path,
+    directorio: str | Path = ".",
+    *,
+    formato: str = "csv",
+    base_url: str = BASE_URL,
+) -> list[Recurso]:
+    """Recursos de un manifiesto JSON o de texto.
+
+    El JSON es una lista (o ``{"recursos": [...]}``) de ``resource_id`` o de
+    objetos ``{"resource_id", "salida", "base_url"}``. El texto tiene un
+    ``resource_id`` por línea; se ignoran las vacías y las que empiezan por
+    ``#``. Las salidas relativas se ubican en ``directorio``.
+    """
+    ruta = Path(ruta)
+    texto = ruta.read_text(encoding="utf-8")
+    if ruta.suffix == ".json":
+        datos = json.loads(texto)
+        entradas = datos["recursos"] if isinstance(datos, dict) else datos
+    else:
+        entradas = [
+            linea.strip()
+            for linea in texto.splitlines()
+            if linea.strip() and not linea.lstrip().startswith("#")
+        ]
+
+    recursos: dict[tuple[str, str], Recurso] = {}
+    for entrada in entradas:
+        if isinstance(entrada, str):
+            entrada = {"resource_id": entrada}
+        resource_id = entrada["resource_id"]
+        salida = Path(directorio) / entrada.get("salida", f"{resource_id}.{formato}")
+        recurso = Recurso(resource_id, salida, entrada.get("base_url", base_url))
+        if (recurso.base_url, resource_id) in recursos:
+            raise ValueError(f"Recurso repetido en el manifiesto: {resource_id}")
+        recursos[recurso.base_url, resource_id] = recurso
+    return list(recursos.values())
+
+
+def _consultar_tamano(http: ClienteHTTP, recurso: Recurso, retries: int) -> None:
+    """Pedir el ``total`` (página vacía) de un recurso sin historial"""
+    try:
+        result = fetch_page(
+            http,
+            recurso.resource_id,
+            limit=0,
+            offset=0,
+            base_url=recurso.base_url,
+            retries=retries,
+        )
+        recurso.tamano = int(result.get("total", 0))
+    except Exception as e:
+        # El error se verá (y se resumirá) al descargar el recurso
+        print(f"⚠️ No se pudo consultar el tamaño de {recurso.resource_id}: {e}")
+
+
+def ordenar_recursos(
+    recursos: list[Recurso],
+    *,
+    max_antiguedad: float = MAX_ANTIGUEDAD,
+    ahora: float | None = None,
+) -> list[Recurso]:
+    """Recursos en orden de descarga (ver ``Recurso.prioridad``)"""
+    ahora = time.time() if ahora is None else ahora
+    return sorted(recursos, key=lambda r: r.prioridad(ahora, max_antiguedad))
+
+
+def ingerir_lote(
+    recursos: list[Recurso],
+    *,
+    concurrencia: int = CONCURRENCIA,
+    simultaneos: int = RECURSOS_SIMULTANEOS,
+    concurrencia_recurso: int = 4,
+    tasa: float = TASA,
+    rafaga: float | None = None,
+    limit: int = 1000,
+    retries: int = 3,
+    max_antiguedad: float = MAX_ANTIGUEDAD,
+    estado: EstadoLotes | None = None,
+    cache: CacheSincronizacion | None = None,
+) -> ResumenLote:
+    """Sincronizar varios recursos compartiendo conexiones y límites.
+
+    Todas las peticiones pasan por un mismo ``ClienteLimitado``: como mucho
+    ``concurrencia`` en curso y ``tasa`` por segundo a cada host, sin
+    importar cuántos recursos se descarguen a la vez. Los recursos se
+    reparten en ``simultaneos`` hilos en el orden de ``ordenar_recursos``
+    (los que no tienen historial se miden antes con una página vacía). Cada
+    recurso se sincroniza con ``sincronizar_recurso``, así que las
+    ejecuciones siguientes solo descargan lo que cambió. Un recurso que
+    falla no detiene al resto.
+    """
+    estado = estado or EstadoLotes()
+    http = ClienteLimitado(
+        concurrencia=concurrencia, tasa=tasa, rafaga=rafaga, intentos=retries
+    )
+    resumen = ResumenLote(
+        datetime.now(timezone.utc).isoformat(), concurrencia=concurrencia, tasa=tasa
+    )
+    inicio = time.perf_counter()
+
+    for recurso in recursos:
+        estado.completar(recurso)
+    sin_tamano = [r for r in recursos if r.tamano is None]
+    if sin_tamano:
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            list(pool.map(lambda r: _consultar_tamano(http, r, retries), sin_tamano))
+    recursos = ordenar_recursos(recursos, max_antiguedad=max_antiguedad)
+
+    def sincronizar(recurso: Recurso) -> ResultadoRecurso:
+        resultado = ResultadoRecurso(
+            recurso.resource_id, str(recurso.salida), estado="ok"
+        )
+        comienzo = time.perf_counter()
+        with trazas.span("recurso", resource_id=recurso.resource_id) as span:
+            try:
+                recurso.salida.parent.mkdir(parents=True, exist_ok=True)
+                _, resultado.filas = sincronizar_recurso(
+                    recurso.resource_id,
+                    recurso.salida,
+                    cache=cache,
+                    limit=limit,
+                    concurrency=concurrencia_recurso,
+                    retries=retries,
+                    base_url=recurso.base_url,
+                    http=http,
+                    progreso=False,
+                )
+                resultado.bytes_archivo = recurso.salida.stat().st_size
+                estado.registrar(recurso, resultado.filas)
+            except Exception as e:
+                resultado.estado = "error"
+                resultado.error = f"{type(e).__name__}: {e}"
+                # No dejar archivos vacíos de recursos que no se descargaron
+                if recurso.salida.exists() and not recurso.salida.stat().st_size:
+                    recurso.salida.unlink()
+            span.registrar(filas=resultado.filas)
+        resultado.segundos = time.perf_counter() - comienzo
+        icono = "✅" if resultado.estado == "ok" else "❌"
+        print(f"{icono} {recurso.resource_id}: {resultado.filas} registros")
+        return resultado
+
+    with ThreadPoolExecutor(max_workers=max(1, simultaneos)) as pool:
+        resumen.recursos = list(pool.map(sincronizar, recursos))
+
+    for resultado in resumen.recursos:
+        resultado.peticiones = http.peticiones[resultado.resource_id]
+        resultado.bytes = http.bytes[resultado.resource_id]
+    resumen.espera_limite = http.espera
+    resumen.segundos = time.perf_counter() - inicio
+    return resumen
+
+
+def ingerir_manifiesto(
+    manifiesto: str | Path,
+    directorio: str | Path = ".",
+    *,
+    formato: str = "csv",
+    base_url: str = BASE_URL,
+    ruta_resumen: str | Path | None = None,
+    **opciones: Any,
+) -> ResumenLote:
+    """Leer el manifiesto, ingerir sus recursos y guardar el resumen JSON"""
+    recursos = leer_manifiesto(
+        manifiesto, directorio, formato=formato, base_url=base_url
+    )
+    print(f"📋 {len(recursos)} recursos en '{manifiesto}'")
+    with trazas.span("lote", recursos=len(recursos)):
+        resumen = ingerir_lote(recursos, **opciones)
+    ruta_resumen = ruta_resumen or Path(directorio) / RESUMEN
+    resumen.guardar(ruta_resumen)
+    resumen.imprimir()
+    print(f"💾 Resumen guardado en '{ruta_resumen}'")
+    return resumen
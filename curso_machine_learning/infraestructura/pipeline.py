@@ -0,0 +1,381 @@
+"""
+Pipeline de etapas con entradas y salidas explícitas, memoizado al estilo make
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import CodeType
+from typing import Any, Callable, Iterable
+
+from curso_machine_learning.infraestructura import trazas
+from curso_machine_learning.infraestructura.sincronizacion import (
+    DIRECTORIO_CACHE,
+    hash_archivo,
+)
+
+DIRECTORIO_PIPELINE = Path(DIRECTORIO_CACHE) / "pipeline"
+
+
+@dataclass(frozen=True)
+class Etapa:
+    """Un paso del pipeline.
+
+    ``funcion`` recibe los valores de las etapas de ``entradas`` (en ese
+    orden) y ``parametros`` como argumentos con nombre. ``salidas`` son los
+    archivos que escribe; con ``devuelve_archivo`` el valor devuelto es la
+    ruta de un archivo que también cuenta como salida. El contenido de los
+    archivos de salida, y no la etapa, es lo que ven las etapas siguientes.
+    """
+
+    nombre: str
+    funcion: Callable[..., Any]
+    entradas: tuple[str, ...] = ()
+    parametros: dict[str, Any] = field(default_factory=dict)
+    salidas: tuple[str, ...] = ()
+    devuelve_archivo: bool = False
+    # Guardar el valor devuelto en disco (no conviene con DataFrames grandes)
+    persistir: bool = True
+    # Ejecutar siempre, p. ej. etapas que solo imprimen
+    siempre: bool = False
+    # Ejecutar en un proceso aparte (funciones de módulo, valores picklables)
+    en_proceso: bool = False
+    # Invalidación manual: el código de ``funcion`` ya forma parte de la
+    # huella, pero no el de las funciones a las que llama
+    version: int = 1
+
+
+@dataclass
+class Ejecucion:
+    """Resultado de una etapa en una ejecución"""
+
+    nombre: str
+    estado: str
+    segundos: float = 0.0
+    error: str | None = None
+
+
+def _partes_codigo(codigo: CodeType) -> list[Any]:
+    """Bytecode, nombres y constantes (con las funciones anidadas)"""
+    constantes = []
+    for c in codigo.co_consts:
+        if isinstance(c, CodeType):
+            constantes.append(_partes_codigo(c))
+        elif isinstance(c, frozenset):
+            # El orden de ``repr`` de un frozenset cambia entre procesos
+            constantes.append(sorted(map(repr, c)))
+        else:
+            constantes.append(repr(c))
+    return [codigo.co_code.hex(), codigo.co_names, constantes]
+
+
+def _codigo(funcion: Callable[..., Any]) -> Any:
+    """Lo que identifica el código de ``funcion`` (sin números de línea)"""
+    funcion = inspect.unwrap(funcion)
+    if isinstance(funcion, functools.partial):
+        return [_codigo(funcion.func), funcion.args, funcion.keywords]
+    codigo = getattr(funcion, "__code__", None)
+    if codigo is None:
+        codigo = getattr(getattr(type(funcion), "__call__", None), "__code__", None)
+    return _partes_codigo(codigo) if codigo is not None else None
+
+
+def _hash(*partes: Any) -> str:
+    contenido = json.dumps(partes, sort_keys=True, ensure_ascii=False, default=repr)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+class Pipeline:
+    """Grafo de etapas que solo recalcula lo que cambió.
+
+    La huella de una etapa combina su nombre, versión, función (incluido su
+    código), parámetros y las huellas de salida de sus entradas. Si coincide con la de la última
+    ejecución y sus archivos de salida siguen ahí, la etapa se omite. Las
+    etapas cuyas entradas ya están resueltas se ejecutan a la vez en un pool
+    de hilos (o de procesos con ``en_proceso``). El valor de una etapa
+    omitida se lee del disco solo si una etapa posterior lo necesita, y si
+    no se guardó (``persistir=False``) se recalcula en ese momento.
+    """
+
+    def __init__(
+        self,
+        etapas: Iterable[Etapa],
+        directorio: str | Path = DIRECTORIO_PIPELINE,
+        *,
+        hilos: int = 4,
+        procesos: int = 2,
+    ):
+        self.etapas = {e.nombre: e for e in etapas}
+        self.directorio = Path(directorio)
+        self.hilos = hilos
+        self.procesos = procesos
+        self.orden = self._ordenar()
+        self._ruta_estado = self.directorio / "estado.json"
+        self._lock = threading.Lock()
+        self._locks = {nombre: threading.RLock() for nombre in self.etapas}
+        self._valores: dict[str, Any] = {}
+        self._huellas: dict[str, str] = {}
+        self._salidas: dict[str, str] = {}
+        self._pool_procesos: ProcessPoolExecutor | None = None
+        try:
+            with open(self._ruta_estado, encoding="utf-8") as f:
+                self.estado: dict[str, Any] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.estado = {}
+        self.estado.setdefault("etapas", {})
+        self.estado.setdefault("archivos", {})
+
+    def _ordenar(self) -> list[str]:
+        """Orden topológico; error si hay entradas desconocidas o ciclos"""
+        orden: list[str] = []
+        visitando: set[str] = set()
+
+        def visitar(nombre: str, camino: tuple[str, ...]) -> None:
+            if nombre in orden:
+                return
+            if nombre not in self.etapas:
+                raise ValueError(f"Etapa desconocida '{nombre}' (desde {camino[-1]})")
+            if nombre in visitando:
+                raise ValueError(f"Ciclo de etapas: {' → '.join(camino + (nombre,))}")
+            visitando.add(nombre)
+            for entrada in self.etapas[nombre].entradas:
+                visitar(entrada, camino + (nombre,))
+            visitando.discard(nombre)
+            orden.append(nombre)
+
+        for nombre in self.etapas:
+            visitar(nombre, ())
+        return orden
+
+    def _guardar_estado(self) -> None:
+        with self._lock:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            tmp = self._ruta_estado.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.estado, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self._ruta_estado)
+
+    def _hash_archivo(self, ruta: str | Path) -> str:
+        """SHA-256 del archivo, recalculado solo si cambió tamaño o ``mtime``"""
+        clave = str(Path(ruta).resolve())
+        stat = os.stat(clave)
+        with self._lock:
+            previo = self.estado["archivos"].get(clave)
+        if previo and previo["firma"] == [stat.st_size, stat.st_mtime_ns]:
+            return str(previo["sha256"])
+        sha256 = hash_archivo(clave)
+        with self._lock:
+            self.estado["archivos"][clave] = {
+                "firma": [stat.st_size, stat.st_mtime_ns],
+                "sha256": sha256,
+            }
+        return sha256
+
+    def _huella(self, etapa: Etapa) -> str:
+        # Sin el módulo: la misma función vale igual ejecutada como ``__main__``
+        return _hash(
+            etapa.nombre,
+            etapa.version,
+            getattr(etapa.funcion, "__qualname__", None),
+            _codigo(etapa.funcion),
+            etapa.parametros,
+            [self._salidas[e] for e in etapa.entradas],
+        )
+
+    def _huella_salida(self, huella: str, archivos: list[str]) -> str:
+        if not archivos:
+            return huella
+        return _hash([self._hash_archivo(a) for a in archivos])
+
+    def _ruta_valor(self, nombre: str) -> Path:
+        return self.directorio / f"{hashlib.sha1(nombre.encode()).hexdigest()}.pkl"
+
+    def _leer_valor(self, nombre: str) -> tuple[bool, Any]:
+        """Valor guardado de la etapa si corresponde a su huella actual"""
+        try:
+            huella, valor = pickle.loads(self._ruta_valor(nombre).read_bytes())
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return False, None
+        if huella != self._huellas[nombre]:
+            return False, None
+        return True, valor
+
+    def _valor(self, nombre: str) -> Any:
+        """Valor de una etapa ya resuelta: en memoria, en disco o recalculado"""
+        with self._locks[nombre]:
+            if nombre not in self._valores:
+                encontrado, valor = self._leer_valor(nombre)
+                if encontrado:
+                    self._valores[nombre] = valor
+                else:
+                    print(f"↩️ {nombre}: se recalcula para las etapas siguientes")
+                    self._ejecutar(self.etapas[nombre])
+            return self._valores[nombre]
+
+    def _procesos(self) -> ProcessPoolExecutor:
+        """Pool de procesos creado al primer uso.
+
+        Con ``spawn``: se crea desde un hilo del scheduler mientras otras
+        etapas corren, y un ``fork`` en ese momento puede copiar locks
+        tomados por otros hilos y dejar a los procesos bloqueados.
+        """
+        with self._lock:
+            if self._pool_procesos is None:
+                self._pool_procesos = ProcessPoolExecutor(
+                    self.procesos, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool_procesos
+
+    def _ejecutar(self, etapa: Etapa) -> None:
+        with self._locks[etapa.nombre]:
+            valores = [self._valor(e) for e in etapa.entradas]
+            with trazas.span("etapa", etapa=etapa.nombre):
+                if etapa.en_proceso:
+                    valor = (
+                        self._procesos()
+                        .submit(etapa.funcion, *valores, **etapa.parametros)
+                        .result()
+                    )
+                else:
+                    valor = etapa.funcion(*valores, **etapa.parametros)
+            self._valores[etapa.nombre] = valor
+            if etapa.persistir:
+                self.directorio.mkdir(parents=True, exist_ok=True)
+                ruta = self._ruta_valor(etapa.nombre)
+                tmp = ruta.with_suffix(".tmp")
+                tmp.write_bytes(
+                    pickle.dumps(
+                        (self._huellas[etapa.nombre], valor), pickle.HIGHEST_PROTOCOL
+                    )
+                )
+                os.replace(tmp, ruta)
+
+    def _archivos(self, etapa: Etapa, valor: Any) -> list[str]:
+        archivos = [str(s) for s in etapa.salidas]
+        if etapa.devuelve_archivo and valor is not None:
+            archivos.append(str(valor))
+        return archivos
+
+    def _resolver(self, nombre: str, forzar: set[str]) -> Ejecucion:
+        """Omitir o ejecutar una etapa cuyas entradas ya están resueltas"""
+        etapa = self.etapas[nombre]
+        huella = self._huella(etapa)
+        self._huellas[nombre] = huella
+        with self._lock:
+            previo = self.estado["etapas"].get(nombre)
+
+        if (
+            previo is not None
+            and previo["huella"] == huella
+            and nombre not in forzar
+            and not etapa.siempre
+            and all(Path(a).exists() for a in previo["archivos"])
+        ):
+            self._salidas[nombre] = self._huella_salida(huella, previo["archivos"])
+            return Ejecucion(nombre, "omitida")
+
+        inicio = time.perf_counter()
+        self._ejecutar(etapa)
+        segundos = time.perf_counter() - inicio
+        archivos = self._archivos(etapa, self._valores[nombre])
+        self._salidas[nombre] = self._huella_salida(huella, archivos)
+        with self._lock:
+            self.estado["etapas"][nombre] = {
+                "huella": huella,
+                "archivos": archivos,
+                "segundos": segundos,
+            }
+        self._guardar_estado()
+        return Ejecucion(nombre, "ejecutada", segundos)
+
+    def necesarias(self, objetivos: Iterable[str] | None = None) -> list[str]:
+        """Etapas de las que dependen ``objetivos`` (todas si es ``None``)"""
+        if objetivos is None:
+            return list(self.orden)
+        incluidas: set[str] = set()
+        pendientes = list(objetivos)
+        while pendientes:
+            nombre = pendientes.pop()
+            if nombre not in self.etapas:
+                raise ValueError(f"Etapa desconocida '{nombre}'")
+            if nombre not in incluidas:
+                incluidas.add(nombre)
+                pendientes.extend(self.etapas[nombre].entradas)
+        return [n for n in self.orden if n in incluidas]
+
+    def ejecutar(
+        self,
+        objetivos: Iterable[str] | None = None,
+        *,
+        forzar: Iterable[str] = (),
+    ) -> dict[str, Ejecucion]:
+        """Resolver las etapas necesarias para ``objetivos``.
+
+        Una etapa que falla no detiene las demás, pero las que dependen de
+        ella no se ejecutan (estado ``bloqueada``).
+        """
+        forzar = set(forzar)
+        seleccion = self.necesarias(objetivos)
+        faltan = {n: set(self.etapas[n].entradas) for n in seleccion}
+        dependientes: dict[str, list[str]] = {n: [] for n in seleccion}
+        for n in seleccion:
+            for e in self.etapas[n].entradas:
+                dependientes[e].append(n)
+
+        resultados: dict[str, Ejecucion] = {}
+        listas = [n for n in seleccion if not faltan[n]]
+        futuros: dict[Future[Ejecucion], str] = {}
+        try:
+            with ThreadPoolExecutor(self.hilos) as pool:
+                while listas or futuros:
+                    for n in listas:
+                        futuros[pool.submit(self._resolver, n, forzar)] = n
+                    listas = []
+                    hechos, _ = wait(futuros, return_when=FIRST_COMPLETED)
+                    for futuro in hechos:
+                        n = futuros.pop(futuro)
+                        try:
+                            resultados[n] = futuro.result()
+                        except Exception as e:
+                            resultados[n] = Ejecucion(n, "error", error=str(e))
+                            print(f"❌ {n}: {e}")
+                            continue
+                        for d in dependientes[n]:
+                            faltan[d].discard(n)
+                            if not faltan[d]:
+                                listas.append(d)
+        finally:
+            if self._pool_procesos is not None:
+                self._pool_procesos.shutdown()
+                self._pool_procesos = None
+            self._guardar_estado()
+
+        for n in seleccion:
+            resultados.setdefault(n, Ejecucion(n, "bloqueada"))
+        return {n: resultados[n] for n in seleccion}
+
+
+def imprimir_ejecucion(resultados: dict[str, Ejecucion]) -> None:
+    """Resumen de qué etapas se ejecutaron, omitieron o fallaron"""
+    marcas = {"ejecutada": "▶️", "omitida": "⏭️", "error": "❌", "bloqueada": "⛔"}
+    print("\n🧩 Etapas del pipeline:")
+    for r in resultados.values():
+        detalle = f" ({r.segundos:.2f} s)" if r.estado == "ejecutada" else ""
+        if r.error:
+            detalle = f": {r.error}"
+        print(f"  {marcas[r.estado]} {r.nombre}: {r.estado}{detalle}")
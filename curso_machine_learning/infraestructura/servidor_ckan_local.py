@@ -0,0 +1,278 @@
+"""
+Servidor HTTP local que imita datastore_search de CKAN para probar descargas
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+
+def _tipo_campo(valor: Any) -> str:
+    """Inferir el tipo CKAN de un valor de ejemplo"""
+    if isinstance(valor, bool):
+        return "bool"
+    if isinstance(valor, int):
+        return "int"
+    if isinstance(valor, float):
+        return "numeric"
+    return "text"
+
+
+TIPOS_SQLITE = {"bool": "INTEGER", "int": "INTEGER", "numeric": "REAL", "text": "TEXT"}
+
+
+def _ahora() -> str:
+    """Marca de tiempo con el formato de ``last_modified`` de CKAN"""
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def _ordenar(registros: list[dict[str, Any]], sort: str) -> list[dict[str, Any]]:
+    """Aplicar ``sort="campo [asc|desc], ..."`` como lo haría CKAN"""
+    for parte in reversed(sort.split(",")):
+        campo, _, direccion = parte.strip().partition(" ")
+        registros = sorted(
+            registros,
+            key=lambda r: (r.get(campo) is None, r.get(campo)),
+            reverse=direccion.strip().lower() == "desc",
+        )
+    return registros
+
+
+def _filtrar(
+    registros: list[dict[str, Any]], filters: dict[str, Any], q: str | None
+) -> list[dict[str, Any]]:
+    """Igualdad por campo (una lista vale como "cualquiera de") y texto libre"""
+
+    def cumple(registro: dict[str, Any]) -> bool:
+        for campo, valor in filters.items():
+            valores = valor if isinstance(valor, list) else [valor]
+            if registro.get(campo) not in valores:
+                return False
+        if q:
+            texto = " ".join(str(v) for v in registro.values()).lower()
+            return q.lower() in texto
+        return True
+
+    return [r for r in registros if cumple(r)]
+
+
+class ServidorCKANLocal:
+    """Servidor local con uno o varios recursos en memoria.
+
+    ``fallos_por_pagina`` hace que las primeras peticiones a cada offset
+    respondan HTTP 500, para ejercitar los reintentos del cliente.
+    ``datastore_search`` admite ``fields``, ``filters``, ``q`` (subcadena,
+    no búsqueda de texto completo), ``sort`` y ``records_format=lists``. ``datastore_search_sql``
+    ejecuta el ``SELECT`` en una copia SQLite de cada recurso; con
+    ``sql=False`` responde 403 como un portal que no lo habilita.
+    ``resource_show`` devuelve el ``last_modified`` de cada recurso, que
+    ``actualizar`` renueva al reemplazar sus registros.
+    """
+
+    def __init__(
+        self,
+        recursos: dict[str, list[dict[str, Any]]],
+        *,
+        max_limit: int = 32000,
+        fallos_por_pagina: int = 0,
+        latencia: float = 0.0,
+        sql: bool = True,
+    ):
+        self.recursos = {
+            resource_id: self._numerar(registros)
+            for resource_id, registros in recursos.items()
+        }
+        self.modificados = {resource_id: _ahora() for resource_id in self.recursos}
+        self.max_limit = max_limit
+        self.fallos_por_pagina = fallos_por_pagina
+        self.latencia = latencia
+        self.sql = sql
+        self.peticiones = 0
+        self.bytes_enviados = 0
+        self._fallos: Counter[tuple[str, int]] = Counter()
+        self._lock = threading.Lock()
+        self._db = self._crear_db() if sql else None
+        self._httpd: ThreadingHTTPServer | None = None
+        self._hilo: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """URL base equivalente a ``ckan.BASE_URL``"""
+        if self._httpd is None:
+            raise RuntimeError("El servidor no está iniciado")
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api/3/action/datastore_search"
+
+    def iniciar(self) -> "ServidorCKANLocal":
+        """Arrancar el servidor en un hilo en segundo plano"""
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._crear_handler())
+        self._httpd.daemon_threads = True
+        self._hilo = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self) -> None:
+        """Detener el servidor"""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> "ServidorCKANLocal":
+        return self.iniciar()
+
+    def __exit__(self, *exc: object) -> None:
+        self.detener()
+
+    @staticmethod
+    def _numerar(registros: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        return [{"_id": i, **registro} for i, registro in enumerate(registros, 1)]
+
+    def actualizar(self, resource_id: str, registros: list[dict[str, Any]]) -> None:
+        """Reemplazar los registros de un recurso (nuevo ``last_modified``)"""
+        with self._lock:
+            self.recursos[resource_id] = self._numerar(registros)
+            self.modificados[resource_id] = _ahora()
+            if self._db is not None:
+                self._db.execute(f'DROP TABLE IF EXISTS "{resource_id}"')
+                self._cargar_tabla(self._db, resource_id)
+
+    def _crear_db(self) -> sqlite3.Connection:
+        """Copiar cada recurso a una tabla SQLite en memoria"""
+        db = sqlite3.connect(":memory:", check_same_thread=False)
+        for resource_id in self.recursos:
+            self._cargar_tabla(db, resource_id)
+        return db
+
+    def _cargar_tabla(self, db: sqlite3.Connection, resource_id: str) -> None:
+        registros = self.recursos[resource_id]
+        if not registros:
+            return
+        campos = list(registros[0])
+        columnas = ", ".join(
+            f'"{c}" {TIPOS_SQLITE[_tipo_campo(registros[0][c])]}' for c in campos
+        )
+        db.execute(f'CREATE TABLE "{resource_id}" ({columnas})')
+        marcas = ", ".join("?" * len(campos))
+        db.executemany(
+            f'INSERT INTO "{resource_id}" VALUES ({marcas})',
+            ([r.get(c) for c in campos] for r in registros),
+        )
+
+    def responder_recurso(
+        self, query: dict[str, list[str]]
+    ) -> tuple[int, dict[str, Any]]:
+        """Construir la respuesta de resource_show"""
+        resource_id = query.get("id", [""])[0]
+        with self._lock:
+            self.peticiones += 1
+            if resource_id not in self.recursos:
+                return 404, {"success": False, "error": {"message": "Not found"}}
+            result = {
+                "id": resource_id,
+                "datastore_active": True,
+                "last_modified": self.modificados[resource_id],
+            }
+        return 200, {"success": True, "result": result}
+
+    def responder_sql(self, query: dict[str, list[str]]) -> tuple[int, dict[str, Any]]:
+        """Construir la respuesta de datastore_search_sql"""
+        if self._db is None:
+            return 403, {"success": False, "error": {"message": "Not authorized"}}
+        sql = query.get("sql", [""])[0]
+        if not sql.lstrip().upper().startswith("SELECT"):
+            return 409, {"success": False, "error": {"message": "Solo SELECT"}}
+
+        with self._lock:
+            self.peticiones += 1
+            try:
+                cursor = self._db.execute(sql)
+            except sqlite3.Error as e:
+                return 409, {"success": False, "error": {"message": str(e)}}
+            columnas = [d[0] for d in cursor.description]
+            filas = cursor.fetchall()
+
+        records = [dict(zip(columnas, fila)) for fila in filas]
+        fields = [{"id": c} for c in columnas]
+        return 200, {
+            "success": True,
+            "result": {"records": records, "fields": fields, "sql": sql},
+        }
+
+    def responder(self, query: dict[str, list[str]]) -> tuple[int, dict[str, Any]]:
+        """Construir la respuesta de datastore_search para una consulta"""
+        resource_id = query.get("resource_id", [""])[0]
+        if resource_id not in self.recursos:
+            return 404, {"success": False, "error": {"message": "Not found"}}
+
+        limit = min(int(query.get("limit", ["100"])[0]), self.max_limit)
+        offset = int(query.get("offset", ["0"])[0])
+
+        with self._lock:
+            self.peticiones += 1
+            if self._fallos[(resource_id, offset)] < self.fallos_por_pagina:
+                self._fallos[(resource_id, offset)] += 1
+                return 500, {"success": False, "error": {"message": "Fallo simulado"}}
+
+        registros = self.recursos[resource_id]
+        ejemplo = registros[0] if registros else {}
+        filters = json.loads(query.get("filters", ["{}"])[0])
+        q = query.get("q", [None])[0]
+        if filters or q:
+            registros = _filtrar(registros, filters, q)
+        if "sort" in query:
+            registros = _ordenar(registros, query["sort"][0])
+
+        campos = list(ejemplo)
+        if "fields" in query:
+            campos = [c.strip() for c in query["fields"][0].split(",")]
+        fields = [{"id": k, "type": _tipo_campo(ejemplo.get(k))} for k in campos]
+        pagina = registros[offset : offset + limit]
+        if query.get("records_format", ["objects"])[0] == "lists":
+            pagina = [[r.get(k) for k in campos] for r in pagina]
+        elif "fields" in query:
+            pagina = [{k: r.get(k) for k in campos} for r in pagina]
+        result = {
+            "resource_id": resource_id,
+            "fields": fields,
+            "records": pagina,
+            "limit": limit,
+            "offset": offset,
+            "total": len(registros),
+        }
+        return 200, {"success": True, "result": result}
+
+    def _crear_handler(self) -> type[BaseHTTPRequestHandler]:
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path.endswith("/datastore_search_sql"):
+                    status, payload = servidor.responder_sql(query)
+                elif url.path.endswith("/resource_show"):
+                    status, payload = servidor.responder_recurso(query)
+                else:
+                    status, payload = servidor.responder(query)
+                body = json.dumps(payload).encode("utf-8")
+                with servidor._lock:
+                    servidor.bytes_enviados += len(body)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,359 @@
+"""
+Caché local de sincronización para no volver a descargar datos sin cambios
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+from urllib3.util import Retry
+
+from curso_machine_learning.infraestructura.ckan import (
+    BASE_URL,
+    crear_pool,
+    fetch_page_with_retries,
+    fetch_resource,
+    iter_pages,
+)
+from curso_machine_learning.infraestructura.cliente_http import ClienteHTTP, ErrorHTTP
+from curso_machine_learning.infraestructura.descarga import descargar_a_archivo
+from curso_machine_learning.infraestructura.sumideros import crear_sumidero
+
+DIRECTORIO_CACHE = ".cache_sincronizacion"
+
+
+def huella_registro(record: dict[str, Any] | list[dict[str, Any]]) -> str:
+    """Hash estable de un registro (o de una página) de datastore_search"""
+    contenido = json.dumps(record, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def hash_archivo(ruta: str | Path, *, bloque: int = 1 << 20) -> str:
+    """SHA-256 del contenido de un archivo, leído por bloques"""
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        while chunk := f.read(bloque):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class CacheSincronizacion:
+    """Estado de sincronización persistido como un JSON por recurso o URL"""
+
+    def __init__(self, directorio: str | Path = DIRECTORIO_CACHE):
+        self.directorio = Path(directorio)
+
+    def _ruta(self, clave: str) -> Path:
+        nombre = hashlib.sha1(clave.encode("utf-8")).hexdigest()
+        return self.directorio / f"{nombre}.json"
+
+    def leer(self, clave: str) -> dict[str, Any]:
+        """Devolver el estado guardado para ``clave`` (vacío si no existe)"""
+        try:
+            with open(self._ruta(clave), encoding="utf-8") as f:
+                estado: dict[str, Any] = json.load(f)
+                return estado
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def guardar(self, clave: str, estado: dict[str, Any]) -> None:
+        """Guardar el estado de forma atómica (escritura + rename)"""
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        ruta = self._ruta(clave)
+        tmp = ruta.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"clave": clave, **estado}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, ruta)
+
+
+class EstadisticasURL:
+    """Latencia y resultado histórico de cada URL, para ordenar los intentos"""
+
+    def __init__(
+        self,
+        ruta: str | Path = Path(DIRECTORIO_CACHE) / "estadisticas_urls.json",
+        *,
+        alpha: float = 0.3,
+    ):
+        self.ruta = Path(ruta)
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        try:
+            with open(self.ruta, encoding="utf-8") as f:
+                self.urls: dict[str, dict[str, Any]] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.urls = {}
+
+    def prioridad(self, url: str) -> tuple[int, float]:
+        """Clave de orden: primero menos fallos seguidos, luego menor latencia"""
+        datos = self.urls.get(url, {})
+        return datos.get("fallos_seguidos", 0), datos.get("latencia", float("inf"))
+
+    def registrar(self, url: str, resultado: str, latencia: float | None) -> None:
+        """Guardar el resultado (``ok``, ``invalido``, ``error``, ``cancelado``)"""
+        with self._lock:
+            datos = self.urls.setdefault(url, {"intentos": 0, "exitos": 0})
+            datos["intentos"] += 1
+            datos["ultimo_resultado"] = resultado
+            if resultado == "ok":
+                datos["exitos"] += 1
+                datos["fallos_seguidos"] = 0
+            elif resultado != "cancelado":
+                datos["fallos_seguidos"] = datos.get("fallos_seguidos", 0) + 1
+            if latencia is not None and resultado != "cancelado":
+                previa = datos.get("latencia")
+                datos["latencia"] = (
+                    latencia
+                    if previa is None
+                    else self.alpha * latencia + (1 - self.alpha) * previa
+                )
+
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.ruta.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.urls, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.ruta)
+
+
+def _modificacion_remota(
+    http: Any, resource_id: str, *, retries: int, base_url: str
+) -> str | None:
+    """``last_modified`` (o ``metadata_modified``) del recurso según
+    ``resource_show``; ``None`` si el portal no lo expone"""
+    try:
+        recurso = fetch_resource(http, resource_id, retries=retries, base_url=base_url)
+    except (ErrorHTTP, RuntimeError, ValueError):
+        return None
+    modificado = recurso.get("last_modified") or recurso.get("metadata_modified")
+    return str(modificado) if modificado else None
+
+
+def _punto_de_partida(
+    estado: dict[str, Any],
+    out_path: Path,
+    http: Any,
+    resource_id: str,
+    *,
+    modificado: str | None,
+    retries: int,
+    base_url: str,
+) -> tuple[int, int | None]:
+    """Decidir desde qué offset hay que descargar.
+
+    Compara con lo guardado la fecha de modificación del recurso, la
+    primera página y el último registro ya descargado. Con el mismo total
+    y la misma fecha no hay nada que hacer; si el total creció y la primera
+    página y el último registro siguen iguales se descarga solo la cola.
+    En cualquier otro caso (una edición o un borrado que conserva el total,
+    un registro distinto, o un archivo local más corto de lo registrado) se
+    descarga todo de nuevo. Devuelve ``(offset_inicial, total_remoto)``.
+    """
+    offset = int(estado.get("offset", 0))
+    if not out_path.exists() or estado.get("out_path") != str(out_path) or offset == 0:
+        return 0, None
+    # Solo se puede continuar si el archivo conserva todo lo registrado: uno
+    # más corto no se completa con ``truncate`` (rellenaría con bytes nulos)
+    if "bytes" not in estado or os.path.getsize(out_path) < estado["bytes"]:
+        print("🔄 El archivo local está incompleto: se descargará completo")
+        return 0, None
+
+    result = fetch_page_with_retries(
+        http,
+        resource_id,
+        limit=1,
+        offset=offset - 1,
+        retries=retries,
+        base_url=base_url,
+    )
+    total = int(result.get("total", 0))
+    records = result.get("records", [])
+    cambio = not records or huella_registro(records[-1]) != estado.get("huella")
+
+    if not cambio and estado.get("filas_inicio"):
+        inicio = fetch_page_with_retries(
+            http,
+            resource_id,
+            limit=estado["filas_inicio"],
+            offset=0,
+            retries=retries,
+            base_url=base_url,
+        )
+        cambio = huella_registro(inicio.get("records", [])) != estado["huella_inicio"]
+
+    # Con el mismo total, una fecha distinta es una edición en el medio
+    if (
+        not cambio
+        and offset == total
+        and modificado is not None
+        and estado.get("modificado") not in (None, modificado)
+    ):
+        cambio = True
+
+    if cambio:
+        print("🔄 El recurso cambió: se descargará completo")
+        return 0, total
+
+    if out_path.suffix == ".parquet" and offset < total:
+        return 0, total
+
+    if out_path.stat().st_size != estado.get("bytes"):
+        with open(out_path, "r+b") as f:
+            f.truncate(estado["bytes"])
+
+    return offset, total
+
+
+def sincronizar_recurso(
+    resource_id: str,
+    out_path: str | Path,
+    *,
+    cache: CacheSincronizacion | None = None,
+    limit: int = 1000,
+    concurrency: int = 1,
+    retries: int = 3,
+    base_url: str = BASE_URL,
+    http: ClienteHTTP | None = None,
+    progreso: bool = True,
+) -> tuple[Path, int]:
+    """Sincronizar un recurso de datastore_search con un archivo local.
+
+    Tras cada página escrita se guarda el offset completado, de modo que una
+    descarga interrumpida continúa donde quedó. En ejecuciones posteriores
+    solo se descargan los registros añadidos desde la última vez; si no hay
+    cambios bastan tres peticiones pequeñas (``resource_show``, la primera
+    página y el último registro, ver ``_punto_de_partida``).
+    ``progreso=False`` omite los mensajes por página.
+    """
+    cache = cache or CacheSincronizacion()
+    out_path = Path(out_path)
+    clave = f"{base_url}|{resource_id}"
+    estado = cache.leer(clave)
+
+    http = http or crear_pool(concurrency)
+    # La fecha se toma antes de descargar: un cambio durante la descarga se
+    # detecta en la siguiente ejecución
+    modificado = _modificacion_remota(
+        http, resource_id, retries=retries, base_url=base_url
+    )
+    offset, total = _punto_de_partida(
+        estado,
+        out_path,
+        http,
+        resource_id,
+        modificado=modificado,
+        retries=retries,
+        base_url=base_url,
+    )
+
+    if offset and offset == total:
+        print(f"✅ Sin cambios en el recurso ({offset} registros en {out_path})")
+        return out_path, offset
+
+    if offset:
+        print(f"⏩ Reanudando la descarga desde el registro {offset}/{total}")
+    else:
+        estado = {}
+
+    estado.update(
+        {
+            "resource_id": resource_id,
+            "out_path": str(out_path),
+            "modificado": modificado,
+        }
+    )
+    with crear_sumidero(out_path, append=offset > 0) as sumidero:
+        for inicio, total, records in iter_pages(
+            resource_id,
+            limit=limit,
+            concurrency=concurrency,
+            retries=retries,
+            base_url=base_url,
+            start=offset,
+            http=http,
+        ):
+            if not records:
+                continue
+            sumidero.escribir(records)
+            if inicio == 0:
+                estado["huella_inicio"] = huella_registro(records)
+                estado["filas_inicio"] = len(records)
+            offset = inicio + len(records)
+            estado.update(
+                {
+                    "offset": offset,
+                    "total": total,
+                    "huella": huella_registro(records[-1]),
+                    "bytes": out_path.stat().st_size,
+                    "completo": offset >= total,
+                }
+            )
+            cache.guardar(clave, estado)
+            if progreso:
+                print(f"Descargados {offset}/{total} registros")
+
+    return out_path, offset
+
+
+def descargar_condicional(
+    url: str,
+    destino: str | Path,
+    *,
+    cache: CacheSincronizacion | None = None,
+    validar: Callable[[str, str], bool] | None = None,
+    timeout: float = 30,
+    cancelar: threading.Event | None = None,
+    cliente: ClienteHTTP | None = None,
+    retries: Retry | None = None,
+) -> Path | None:
+    """Descargar ``url`` en ``destino`` solo si cambió desde la última vez.
+
+    Envía ``If-None-Match``/``If-Modified-Since`` con los valores guardados;
+    ante un 304 se reutiliza el archivo local sin transferir el cuerpo.
+    ``validar(inicio, content_type)`` decide con el primer bloque si el
+    contenido sirve; si no sirve se devuelve ``None``. ``cliente`` y
+    ``retries`` se pasan a ``descargar_a_archivo``.
+    """
+    cache = cache or CacheSincronizacion()
+    destino = Path(destino)
+    estado = cache.leer(url)
+
+    headers = {}
+    if destino.exists() and estado.get("sha256") == hash_archivo(destino):
+        if estado.get("etag"):
+            headers["If-None-Match"] = estado["etag"]
+        if estado.get("last_modified"):
+            headers["If-Modified-Since"] = estado["last_modified"]
+
+    resultado = descargar_a_archivo(
+        url,
+        destino,
+        headers=headers,
+        validar=validar,
+        timeout=timeout,
+        cancelar=cancelar,
+        cliente=cliente,
+        retries=retries,
+    )
+    if resultado.status == 304:
+        print(f"♻️ Sin cambios desde la última descarga, usando '{destino}'")
+        return destino
+    if resultado.ruta is None:
+        return None
+
+    if resultado.sha256 == estado.get("sha256"):
+        print(f"♻️ Contenido idéntico al de la última descarga ('{destino}')")
+
+    cache.guardar(
+        url,
+        {
+            "destino": str(destino),
+            "sha256": resultado.sha256,
+            "etag": resultado.headers.get("ETag"),
+            "last_modified": resultado.headers.get("Last-Modified"),
+            "content_type": resultado.headers.get("Content-Type", ""),
+        },
+    )
+    return resultado.ruta
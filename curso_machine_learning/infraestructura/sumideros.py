@@ -0,0 +1,139 @@
+"""
+Sumideros en disco para escribir registros página a página sin acumularlos
+"""
+
+import csv
+from pathlib import Path
+from typing import Any, Protocol
+
+
+class Sumidero(Protocol):
+    """Destino al que se escriben páginas de registros a medida que llegan"""
+
+    ruta: Path
+    filas: int
+
+    def escribir(self, records: list[dict[str, Any]]) -> None: ...
+
+    def cerrar(self) -> None: ...
+
+    def __enter__(self) -> "Sumidero": ...
+
+    def __exit__(self, *exc: object) -> None: ...
+
+
+class SumideroCSV:
+    """CSV al que se añaden páginas de registros.
+
+    Las columnas se fijan con la primera página (o con la cabecera del
+    archivo existente si ``append=True``); claves nuevas en páginas
+    posteriores se ignoran y las ausentes quedan vacías.
+    """
+
+    def __init__(
+        self,
+        ruta: str | Path,
+        *,
+        append: bool = False,
+        columnas: list[str] | None = None,
+    ):
+        self.ruta = Path(ruta)
+        self.filas = 0
+        self.columnas = columnas
+
+        existe = append and self.ruta.exists() and self.ruta.stat().st_size > 0
+        if existe and self.columnas is None:
+            with open(self.ruta, newline="", encoding="utf-8") as f:
+                self.columnas = next(csv.reader(f))
+
+        self._archivo = open(
+            self.ruta, "a" if existe else "w", newline="", encoding="utf-8"
+        )
+        self._writer: csv.DictWriter[str] | None = None
+        self._cabecera_escrita = existe
+
+    def escribir(self, records: list[dict[str, Any]]) -> None:
+        """Añadir una página de registros al archivo"""
+        if not records:
+            return
+
+        if self._writer is None:
+            if self.columnas is None:
+                self.columnas = list(records[0])
+            self._writer = csv.DictWriter(
+                self._archivo, fieldnames=self.columnas, extrasaction="ignore"
+            )
+            if not self._cabecera_escrita:
+                self._writer.writeheader()
+                self._cabecera_escrita = True
+
+        self._writer.writerows(records)
+        self._archivo.flush()
+        self.filas += len(records)
+
+    def cerrar(self) -> None:
+        """Cerrar el archivo"""
+        self._archivo.close()
+
+    def __enter__(self) -> "SumideroCSV":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.cerrar()
+
+
+class SumideroParquet:
+    """Archivo Parquet en el que cada página se escribe como un row group.
+
+    Requiere ``pyarrow``. El esquema se infiere de la primera página.
+    """
+
+    def __init__(self, ruta: str | Path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                "Se necesita 'pyarrow' para escribir Parquet: pip install pyarrow"
+            ) from e
+
+        self._pa = pa
+        self._pq = pq
+        self.ruta = Path(ruta)
+        self.filas = 0
+        self._writer: Any = None
+        self._schema: Any = None
+
+    def escribir(self, records: list[dict[str, Any]]) -> None:
+        """Escribir una página de registros como un nuevo row group"""
+        if not records:
+            return
+
+        table = self._pa.Table.from_pylist(records, schema=self._schema)
+        if self._writer is None:
+            self._schema = table.schema
+            self._writer = self._pq.ParquetWriter(self.ruta, self._schema)
+
+        self._writer.write_table(table)
+        self.filas += len(records)
+
+    def cerrar(self) -> None:
+        """Cerrar el escritor y escribir el pie del archivo"""
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self) -> "SumideroParquet":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.cerrar()
+
+
+def crear_sumidero(ruta: str | Path, *, append: bool = False) -> Sumidero:
+    """Elegir el sumidero según la extensión del archivo de salida"""
+    ruta = Path(ruta)
+    if ruta.suffix == ".parquet":
+        if append:
+            raise ValueError("Los archivos Parquet no admiten añadir filas")
+        return SumideroParquet(ruta)
+    return SumideroCSV(ruta, append=append)
@@ -0,0 +1,256 @@
+"""
+Trazas por etapa (tiempo, bytes, filas y memoria) con modo inactivo sin coste
+"""
+
+import contextlib
+import cProfile
+import itertools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+# Variables de entorno para activar la traza sin tocar el código
+VARIABLE_TRAZA = "CURSO_ML_TRAZA"
+VARIABLE_PERFIL = "CURSO_ML_PERFIL"
+VARIABLE_MEMORIA = "CURSO_ML_TRAZA_MEMORIA"
+
+
+@dataclass
+class Span:
+    """Una etapa medida"""
+
+    id: int
+    nombre: str
+    padre: int | None
+    hilo: str
+    inicio: float
+    segundos: float = 0.0
+    bytes: int = 0
+    filas: int = 0
+    pico_memoria: int | None = None
+    atributos: dict[str, Any] = field(default_factory=dict)
+
+    def registrar(self, *, bytes: int = 0, filas: int = 0, **atributos: Any) -> None:
+        """Sumar bytes y filas procesados y anotar atributos"""
+        self.bytes += bytes
+        self.filas += filas
+        self.atributos.update(atributos)
+
+
+class _SpanNulo:
+    """Span que no mide nada (modo inactivo)"""
+
+    def registrar(self, *, bytes: int = 0, filas: int = 0, **atributos: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_SpanNulo":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        pass
+
+
+SPAN_NULO = _SpanNulo()
+
+
+class Traza:
+    """Colección de spans de una ejecución.
+
+    Los spans se anidan por hilo. Con ``memoria`` se usa ``tracemalloc`` y
+    cada span guarda el pico de memoria rastreada mientras estuvo abierto
+    (incluidos sus hijos); con varios hilos a la vez el pico es compartido.
+    """
+
+    def __init__(self, *, memoria: bool = False, perfil: bool = False):
+        self.memoria = memoria
+        self.spans: list[Span] = []
+        self._origen = time.perf_counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.perfil = cProfile.Profile() if perfil else None
+
+    def _pila(self) -> list[Span]:
+        pila: list[Span] | None = getattr(self._local, "pila", None)
+        if pila is None:
+            pila = self._local.pila = []
+        return pila
+
+    def actual(self) -> Span | None:
+        """Span abierto más interno del hilo actual"""
+        pila = self._pila()
+        return pila[-1] if pila else None
+
+    @contextlib.contextmanager
+    def span(self, nombre: str, **atributos: Any) -> Iterator[Span]:
+        """Medir el bloque ``with`` como un span"""
+        pila = self._pila()
+        padre = pila[-1] if pila else None
+        if self.memoria and padre is not None:
+            # El pico hasta aquí pertenece al padre; el del hijo empieza ahora
+            padre.pico_memoria = max(
+                padre.pico_memoria or 0, tracemalloc.get_traced_memory()[1]
+            )
+        if self.memoria:
+            tracemalloc.reset_peak()
+
+        with self._lock:
+            actual = Span(
+                next(self._ids),
+                nombre,
+                padre.id if padre else None,
+                threading.current_thread().name,
+                time.perf_counter() - self._origen,
+                atributos=dict(atributos),
+            )
+        pila.append(actual)
+        try:
+            yield actual
+        finally:
+            actual.segundos = time.perf_counter() - self._origen - actual.inicio
+            pila.pop()
+            if self.memoria:
+                actual.pico_memoria = max(
+                    actual.pico_memoria or 0, tracemalloc.get_traced_memory()[1]
+                )
+                if padre is not None:
+                    padre.pico_memoria = max(
+                        padre.pico_memoria or 0, actual.pico_memoria
+                    )
+                tracemalloc.reset_peak()
+            with self._lock:
+                self.spans.append(actual)
+
+    def iniciar(self) -> "Traza":
+        """Empezar a medir memoria y perfil (si se pidieron)"""
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.perfil is not None:
+            self.perfil.enable()
+        return self
+
+    def detener(self) -> None:
+        """Dejar de medir memoria y perfil"""
+        if self.perfil is not None:
+            self.perfil.disable()
+        if self.memoria and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def a_dict(self) -> dict[str, Any]:
+        """Traza en formato serializable, spans ordenados por inicio"""
+        spans = sorted(self.spans, key=lambda s: s.inicio)
+        return {
+            "spans": [asdict(s) for s in spans],
+            "etapas": self.agregados(),
+        }
+
+    def guardar(self, ruta: str | Path) -> None:
+        """Guardar la traza como JSON"""
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.a_dict(), f, ensure_ascii=False, indent=2, default=str)
+
+    def guardar_perfil(self, ruta: str | Path) -> None:
+        """Guardar el perfil de cProfile (abrir con ``pstats`` o snakeviz)"""
+        if self.perfil is not None:
+            self.perfil.dump_stats(str(ruta))
+
+    def agregados(self) -> dict[str, dict[str, Any]]:
+        """Totales por nombre de span, en orden de primera aparición"""
+        totales: dict[str, dict[str, Any]] = {}
+        for s in sorted(self.spans, key=lambda s: s.inicio):
+            t = totales.setdefault(
+                s.nombre,
+                {"veces": 0, "segundos": 0.0, "bytes": 0, "filas": 0, "pico": None},
+            )
+            t["veces"] += 1
+            t["segundos"] += s.segundos
+            t["bytes"] += s.bytes
+            t["filas"] += s.filas
+            if s.pico_memoria is not None:
+                t["pico"] = max(t["pico"] or 0, s.pico_memoria)
+        return totales
+
+    def imprimir_resumen(self) -> None:
+        """Mostrar tiempo, filas, bytes y pico de memoria por etapa"""
+        print("\n⏱️ Etapas:")
+        for nombre, t in self.agregados().items():
+            detalles = []
+            if t["veces"] > 1:
+                detalles.append(f"{t['veces']} veces")
+            if t["filas"]:
+                detalles.append(f"{t['filas']} filas")
+            if t["bytes"]:
+                detalles.append(f"{t['bytes'] / 1e6:.2f} MB")
+            if t["pico"] is not None:
+                detalles.append(f"pico {t['pico'] / 1e6:.1f} MB")
+            extra = f" ({', '.join(detalles)})" if detalles else ""
+            print(f"  {nombre}: {t['segundos']:.3f} s{extra}")
+
+
+_traza: Traza | None = None
+
+
+def traza_activa() -> Traza | None:
+    """Traza en curso (``None`` si no se está trazando)"""
+    return _traza
+
+
+def span(nombre: str, **atributos: Any) -> Any:
+    """Span con ``nombre`` en la traza activa; sin traza no hace nada"""
+    if _traza is None:
+        return SPAN_NULO
+    return _traza.span(nombre, **atributos)
+
+
+def registrar(*, bytes: int = 0, filas: int = 0, **atributos: Any) -> None:
+    """Sumar bytes/filas al span abierto más interno del hilo actual"""
+    if _traza is None:
+        return
+    actual = _traza.actual()
+    if actual is not None:
+        actual.registrar(bytes=bytes, filas=filas, **atributos)
+
+
+@contextlib.contextmanager
+def trazar(
+    ruta: str | Path | None = None,
+    *,
+    perfil: str | Path | None = None,
+    memoria: bool | None = None,
+    resumen: bool = True,
+) -> Iterator[Traza | None]:
+    """Activar la traza durante el bloque ``with`` y guardarla al salir.
+
+    Sin argumentos se usan las variables de entorno ``CURSO_ML_TRAZA``
+    (JSON de salida), ``CURSO_ML_PERFIL`` (volcado de cProfile) y
+    ``CURSO_ML_TRAZA_MEMORIA``; si no hay ruta ni perfil no se activa nada.
+    """
+    global _traza
+
+    ruta = ruta or os.environ.get(VARIABLE_TRAZA)
+    perfil = perfil or os.environ.get(VARIABLE_PERFIL)
+    if memoria is None:
+        memoria = os.environ.get(VARIABLE_MEMORIA, "") not in ("", "0")
+    if (ruta is None and perfil is None) or _traza is not None:
+        yield _traza
+        return
+
+    _traza = Traza(memoria=memoria, perfil=perfil is not None).iniciar()
+    try:
+        yield _traza
+    finally:
+        traza, _traza = _traza, None
+        traza.detener()
+        if resumen:
+            traza.imprimir_resumen()
+        if ruta is not None:
+            traza.guardar(ruta)
+            print(f"🧭 Traza guardada en '{ruta}'")
+        if perfil is not None:
+            traza.guardar_perfil(perfil)
+            print(f"🧭 Perfil guardado en '{perfil}'")
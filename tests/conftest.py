@@ -0,0 +1,29 @@
+"""
+Datos compartidos por las pruebas contra ``ServidorCKANLocal``
+"""
+
+from typing import Any
+
+import pytest
+
+LOCALIDADES = ("SUBA", "KENNEDY", "BOSA", "USME", "CHAPINERO")
+SEXOS = ("FEMENINO", "MASCULINO")
+
+
+def crear_registros(n: int, desde: int = 0) -> list[dict[str, Any]]:
+    """Registros con columnas de texto, enteras y decimales"""
+    return [
+        {
+            "LOCALIDAD": LOCALIDADES[i % len(LOCALIDADES)],
+            "SEXO": SEXOS[i % len(SEXOS)],
+            "AÑO": 2018 + i % 6,
+            "EDAD_MESES": i % 60,
+            "PESO_KG": round(3.5 + (i % 200) * 0.07, 2),
+        }
+        for i in range(desde, desde + n)
+    ]
+
+
+@pytest.fixture
+def registros() -> list[dict[str, Any]]:
+    return crear_registros(1050)
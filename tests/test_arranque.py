@@ -0,0 +1,24 @@
+"""
+Tiempo de arranque de la CLI: cada subcomando frente a la referencia
+medida en la misma máquina (``benchmarks/arranque.py``)
+"""
+
+import pytest
+
+from curso_machine_learning.benchmarks import arranque
+from curso_machine_learning.cli import MODULOS
+
+
+@pytest.fixture(scope="module")
+def limite() -> float:
+    return arranque.presupuesto()
+
+
+@pytest.mark.parametrize("comando", sorted(MODULOS))
+def test_arranque_dentro_del_presupuesto(comando: str, limite: float) -> None:
+    segundos, pesadas = arranque.medir(comando)
+    assert not pesadas, f"{comando} importa {', '.join(pesadas)} al arrancar"
+    assert segundos <= limite, (
+        f"{comando}: {segundos * 1000:.1f} ms "
+        f"(presupuesto {limite * 1000:.0f} ms = {arranque.MARGEN}× referencia)"
+    )
@@ -0,0 +1,135 @@
+"""
+Descarga paginada de datastore_search contra ``ServidorCKANLocal``
+"""
+
+import pandas as pd
+import pytest
+
+from curso_machine_learning.infraestructura.ckan import (
+    DatastoreQuery,
+    fetch_all_records,
+    iter_pages,
+)
+from curso_machine_learning.infraestructura.cliente_http import ClienteHTTP, ErrorHTTP
+from curso_machine_learning.infraestructura.servidor_ckan_local import (
+    ServidorCKANLocal,
+)
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_paginas_en_orden_con_fallos(registros, concurrency):
+    with ServidorCKANLocal({"r": registros}, fallos_por_pagina=1) as servidor:
+        paginas = list(
+            iter_pages(
+                "r",
+                limit=100,
+                concurrency=concurrency,
+                base_url=servidor.url,
+                http=ClienteHTTP(maxsize=concurrency),
+            )
+        )
+        peticiones = servidor.peticiones
+
+    assert [offset for offset, _, _ in paginas] == list(range(0, 1050, 100))
+    assert {total for _, total, _ in paginas} == {1050}
+    ids = [r["_id"] for _, _, records in paginas for r in records]
+    assert ids == list(range(1, 1051))
+    # Cada página falla una vez y se reintenta sola: nada se descarga dos veces
+    assert peticiones == 2 * len(paginas)
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_fetch_all_records_igual_a_los_registros(registros, concurrency):
+    with ServidorCKANLocal({"r": registros}, fallos_por_pagina=1) as servidor:
+        df = fetch_all_records(
+            "r", limit=128, concurrency=concurrency, base_url=servidor.url
+        )
+        esperado = pd.DataFrame(servidor.recursos["r"])
+
+    pd.testing.assert_frame_equal(df, esperado)
+
+
+def test_pagina_a_disco(registros, tmp_path):
+    with ServidorCKANLocal({"r": registros}, fallos_por_pagina=1) as servidor:
+        ruta, filas = fetch_all_records(
+            "r",
+            limit=200,
+            concurrency=2,
+            base_url=servidor.url,
+            out_path=tmp_path / "r.csv",
+        )
+
+    assert filas == 1050
+    assert pd.read_csv(ruta)["_id"].tolist() == list(range(1, 1051))
+
+
+def test_fallos_agotados_lanzan_error(registros):
+    with ServidorCKANLocal({"r": registros}, fallos_por_pagina=5) as servidor:
+        with pytest.raises(ErrorHTTP) as error:
+            fetch_all_records(
+                "r",
+                limit=500,
+                retries=1,
+                base_url=servidor.url,
+            )
+    assert error.value.status == 500
+
+
+def _esperado(servidor, query):
+    """Filas del recurso ``r`` que cumplen ``query``, calculadas en local"""
+    filas = [
+        r
+        for r in servidor.recursos["r"]
+        if all(r[c] == v for c, v in query.filters.items())
+        and (query.q is None or query.q in " ".join(map(str, r.values())))
+        and query.matches(r)
+    ]
+    campos = list(query.fields) or list(servidor.recursos["r"][0])
+    return pd.DataFrame([{c: r[c] for c in campos} for r in filas])
+
+
+CONSULTAS = {
+    "filtros": DatastoreQuery(
+        fields=("LOCALIDAD", "PESO_KG"), filters={"SEXO": "FEMENINO"}
+    ),
+    "rangos": DatastoreQuery(
+        fields=("LOCALIDAD", "AÑO"),
+        filters={"LOCALIDAD": "SUBA"},
+        ranges={"AÑO": (2020, 2021)},
+    ),
+    "rango_abierto": DatastoreQuery(ranges={"EDAD_MESES": (None, 11)}),
+    "q_y_rangos": DatastoreQuery(q="FEMENINO", ranges={"AÑO": (2020, 2021)}),
+}
+
+
+@pytest.mark.parametrize("sql", [True, False])
+@pytest.mark.parametrize("nombre", sorted(CONSULTAS))
+def test_consulta_en_el_servidor_o_en_local(registros, nombre, sql):
+    query = CONSULTAS[nombre]
+    with ServidorCKANLocal({"r": registros}, sql=sql) as servidor:
+        df = fetch_all_records(
+            "r", limit=100, concurrency=2, base_url=servidor.url, query=query
+        )
+        esperado = _esperado(servidor, query)
+
+    assert 0 < len(esperado) < len(registros)
+    pd.testing.assert_frame_equal(df, esperado)
+
+
+def test_rangos_por_sql_solo_transfieren_las_filas_pedidas(registros):
+    query = CONSULTAS["rangos"]
+    enviados = {}
+    for sql in (True, False):
+        with ServidorCKANLocal({"r": registros}, sql=sql) as servidor:
+            paginas = list(
+                iter_pages("r", limit=1000, base_url=servidor.url, query=query)
+            )
+            enviados[sql] = servidor.bytes_enviados
+            esperado = _esperado(servidor, query)
+        total = paginas[0][1]
+        filas = sum(len(records) for _, _, records in paginas)
+        assert filas == len(esperado)
+        # Por SQL el total ya cuenta los rangos; en local solo los filtros
+        suba = sum(r["LOCALIDAD"] == "SUBA" for r in registros)
+        assert total == (len(esperado) if sql else suba)
+    assert enviados[True] < enviados[False]
@@ -0,0 +1,56 @@
+"""
+Decodificación columnar: mismos tipos que ``pd.DataFrame(records)``
+"""
+
+import pandas as pd
+import pytest
+
+from curso_machine_learning.infraestructura.ckan import fetch_all_records
+from curso_machine_learning.infraestructura.decodificacion import (
+    DecodificadorColumnas,
+)
+from curso_machine_learning.infraestructura.servidor_ckan_local import (
+    ServidorCKANLocal,
+)
+
+# (tipo CKAN, primera página, segunda página)
+COLUMNAS = {
+    "enteros": ("int", [1, 2], [3, 4]),
+    "enteros_con_nulos": ("int", [1, None], [3, 4]),
+    "entero_con_decimal": ("int", [1, 2], [2.7, None]),
+    "entero_con_texto": ("int", [1, None], ["1.5", 3]),
+    "entero_gigante": ("int", [1, 2], [2**70, 3]),
+    "solo_nulos_al_inicio": ("int", [None, None], [5, None]),
+    "decimales": ("float8", [1, None], [2.5, 3]),
+    "decimal_con_texto": ("numeric", [1.5, 2], ["1.5", None]),
+    "booleanos": ("bool", [True, False], [False, True]),
+    "booleanos_con_nulos": ("bool", [True, False], [None, True]),
+    "booleano_en_entero": ("int", [1, 2], [True, False]),
+    "texto": ("text", ["a", None], ["b", "c"]),
+}
+
+
+@pytest.mark.parametrize("formato", ["lists", "objects"])
+@pytest.mark.parametrize("nombre", sorted(COLUMNAS))
+def test_mismos_tipos_que_dataframe(nombre, formato):
+    tipo, primera, segunda = COLUMNAS[nombre]
+    decodificador = DecodificadorColumnas([{"id": "x", "type": tipo}], capacidad=3)
+    for pagina in (primera, segunda):
+        if formato == "lists":
+            decodificador.agregar([[v] for v in pagina])
+        else:
+            decodificador.agregar([{"x": v} for v in pagina])
+
+    esperado = pd.DataFrame([{"x": v} for v in primera + segunda])
+    pd.testing.assert_frame_equal(decodificador.a_dataframe(), esperado)
+
+
+def test_varias_columnas_desde_el_servidor(registros):
+    registros[7]["EDAD_MESES"] = None
+    registros[9]["PESO_KG"] = None
+    with ServidorCKANLocal({"r": registros}) as servidor:
+        df = fetch_all_records("r", limit=300, concurrency=2, base_url=servidor.url)
+        esperado = pd.DataFrame(servidor.recursos["r"])
+
+    assert df.dtypes.to_dict() == esperado.dtypes.to_dict()
+    pd.testing.assert_frame_equal(df, esperado)
@@ -0,0 +1,92 @@
+"""
+Ingesta por lotes de varios recursos contra ``ServidorCKANLocal``
+"""
+
+import pandas as pd
+import pytest
+from conftest import crear_registros
+
+from curso_machine_learning.infraestructura.lotes import (
+    EstadoLotes,
+    Recurso,
+    ingerir_lote,
+)
+from curso_machine_learning.infraestructura.servidor_ckan_local import (
+    ServidorCKANLocal,
+)
+from curso_machine_learning.infraestructura.sincronizacion import CacheSincronizacion
+
+TAMANOS = {"grande": 1050, "mediano": 420, "chico": 40}
+TASA = 40.0
+RAFAGA = 4
+
+
+@pytest.fixture
+def servidor():
+    recursos = {nombre: crear_registros(n) for nombre, n in TAMANOS.items()}
+    with ServidorCKANLocal(recursos, fallos_por_pagina=1) as servidor:
+        yield servidor
+
+
+def ingerir(servidor, directorio, nombres=TAMANOS):
+    recursos = [
+        Recurso(nombre, directorio / f"{nombre}.csv", servidor.url)
+        for nombre in nombres
+    ]
+    antes = servidor.peticiones
+    resumen = ingerir_lote(
+        recursos,
+        concurrencia=3,
+        simultaneos=2,
+        concurrencia_recurso=2,
+        tasa=TASA,
+        rafaga=RAFAGA,
+        limit=100,
+        estado=EstadoLotes(directorio / "lotes.json"),
+        cache=CacheSincronizacion(directorio / "cache"),
+    )
+    return resumen, servidor.peticiones - antes
+
+
+def test_filas_y_peticiones_por_recurso(servidor, tmp_path):
+    resumen, peticiones = ingerir(servidor, tmp_path)
+    resultados = {r.resource_id: r for r in resumen.recursos}
+
+    assert not resumen.errores
+    for nombre, n in TAMANOS.items():
+        assert resultados[nombre].filas == n
+        ids = pd.read_csv(tmp_path / f"{nombre}.csv")["_id"].tolist()
+        assert ids == list(range(1, n + 1))
+        # Tamaño, resource_show y una página por cada 100 filas; los 500
+        # simulados los reintenta urllib3 sin pasar por el cubo de tokens
+        assert resultados[nombre].peticiones == 2 + -(-n // 100)
+        assert resultados[nombre].bytes > 0
+
+    # Cada offset falla una vez y urllib3 lo reintenta por dentro
+    contadas = sum(r.peticiones for r in resumen.recursos)
+    paginas = sum(-(-n // 100) for n in TAMANOS.values())
+    assert peticiones == contadas + paginas
+
+    # El límite de tasa se respetó: lo que exceda la ráfaga espera su turno
+    assert resumen.espera_limite > 0
+    assert resumen.segundos >= (contadas - RAFAGA) / TASA
+
+
+def test_segunda_ejecucion_solo_comprueba(servidor, tmp_path):
+    ingerir(servidor, tmp_path)
+    resumen, _ = ingerir(servidor, tmp_path)
+
+    # resource_show, último registro y primera página de cada recurso
+    assert {r.resource_id: r.peticiones for r in resumen.recursos} == {
+        nombre: 3 for nombre in TAMANOS
+    }
+    assert {r.resource_id: r.filas for r in resumen.recursos} == TAMANOS
+
+
+def test_un_recurso_que_falla_no_detiene_al_resto(servidor, tmp_path):
+    resumen, _ = ingerir(servidor, tmp_path, ["no_existe", *TAMANOS])
+
+    assert [r.resource_id for r in resumen.errores] == ["no_existe"]
+    assert "404" in resumen.errores[0].error
+    assert not (tmp_path / "no_existe.csv").exists()
+    assert sum(r.filas for r in resumen.recursos) == sum(TAMANOS.values())
@@ -0,0 +1,58 @@
+"""
+Invalidación de etapas del pipeline al cambiar su código
+"""
+
+import functools
+
+from curso_machine_learning.infraestructura.pipeline import Etapa, Pipeline
+
+
+def definir(cuerpo: str):
+    """Función ``doble`` con el cuerpo dado, como si se editara el módulo"""
+    espacio: dict = {}
+    exec(f"def doble(x):\n    {cuerpo}\n", espacio)
+    return espacio["doble"]
+
+
+def fuente():
+    return 21
+
+
+def ejecutar(directorio, doble):
+    etapas = [
+        Etapa("fuente", fuente),
+        Etapa("doble", doble, ("fuente",)),
+    ]
+    resultados = Pipeline(etapas, directorio).ejecutar()
+    return {nombre: r.estado for nombre, r in resultados.items()}
+
+
+def test_editar_el_cuerpo_vuelve_a_ejecutar_la_etapa(tmp_path):
+    assert ejecutar(tmp_path, definir("return x * 2")) == {
+        "fuente": "ejecutada",
+        "doble": "ejecutada",
+    }
+    # Misma función (aunque sea otro objeto): se omite
+    assert ejecutar(tmp_path, definir("return x * 2"))["doble"] == "omitida"
+    # Mismo nombre y versión, otro cuerpo: se ejecuta de nuevo
+    assert ejecutar(tmp_path, definir("return x + x")) == {
+        "fuente": "omitida",
+        "doble": "ejecutada",
+    }
+    # También cuenta el código de las funciones anidadas
+    comprension = "return [y * {} for y in (x,)][0]"
+    assert ejecutar(tmp_path, definir(comprension.format(2)))["doble"] == "ejecutada"
+    assert ejecutar(tmp_path, definir(comprension.format(3)))["doble"] == "ejecutada"
+    assert ejecutar(tmp_path, definir(comprension.format(3)))["doble"] == "omitida"
+
+
+def test_parcial_con_otros_argumentos(tmp_path):
+    def escalar(x, factor):
+        return x * factor
+
+    def estado(factor):
+        return ejecutar(tmp_path, functools.partial(escalar, factor=factor))["doble"]
+
+    assert estado(2) == "ejecutada"
+    assert estado(2) == "omitida"
+    assert estado(3) == "ejecutada"
@@ -0,0 +1,126 @@
+"""
+Sincronización incremental de un recurso contra ``ServidorCKANLocal``
+"""
+
+import pandas as pd
+import pytest
+from conftest import crear_registros
+
+from curso_machine_learning.infraestructura.cliente_http import ErrorHTTP
+from curso_machine_learning.infraestructura.servidor_ckan_local import (
+    ServidorCKANLocal,
+)
+from curso_machine_learning.infraestructura.sincronizacion import (
+    CacheSincronizacion,
+    sincronizar_recurso,
+)
+
+# resource_show, último registro guardado y primera página
+COMPROBACIONES = 3
+
+
+@pytest.fixture
+def servidor(registros):
+    with ServidorCKANLocal({"r": registros}) as servidor:
+        yield servidor
+
+
+def sincronizar(servidor, ruta, cache, **opciones):
+    """Sincronizar ``r`` y devolver ``(filas, peticiones hechas)``"""
+    antes = servidor.peticiones
+    _, filas = sincronizar_recurso(
+        "r",
+        ruta,
+        cache=cache,
+        limit=100,
+        base_url=servidor.url,
+        progreso=False,
+        **opciones,
+    )
+    return filas, servidor.peticiones - antes
+
+
+def leer(ruta):
+    return pd.read_csv(ruta)["_id"].tolist()
+
+
+def test_sin_cambios(servidor, tmp_path, capsys):
+    ruta, cache = tmp_path / "r.csv", CacheSincronizacion(tmp_path / "cache")
+    assert sincronizar(servidor, ruta, cache) == (1050, 1 + 11)
+    contenido = ruta.read_bytes()
+
+    assert sincronizar(servidor, ruta, cache) == (1050, COMPROBACIONES)
+    assert "Sin cambios" in capsys.readouterr().out
+    assert ruta.read_bytes() == contenido
+
+
+def test_reanuda_desde_el_punto_de_control(servidor, tmp_path, monkeypatch, capsys):
+    ruta, cache = tmp_path / "r.csv", CacheSincronizacion(tmp_path / "cache")
+    responder = servidor.responder
+
+    def cortar(query):
+        if int(query.get("offset", ["0"])[0]) >= 300:
+            return 500, {"success": False}
+        return responder(query)
+
+    monkeypatch.setattr(servidor, "responder", cortar)
+    with pytest.raises(ErrorHTTP):
+        sincronizar(servidor, ruta, cache, retries=0)
+    monkeypatch.undo()
+    assert leer(ruta) == list(range(1, 301))
+
+    # Restos de una página a medio escribir: se truncan al tamaño registrado
+    with open(ruta, "ab") as f:
+        f.write(b"301,KENNEDY,FEMEN")
+
+    filas, peticiones = sincronizar(servidor, ruta, cache)
+    assert "desde el registro 300/1050" in capsys.readouterr().out
+    assert (filas, peticiones) == (1050, COMPROBACIONES + 8)
+    assert leer(ruta) == list(range(1, 1051))
+
+
+def test_solo_descarga_la_cola(servidor, registros, tmp_path):
+    ruta, cache = tmp_path / "r.csv", CacheSincronizacion(tmp_path / "cache")
+    sincronizar(servidor, ruta, cache)
+
+    servidor.actualizar("r", registros + crear_registros(230, desde=1050))
+    assert sincronizar(servidor, ruta, cache) == (1280, COMPROBACIONES + 3)
+    assert leer(ruta) == list(range(1, 1281))
+    pd.testing.assert_frame_equal(
+        pd.read_csv(ruta), pd.DataFrame(servidor.recursos["r"])
+    )
+
+
+@pytest.mark.parametrize("fila", [0, 500, 1049])
+def test_edicion_con_el_mismo_total_descarga_todo(servidor, registros, tmp_path, fila):
+    ruta, cache = tmp_path / "r.csv", CacheSincronizacion(tmp_path / "cache")
+    sincronizar(servidor, ruta, cache)
+
+    registros[fila] = {**registros[fila], "PESO_KG": 99.9}
+    servidor.actualizar("r", registros)
+    assert sincronizar(servidor, ruta, cache)[0] == 1050
+    assert pd.read_csv(ruta)["PESO_KG"][fila] == 99.9
+
+
+def test_borrado_e_insercion_con_el_mismo_total(servidor, registros, tmp_path):
+    ruta, cache = tmp_path / "r.csv", CacheSincronizacion(tmp_path / "cache")
+    sincronizar(servidor, ruta, cache)
+
+    nuevos = registros[:400] + registros[401:] + crear_registros(1, desde=5000)
+    servidor.actualizar("r", nuevos)
+    sincronizar(servidor, ruta, cache)
+    pd.testing.assert_frame_equal(
+        pd.read_csv(ruta), pd.DataFrame(servidor.recursos["r"])
+    )
+
+
+def test_archivo_mas_corto_que_lo_registrado(servidor, tmp_path, capsys):
+    ruta, cache = tmp_path / "r.csv", CacheSincronizacion(tmp_path / "cache")
+    sincronizar(servidor, ruta, cache)
+    contenido = ruta.read_bytes()
+    ruta.write_bytes(contenido[: len(contenido) // 3])
+
+    assert sincronizar(servidor, ruta, cache) == (1050, 1 + 11)
+    assert "incompleto" in capsys.readouterr().out
+    assert ruta.read_bytes() == contenido
+    assert b"\0" not in contenido